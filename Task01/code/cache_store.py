@@ -0,0 +1,100 @@
+"""
+内存LRU + 可选SQLite磁盘存储的键值缓存（PathCache、OraclePlanner共用）：
+内存中淘汰最久未使用的条目，磁盘存储可在多个worker进程之间共享
+"""
+import os
+import sqlite3
+from collections import OrderedDict
+
+
+class CacheStore:
+    """
+    两级键值缓存：先查内存，再查SQLite（命中后放回内存）
+
+    参数:
+    table: SQLite表名
+    columns: 值的列定义，如 "actions BLOB, poses BLOB"（键列固定为 key TEXT PRIMARY KEY，键为repr(key)）
+    encode: 值 -> 与columns对应的列值元组
+    decode: 与columns对应的列值元组 -> 值
+    max_entries: 内存中最多缓存的条目数，超出时淘汰最久未使用的条目
+    db_path: 可选的SQLite文件路径，作为跨进程共享的磁盘存储
+    """
+
+    def __init__(self, table, columns, encode, decode, max_entries, db_path=None):
+        self.table = table
+        self.columns = columns
+        self.encode = encode
+        self.decode = decode
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._num_columns = len(columns.split(","))
+        self._db = None
+        self._db_pid = None
+
+    def _connect(self):
+        # SQLite连接不能跨fork使用，进程变化时重新连接
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, timeout=30)
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, {self.columns})")
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        查询缓存
+
+        返回:
+        缓存的值；内存和磁盘都未命中时返回None
+        """
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.db_path is not None:
+            row = self._connect().execute(f"SELECT * FROM {self.table} WHERE key = ?", (repr(key),)).fetchone()
+            if row is not None:
+                value = self.decode(row[1:])
+                self._remember(key, value)
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """写入内存，设置了db_path时同时写入磁盘"""
+        self._remember(key, value)
+        if self.db_path is not None:
+            db = self._connect()
+            placeholders = ", ".join("?" * (self._num_columns + 1))
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES ({placeholders})", (repr(key),) + tuple(self.encode(value))
+            )
+            db.commit()
+
+    @property
+    def stats(self):
+        """命中/未命中计数"""
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None and self._db_pid == os.getpid():
+            self._db.close()
+        self._db = None
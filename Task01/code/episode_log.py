@@ -0,0 +1,125 @@
+"""
+仅指标的快速评估日志：rollout时每一步只记录智能体位姿、动作、碰撞标志和标量指标（每步几十字节），
+不构建顶视图地图、不合成帧；之后只对选定的episode用完整的可视化配置重放记录的动作，离线重建帧
+"""
+import hashlib
+import os
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+from habitat_sim.utils import common as utils  # 通用工具函数（如坐标转换、数据格式处理）
+
+from metrics_utils import flatten_metrics
+
+# reset之后的第一行没有动作
+NO_ACTION = -1
+
+
+class EpisodeLog:
+    """
+    一个episode的逐步状态（列式存储）：第0行为reset之后的状态，第i行为执行第i个动作之后的状态
+
+    参数:
+    scene_id: 场景ID
+    episode_id: episode ID
+    """
+
+    def __init__(self, scene_id, episode_id):
+        self.scene_id = scene_id
+        self.episode_id = str(episode_id)
+        self._positions = []
+        self._rotations = []
+        self._actions = []
+        self._metrics = []
+
+    def __len__(self):
+        return len(self._actions)
+
+    def append(self, agent_state, action, metrics):
+        """
+        记录一步
+
+        参数:
+        agent_state: env.sim.get_agent_state()
+        action: 执行的动作（HabitatSimActions编号），reset之后的第一行为None
+        metrics: env.get_metrics()（只保留标量指标，如collisions.is_collision、distance_to_goal）
+        """
+        self._positions.append(np.asarray(agent_state.position, dtype=np.float32))
+        self._rotations.append(np.asarray(utils.quat_to_coeffs(agent_state.rotation), dtype=np.float32))
+        self._actions.append(NO_ACTION if action is None else int(action))
+        self._metrics.append(flatten_metrics(metrics))
+
+    @property
+    def actions(self) -> np.ndarray:
+        return np.array(self._actions, dtype=np.int16)
+
+    @property
+    def positions(self) -> np.ndarray:
+        return np.array(self._positions, dtype=np.float32).reshape(-1, 3)
+
+    @property
+    def rotations(self) -> np.ndarray:
+        return np.array(self._rotations, dtype=np.float32).reshape(-1, 4)
+
+    def metric(self, name) -> np.ndarray:
+        """某个指标每一步的值（没有该指标的步为nan）"""
+        return np.array([step.get(name, np.nan) for step in self._metrics], dtype=np.float32)
+
+    @staticmethod
+    def path(log_dir, scene_id, episode_id):
+        # 不同目录下可能有同名的场景文件，文件名中加上完整scene_id的短哈希
+        scene_hash = hashlib.sha1(scene_id.encode()).hexdigest()[:8]
+        return os.path.join(log_dir, f"{os.path.basename(scene_id)}_{scene_hash}_{episode_id}.npz")
+
+    def save(self, log_dir):
+        """保存为 {log_dir}/{场景文件名}_{scene_id哈希}_{episode_id}.npz，返回文件路径"""
+        os.makedirs(log_dir, exist_ok=True)
+        names = sorted({name for step in self._metrics for name in step})
+        path = self.path(log_dir, self.scene_id, self.episode_id)
+        np.savez_compressed(
+            path,
+            scene_id=self.scene_id,
+            episode_id=self.episode_id,
+            position=self.positions,
+            rotation=self.rotations,
+            action=self.actions,
+            metric_names=np.array(names, dtype=str),
+            metrics=np.stack([self.metric(name) for name in names], axis=1) if names else np.zeros((len(self), 0)),
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            log = cls(str(data["scene_id"]), str(data["episode_id"]))
+            log._positions = list(data["position"])
+            log._rotations = list(data["rotation"])
+            log._actions = data["action"].tolist()
+            names = data["metric_names"].tolist()
+            log._metrics = [dict(zip(names, row.tolist())) for row in data["metrics"]]
+        return log
+
+
+def replay_episode(env, episode, log, position_tolerance=1e-3):
+    """
+    在env（可以使用带顶视图地图等可视化测量的配置）中重放记录的动作，逐步产出观测和指标
+
+    参数:
+    env: habitat.Env
+    episode: 与log对应的episode（dataset.episodes中的对象）
+    log: EpisodeLog
+    position_tolerance: 重放位置与记录位置的最大偏差（米），超出时说明仿真不确定（如动作噪声），抛出RuntimeError
+
+    返回:
+    生成器，产出 (observations, metrics)，第一个为reset之后的状态
+    """
+    env.current_episode = episode
+    observations = env.reset()
+    positions = log.positions
+    for step, action in enumerate(log.actions):
+        if action != NO_ACTION:
+            observations = env.step(int(action))
+        position = np.asarray(env.sim.get_agent_state().position, dtype=np.float32)
+        if np.linalg.norm(position - positions[step]) > position_tolerance:
+            raise RuntimeError(f"episode {log.episode_id} 第{step}步重放位置 {position} 与记录 {positions[step]} 不一致")
+        yield observations, env.get_metrics()
@@ -0,0 +1,276 @@
+"""
+多进程episode评估：把数据集的episode按场景分组切成小批，worker进程各自创建一个环境（habitat.Env），
+从任务队列领取批次逐个评估（同一批的episode属于同一场景，减少场景切换），
+每个episode结束后立即把指标（success、spl、collisions、distance_to_goal等）和耗时发回父进程，
+父进程汇总并写出JSON/CSV报告
+"""
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+from metrics_utils import flatten_metrics
+
+
+def make_batches(episodes, batch_size=4):
+    """
+    episode下标按场景分组（保持数据集中的顺序），每组切成不超过batch_size个的小批
+
+    返回:
+    list: 每个元素是一批episode下标
+    """
+    by_scene = {}
+    for index, episode in enumerate(episodes):
+        by_scene.setdefault(episode.scene_id, []).append(index)
+    return [
+        indices[start : start + batch_size]
+        for indices in by_scene.values()
+        for start in range(0, len(indices), batch_size)
+    ]
+
+
+def run_episode(env, agent, episode):
+    """
+    评估一个episode
+
+    返回:
+    dict: episode_id、scene_id、steps、time（秒）以及展平后的指标
+    """
+    start = time.perf_counter()
+    env.current_episode = episode
+    observations = env.reset()
+    agent.reset()
+    steps = 0
+    while not env.episode_over:
+        action = agent.act(observations)
+        if action is None:
+            break
+        observations = env.step(action)
+        steps += 1
+    metrics = flatten_metrics(env.get_metrics())
+    return {
+        "episode_id": str(episode.episode_id),
+        "scene_id": episode.scene_id,
+        "steps": steps,
+        "time": time.perf_counter() - start,
+        **metrics,
+    }
+
+
+def _eval_worker(worker_id, make_env, make_agent, episodes, tasks, results):
+    """worker进程主循环：领取episode批次，每评估完一个episode就发回结果"""
+    try:
+        env = make_env(worker_id)
+        try:
+            agent = make_agent(env)
+            while True:
+                batch = tasks.get()
+                if batch is None:
+                    break
+                for index in batch:
+                    record = run_episode(env, agent, episodes[index])
+                    record["worker"] = worker_id
+                    results.put(("episode", record))
+        finally:
+            env.close()
+    except Exception:
+        results.put(("error", f"worker {worker_id}:\n{traceback.format_exc()}"))
+    finally:
+        results.put(("done", worker_id))
+
+
+def evaluate(make_env, make_agent, episodes, num_workers=None, batch_size=4):
+    """
+    多进程评估所有episode，按完成顺序逐个产出结果
+
+    参数:
+    make_env: make_env(worker_id) -> 环境（habitat.Env或StandInNavEnv），在worker进程中调用
+    make_agent: make_agent(env) -> 智能体（habitat.core.agent.Agent接口：reset() / act(observations)）
+    episodes: 要评估的episode列表（worker进程通过fork继承，只传递下标）
+    num_workers: worker进程数，None为CPU核数，0表示在当前进程中评估
+    batch_size: 每次领取的episode数
+
+    返回:
+    生成器，产出每个episode的结果字典（见run_episode，另含worker）
+    """
+    num_workers = os.cpu_count() if num_workers is None else num_workers
+    batches = make_batches(episodes, batch_size)
+    if num_workers == 0:
+        env = make_env(0)
+        try:
+            agent = make_agent(env)
+            for batch in batches:
+                for index in batch:
+                    yield {**run_episode(env, agent, episodes[index]), "worker": 0}
+        finally:
+            env.close()
+        return
+
+    ctx = mp.get_context("fork")
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    for batch in batches:
+        tasks.put(batch)
+    for _ in range(num_workers):
+        tasks.put(None)
+    processes = [
+        ctx.Process(target=_eval_worker, args=(worker_id, make_env, make_agent, episodes, tasks, results), daemon=True)
+        for worker_id in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+
+    errors = []
+    running = set(range(num_workers))
+    try:
+        while running:
+            try:
+                message = results.get(timeout=1.0)
+            except queue.Empty:
+                # worker被系统杀死（如段错误）时收不到done消息
+                for worker_id in list(running):
+                    if not processes[worker_id].is_alive() and processes[worker_id].exitcode != 0:
+                        errors.append(f"worker {worker_id}: 异常退出（exitcode={processes[worker_id].exitcode}）")
+                        running.discard(worker_id)
+                continue
+            if message[0] == "episode":
+                yield message[1]
+            elif message[0] == "error":
+                errors.append(message[1])
+            else:
+                running.discard(message[1])
+    finally:
+        for process in processes:
+            if running:
+                process.terminate()
+            process.join()
+    if errors:
+        raise RuntimeError("评估进程出错:\n" + "\n".join(errors))
+
+
+def summarize(records, wall_time=None):
+    """
+    汇总每个episode的结果
+
+    返回:
+    dict: num_episodes、total_steps、各指标的平均值（mean/前缀），给出wall_time时还包括吞吐量
+    """
+    summary = {"num_episodes": len(records), "total_steps": int(sum(record["steps"] for record in records))}
+    keys = []
+    for record in records:
+        keys.extend(key for key in record if key not in keys and key not in ("episode_id", "scene_id", "worker"))
+    for key in keys:
+        values = [record[key] for record in records if key in record]
+        summary[f"mean/{key}"] = float(np.mean(values))
+    if wall_time is not None:
+        summary["wall_time"] = wall_time
+        summary["episodes_per_second"] = len(records) / wall_time if wall_time > 0 else 0.0
+        summary["steps_per_second"] = summary["total_steps"] / wall_time if wall_time > 0 else 0.0
+    return summary
+
+
+def write_report(records, output_dir, name="eval", wall_time=None):
+    """
+    写出 {name}.json（汇总和每个episode的结果）和 {name}.csv（每个episode一行）
+
+    返回:
+    dict: 汇总结果
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # 数字ID按数值顺序排列
+    records = sorted(records, key=lambda record: (record["scene_id"], len(record["episode_id"]), record["episode_id"]))
+    summary = summarize(records, wall_time)
+    with open(os.path.join(output_dir, f"{name}.json"), "w") as f:
+        json.dump({"summary": summary, "episodes": records}, f, indent=2)
+
+    # 不同episode的指标可能不完全相同，取所有列的并集
+    fields = []
+    for record in records:
+        fields.extend(key for key in record if key not in fields)
+    with open(os.path.join(output_dir, f"{name}.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(records)
+    return summary
+
+
+class PlannerAgent:
+    """用OraclePlanner回放最短路径动作的评估智能体"""
+
+    def __init__(self, env, goal_radius):
+        from oracle_planner import OraclePlanner
+
+        self.env = env
+        self.planner = OraclePlanner(env.sim, goal_radius)
+
+    def reset(self):
+        self.planner.reset(self.env.current_episode)
+
+    def act(self, observations):
+        return self.planner.get_next_action()
+
+
+class _StandInOracleAgent:
+    def __init__(self, env):
+        self.env = env
+
+    def reset(self):
+        pass
+
+    def act(self, observations):
+        return self.env.oracle_action()
+
+
+if __name__ == "__main__":
+    # 测试吞吐量随worker数的变化：python eval_runner.py --workers 1 2 4
+    # 默认使用替身环境；指定--config时用habitat.Env评估数据集中的episode
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--episodes", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--resolution", type=int, default=128)
+    parser.add_argument("--config", default=None)
+    parser.add_argument("--output-dir", default="./eval_reports")
+    args = parser.parse_args()
+
+    if args.config is not None:
+        import habitat
+
+        config = habitat.get_config(config_path=args.config)
+        # 在父进程中加载一次数据集，worker进程通过fork继承
+        dataset = habitat.make_dataset(id_dataset=config.habitat.dataset.type, config=config.habitat.dataset)
+        episodes = dataset.episodes[: args.episodes]
+        goal_radius = config.habitat.task.measurements.success.success_distance
+
+        def make_env(worker_id):
+            return habitat.Env(config=config, dataset=dataset)
+
+        def make_agent(env):
+            return PlannerAgent(env, goal_radius)
+
+    else:
+        from stand_in_sim import StandInNavEnv, make_stand_in_episodes
+
+        settings = {"width": args.resolution, "height": args.resolution, "sensor_height": 1.5, "seed": 1}
+        episodes = make_stand_in_episodes(args.episodes, seed=1)
+
+        def make_env(worker_id):
+            return StandInNavEnv({**settings, "seed": settings["seed"] + worker_id}, episodes)
+
+        make_agent = _StandInOracleAgent
+
+    for num_workers in args.workers:
+        start = time.time()
+        records = list(evaluate(make_env, make_agent, episodes, num_workers, args.batch_size))
+        summary = write_report(records, args.output_dir, f"eval_workers{num_workers}", time.time() - start)
+        print(
+            f"workers={num_workers} episodes={summary['num_episodes']} "
+            f"{summary['episodes_per_second']:.2f} episodes/s {summary['steps_per_second']:.1f} steps/s "
+            f"success={summary.get('mean/success', 0):.3f} spl={summary.get('mean/spl', 0):.3f}"
+        )
@@ -0,0 +1,172 @@
+"""
+无界面的观测帧写出器：用NumPy拼接 RGB | 语义 | 深度 面板，交给后台线程池编码为PNG/JPEG，
+替代display_sample中每帧创建matplotlib图像、savefig并暂停的做法
+"""
+import os
+import queue
+import threading
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+from PIL import Image  # PIL/Pillow：图像处理（读、写、裁剪等）
+
+from habitat_sim.utils.common import d3_40_colors_rgb  # 语义类别的40色调色板
+
+
+def colorize_semantic(semantic_obs) -> np.ndarray:
+    """
+    语义观测按d3_40_colors_rgb调色板上色（向量化查表，替代putpalette + putdata）
+
+    返回:
+    np.ndarray: (H, W, 3) uint8图像
+    """
+    return d3_40_colors_rgb[semantic_obs % 40]
+
+
+def colorize_depth(depth_obs, max_depth=10.0) -> np.ndarray:
+    """
+    深度观测线性映射到灰度（0~max_depth米 -> 0~255），返回 (H, W, 3) uint8图像
+    """
+    gray = np.clip(depth_obs / max_depth * 255, 0, 255).astype(np.uint8)
+    return np.repeat(gray[..., None], 3, axis=2)
+
+
+def compose_panel(rgb_obs, semantic_obs=None, depth_obs=None) -> np.ndarray:
+    """
+    把RGB、语义、深度观测横向拼接为一张图
+
+    参数:
+    rgb_obs: (H, W, 4) 或 (H, W, 3) RGB(A)观测
+    semantic_obs: 可选的 (H, W) 语义观测
+    depth_obs: 可选的 (H, W) 深度观测（米）
+
+    返回:
+    np.ndarray: (H, W * 面板数, 3) uint8图像
+    """
+    panels = [rgb_obs[..., :3]]
+    if semantic_obs is not None and semantic_obs.size != 0:
+        panels.append(colorize_semantic(semantic_obs))
+    if depth_obs is not None and depth_obs.size != 0:
+        panels.append(colorize_depth(depth_obs))
+    return np.concatenate(panels, axis=1)
+
+
+class FrameWriter:
+    """
+    后台线程池编码并保存观测帧，主循环只负责拼接面板并放入有界队列
+
+    参数:
+    output_dir: 输出目录
+    prefix: 文件名前缀，文件名为 {prefix}_{序号}.{fmt}
+    fmt: 图像格式，"png" 或 "jpg"
+    num_threads: 编码线程数（PIL编码时会释放GIL）
+    max_queue: 队列中最多等待编码的帧数，限制内存占用
+    drop_when_full: 队列满时为True则丢弃新帧（仿真循环永不等待），否则等待队列空出
+    """
+
+    def __init__(self, output_dir, prefix="frame", fmt="png", num_threads=4, max_queue=64, drop_when_full=False):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.fmt = fmt
+        self.drop_when_full = drop_when_full
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self._next_index = 0
+        self._error = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        os.makedirs(output_dir, exist_ok=True)
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(num_threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, frame = item
+            try:
+                img = Image.fromarray(frame)
+                if self.fmt == "png":
+                    # 压缩级别1：文件稍大但编码快得多
+                    img.save(path, format="PNG", compress_level=1)
+                else:
+                    img.save(path, format="JPEG", quality=90)
+            except Exception as e:
+                # 记录第一个异常并结束该线程，由write/close在主线程重新抛出；删除写了一半的文件
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            with self._lock:
+                self.frames_written += 1
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, item):
+        """
+        放入队列，队列满时等待空位
+
+        返回:
+        bool: 是否放入；编码线程已全部退出（不会再有空位）时返回False
+        """
+        while True:
+            try:
+                self._queue.put(item, timeout=1.0)
+                return True
+            except queue.Full:
+                if not any(thread.is_alive() for thread in self._threads):
+                    return False
+
+    def write(self, rgb_obs, semantic_obs=None, depth_obs=None):
+        """
+        拼接一帧观测并放入编码队列
+
+        返回:
+        str 或 None: 该帧的输出路径；帧被丢弃时返回None
+        """
+        return self.write_frame(compose_panel(rgb_obs, semantic_obs, depth_obs))
+
+    def write_frame(self, frame):
+        """
+        直接把一张 (H, W, 3) uint8 图像放入编码队列（放入后调用方不应再修改该数组）
+        """
+        self._raise_error()
+        path = os.path.join(self.output_dir, f"{self.prefix}_{self._next_index}.{self.fmt}")
+        if self.drop_when_full:
+            try:
+                self._queue.put_nowait((path, frame))
+            except queue.Full:
+                self.frames_dropped += 1
+                return None
+        elif not self._put((path, frame)):
+            # 线程只会因编码异常提前退出
+            self._raise_error()
+        self._next_index += 1
+        return path
+
+    def _shutdown(self):
+        for _ in self._threads:
+            if not self._put(None):
+                break
+        for thread in self._threads:
+            thread.join()
+
+    def close(self):
+        """等待队列中的帧全部写完并结束线程；有帧编码失败时抛出第一个异常"""
+        self._shutdown()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # 已有异常（可能就是write重新抛出的编码异常）时只结束线程，不再抛出
+            self._shutdown()
@@ -0,0 +1,205 @@
+"""
+顶视图可导航网格上的测地距离场：一次为大量目标点计算"每个像素到目标的最短路径长度"，
+之后的距离查询只是一次数组索引，不再调用pathfinder.find_path
+"""
+import multiprocessing as mp
+import os
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+import scipy.ndimage as ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from topdown_map import get_navigable_grid, grid_indices, grid_spacing
+
+# 距离以厘米存为uint16，该值表示不可达
+UNREACHABLE = np.iinfo(np.uint16).max
+
+# worker进程中的网格图（fork时从父进程继承，不需要序列化）
+_worker_graph = None
+
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _distances_cm(graph, goal_nodes):
+    """对一批目标节点运行Dijkstra，返回 (目标数, 节点数) 的uint16厘米距离"""
+    distances = dijkstra(graph, directed=False, indices=goal_nodes)
+    distances_cm = np.full(distances.shape, UNREACHABLE, dtype=np.uint16)
+    reachable = np.isfinite(distances)
+    distances_cm[reachable] = np.minimum(np.rint(distances[reachable] * 100), UNREACHABLE - 1)
+    return distances_cm
+
+
+def _distances_task(goal_nodes):
+    return _distances_cm(_worker_graph, goal_nodes)
+
+
+def build_grid_graph(navigable, spacing):
+    """
+    把可导航网格构造成8邻接的无向图，边权为像素间的欧氏距离（米）。
+    对角边只在两侧的直角邻居都可导航时才连接，避免穿墙角
+
+    参数:
+    navigable: (H, W) bool可导航性数组
+    spacing: 像素间距 (行方向dz, 列方向dx)
+
+    返回:
+    (graph, node_index): 稀疏图，以及 (H, W) 的像素到节点下标映射（不可导航为-1）
+    """
+    height, width = navigable.shape
+    node_index = np.full((height, width), -1, dtype=np.int64)
+    node_index[navigable] = np.arange(np.count_nonzero(navigable))
+    dz, dx = spacing
+
+    rows, cols, weights = [], [], []
+    # 每对邻居只取一个方向：右、下、右下、左下
+    for dr, dc, weight in [(0, 1, dx), (1, 0, dz), (1, 1, np.hypot(dx, dz)), (1, -1, np.hypot(dx, dz))]:
+        a = (slice(0, height - dr), slice(max(0, -dc), width - max(0, dc)))
+        b = (slice(dr, height), slice(max(0, dc), width + min(0, dc)))
+        connected = navigable[a] & navigable[b]
+        if dr and dc:
+            # 对角边要求两个直角邻居也可导航
+            side_a = (slice(0, height - dr), b[1])
+            side_b = (slice(dr, height), a[1])
+            connected &= navigable[side_a] & navigable[side_b]
+        rows.append(node_index[a][connected])
+        cols.append(node_index[b][connected])
+        weights.append(np.full(np.count_nonzero(connected), weight))
+
+    num_nodes = int(np.count_nonzero(navigable))
+    graph = coo_matrix(
+        (np.concatenate(weights), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(num_nodes, num_nodes),
+    ).tocsr()
+    return graph, node_index
+
+
+class GeodesicField:
+    """
+    顶视图网格上多个目标点的测地距离场（8邻接Dijkstra），距离以uint16厘米紧凑存储
+
+    参数:
+    navigable: (H, W) bool可导航性数组（与get_topdown_map的网格一致）
+    x_coords: 列对应的x坐标（一维数组）
+    z_coords: 行对应的z坐标（一维数组）
+    meters_per_pixel: 每个像素代表的米数
+    """
+
+    def __init__(self, navigable, x_coords, z_coords, meters_per_pixel):
+        self.navigable = np.asarray(navigable, dtype=bool)
+        self.x_coords = x_coords
+        self.z_coords = z_coords
+        self.meters_per_pixel = meters_per_pixel
+        self.graph, self.node_index = build_grid_graph(
+            self.navigable, grid_spacing(x_coords, z_coords, meters_per_pixel)
+        )
+        # 每个像素最近的可导航像素的节点下标（目标点吸附使用；没有可导航像素时全为-1）
+        _, (near_rows, near_cols) = ndimage.distance_transform_edt(~self.navigable, return_indices=True)
+        self._nearest_node = self.node_index[near_rows, near_cols]
+        self.goal_positions = np.zeros((0, 3))
+        # (目标数, 可导航节点数) 的厘米距离
+        self.distances_cm = np.zeros((0, self.graph.shape[0]), dtype=np.uint16)
+
+    @classmethod
+    def from_pathfinder(cls, pathfinder, height, meters_per_pixel, sampler=None):
+        """
+        查询导航网格在指定高度的可导航性并构建距离场（网格与get_topdown_map一致）
+        """
+        navigable, x_coords, z_coords = get_navigable_grid(pathfinder, height, meters_per_pixel, sampler)
+        return cls(navigable, x_coords, z_coords, meters_per_pixel)
+
+    def _nodes(self, positions):
+        """世界坐标对应的图节点下标，不可导航或超出地图为-1"""
+        rows, cols, inside = grid_indices(positions, self.x_coords, self.z_coords, self.meters_per_pixel)
+        return np.where(inside, self.node_index[rows, cols], -1)
+
+    def _snap_goals(self, goals):
+        """把目标点吸附到最近的可导航像素，地图上没有可导航像素时抛出ValueError"""
+        rows, cols, _ = grid_indices(goals, self.x_coords, self.z_coords, self.meters_per_pixel)
+        goal_nodes = self._nearest_node[rows, cols]
+        missing = np.flatnonzero(goal_nodes < 0)
+        if len(missing):
+            raise ValueError(f"目标点无法吸附到可导航像素（地图上没有可导航像素）: {goals[missing].tolist()}")
+        return goal_nodes
+
+    def compute(self, goals, num_workers=None, chunk_goals=8):
+        """
+        为一批目标点计算距离场，目标分块后在进程池中并行运行Dijkstra
+
+        参数:
+        goals: (G, 3) 目标点世界坐标
+        num_workers: worker进程数，默认为CPU核数；0表示在本进程中计算
+        chunk_goals: 每个任务包含的目标数
+        """
+        goals = np.asarray(goals, dtype=np.float64).reshape(-1, 3)
+        goal_nodes = self._snap_goals(goals)
+        num_workers = os.cpu_count() if num_workers is None else num_workers
+
+        chunks = [goal_nodes[i : i + chunk_goals] for i in range(0, len(goal_nodes), chunk_goals)]
+        if num_workers == 0 or len(chunks) <= 1:
+            results = [_distances_cm(self.graph, chunk) for chunk in chunks]
+        else:
+            # 使用fork启动worker，网格图直接从父进程继承
+            ctx = mp.get_context("fork")
+            with ctx.Pool(min(num_workers, len(chunks)), initializer=_init_worker, initargs=(self.graph,)) as pool:
+                results = pool.map(_distances_task, chunks)
+
+        self.goal_positions = goals
+        if results:
+            self.distances_cm = np.concatenate(results, axis=0)
+        else:
+            self.distances_cm = np.zeros((0, self.graph.shape[0]), dtype=np.uint16)
+
+    def distance(self, positions, goal_index=None) -> np.ndarray:
+        """
+        查询世界坐标到目标点的测地距离（米），不可达或不可导航为inf
+
+        参数:
+        positions: (N, 3) 或 (3,) 世界坐标
+        goal_index: 目标下标；为None时返回到所有目标的距离
+
+        返回:
+        np.ndarray: goal_index给定时形状为 (N,)，否则为 (N, G)
+        """
+        nodes = self._nodes(positions)
+        if goal_index is None:
+            distances_cm = self.distances_cm[:, np.maximum(nodes, 0)].T
+            valid = (distances_cm != UNREACHABLE) & (nodes >= 0)[..., None]
+        else:
+            distances_cm = self.distances_cm[goal_index, np.maximum(nodes, 0)]
+            valid = (distances_cm != UNREACHABLE) & (nodes >= 0)
+        return np.where(valid, distances_cm.astype(np.float32) / 100, np.float32(np.inf))
+
+    def field(self, goal_index) -> np.ndarray:
+        """
+        返回某个目标的整张距离场 (H, W)，单位米，不可达为inf
+        """
+        field = np.full(self.navigable.shape, np.inf, dtype=np.float32)
+        distances_cm = self.distances_cm[goal_index]
+        reachable = distances_cm != UNREACHABLE
+        field[self.navigable] = np.where(reachable, distances_cm / np.float32(100), np.inf)
+        return field
+
+    def save(self, path):
+        """把距离场保存为压缩的.npz文件"""
+        np.savez_compressed(
+            path,
+            navigable=self.navigable,
+            x_coords=self.x_coords,
+            z_coords=self.z_coords,
+            meters_per_pixel=self.meters_per_pixel,
+            goal_positions=self.goal_positions,
+            distances_cm=self.distances_cm,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """从save保存的.npz文件恢复距离场"""
+        with np.load(path) as data:
+            geodesic = cls(data["navigable"], data["x_coords"], data["z_coords"], float(data["meters_per_pixel"]))
+            geodesic.goal_positions = data["goal_positions"]
+            geodesic.distances_cm = data["distances_cm"]
+        return geodesic
@@ -1,72 +1,28 @@
 import math
 import os
+
 import magnum as mn  # 3D图形/线性代数库（Habitat-Sim依赖）
 import numpy as np  # 数值计算（数组、矩阵操作）
-import scipy.ndimage as ndimage
 from matplotlib import pyplot as plt  # 绘图库
 
-from PIL import Image, ImageDraw  # PIL/Pillow：图像处理（读、写、裁剪等）
+from PIL import Image  # PIL/Pillow：图像处理（读、写、裁剪等）
 
 import habitat_sim  # Habitat-Sim主库（仿真核心）
 from habitat_sim.utils import common as utils  # 通用工具函数（如坐标转换、数据格式处理）
 from habitat_sim.utils import viz_utils as vut  # 可视化工具函数（如绘制场景、轨迹
-
-def make_cfg(settings):
-    """
-    创建仿真器配置对象
-    """
-    sim_cfg = habitat_sim.SimulatorConfiguration()
-    sim_cfg.gpu_device_id = 0
-    sim_cfg.scene_id = settings["scene"]
-    sim_cfg.scene_dataset_config_file = settings["scene_dataset"] # 场景数据集配置文件
-    sim_cfg.enable_physics = settings["enable_physics"]
-
-    # 注意：所有传感器必须具有相同的分辨率
-    sensors = {
-        "color_sensor": {
-            "sensor_type": habitat_sim.SensorType.COLOR,
-            "resolution": [settings["height"], settings["width"]],
-            "position": [0.0, settings["sensor_height"], 0.0],
-        },
-        "depth_sensor": {
-            "sensor_type": habitat_sim.SensorType.DEPTH,
-            "resolution": [settings["height"], settings["width"]],
-            "position": [0.0, settings["sensor_height"], 0.0],
-        },
-        "semantic_sensor": {
-            "sensor_type": habitat_sim.SensorType.SEMANTIC,
-            "resolution": [settings["height"], settings["width"]],
-            "position": [0.0, settings["sensor_height"], 0.0],
-        },
-    }
-
-    sensor_specs = []
-    for sensor_uuid, sensor_params in sensors.items():
-        if settings[sensor_uuid]:
-            sensor_spec = habitat_sim.CameraSensorSpec()
-            sensor_spec.uuid = sensor_uuid
-            sensor_spec.sensor_type = sensor_params["sensor_type"]
-            sensor_spec.resolution = sensor_params["resolution"]
-            sensor_spec.position = sensor_params["position"]
-
-            sensor_specs.append(sensor_spec)
-
-    # 在这里可以指定前进动作的位移量和转向角度
-    agent_cfg = habitat_sim.agent.AgentConfiguration()
-    agent_cfg.sensor_specifications = sensor_specs
-    agent_cfg.action_space = {
-        "move_forward": habitat_sim.agent.ActionSpec(
-            "move_forward", habitat_sim.agent.ActuationSpec(amount=0.25)
-        ),
-        "turn_left": habitat_sim.agent.ActionSpec(
-            "turn_left", habitat_sim.agent.ActuationSpec(amount=30.0)
-        ),
-        "turn_right": habitat_sim.agent.ActionSpec(
-            "turn_right", habitat_sim.agent.ActuationSpec(amount=30.0)
-        ),
-    }
-
-    return habitat_sim.Configuration(sim_cfg, [agent_cfg])
+from frame_writer import FrameWriter, colorize_semantic  # 无界面的观测帧写出（后台线程编码）
+from map_cache import TopdownMapCache  # 顶视图地图磁盘缓存
+from lazy_sensors import LazySimulator  # 按需渲染传感器（只渲染本步实际用到的观测）
+from map_draw import draw_agents, draw_paths  # 直接在地图数组上批量绘制路径和智能体
+from obs_recorder import ObservationRecorder  # 观测数据集记录（分块压缩存储）
+from occupancy_map import OccupancyMapper  # 深度观测增量融合为占据栅格
+from path_cache import PathCache  # find_path缓存
+from path_render import look_at_quaternions, render_path, resample_path  # 路径重采样、批量计算朝向、批量渲染
+from sim_factory import get_simulator  # 共享的仿真器配置和仿真器池（同一进程内相同配置直接复用）
+from scene_index import load_scene_index  # 语义物体空间索引（按场景文件缓存）
+from topdown_map import MapFrame, NavigabilitySampler  # 地图坐标系、多进程批量查询可导航性
+from video_stream import VideoStreamWriter  # 流式视频写出（后台进程编码）
+from visible_objects import VisibleObjectTable  # 每帧可见物体统计（列式表）
 
 def display_map(topdown_map, key_points=None):
     """
@@ -89,98 +45,13 @@ def display_map(topdown_map, key_points=None):
     plt.pause(3)  # 显示3秒（可修改秒数）
     plt.close()
 
-def get_topdown_map(pathfinder, height, meters_per_pixel) -> np.ndarray:
-    """
-    实现旧版本maps.get_topdown_map的核心功能：
-    返回值：0（不可导航）、1（可导航）、2（边界）的二维数组
-    """
-    # 获取场景的导航边界（x, z轴，忽略y轴高度）
-    bounds = pathfinder.get_bounds()
-    min_x, _, min_z = bounds[0]
-    max_x, _, max_z = bounds[1]
-
-    # 计算地图的像素尺寸（x对应宽度，z对应高度）
-    map_width = int(np.ceil((max_x - min_x) / meters_per_pixel))
-    map_height = int(np.ceil((max_z - min_z) / meters_per_pixel))
-
-    # 初始化地图：0=不可导航，1=可导航
-    topdown_map = np.zeros((map_height, map_width), dtype=np.uint8)
-
-    # 遍历每个像素，判断是否可导航（优化：用向量化操作替代双重循环，提升速度）
-    x_coords = np.linspace(min_x, max_x, map_width, endpoint=False)
-    z_coords = np.linspace(min_z, max_z, map_height, endpoint=False)
-    x_grid, z_grid = np.meshgrid(x_coords, z_coords)
-    # 构造(x, height, z)的坐标数组
-    world_coords = np.stack([x_grid.ravel(), np.full_like(x_grid.ravel(), height), z_grid.ravel()], axis=1)
-    # 批量判断是否可导航
-    navigable = np.array([pathfinder.is_navigable(coord) for coord in world_coords])
-    # 重塑为地图尺寸
-    topdown_map = navigable.reshape((map_height, map_width)).astype(np.uint8)
-
-    # 计算边界（可选，匹配旧版本的2值）
-    edges = ndimage.laplace(topdown_map) != 0
-    topdown_map[edges] = 2
-
-    return topdown_map
-
-
-def to_grid(z, x, grid_dimensions, pathfinder):
-    # 获取导航网格的边界（min_x, _, min_z）和（max_x, _, max_z）
-    min_bounds = pathfinder.get_bounds()[0]
-    max_bounds = pathfinder.get_bounds()[1]
-    min_x, _, min_z = min_bounds
-    max_x, _, max_z = max_bounds
-
-    # 归一化x到[0, grid_width-1]，z到[0, grid_height-1]
-    grid_height, grid_width = grid_dimensions
-    px = (x - min_x) / (max_x - min_x) * (grid_width - 1)
-    py = (z - min_z) / (max_z - min_z) * (grid_height - 1)
-
-    # 限制坐标在地图范围内，避免越界
-    px = np.clip(px, 0, grid_width - 1)
-    py = np.clip(py, 0, grid_height - 1)
-
-    # 转换为整数像素坐标（与旧版本行为一致）
-    return int(round(py)), int(round(px))
-
-def draw_path(top_down_map, trajectory, color=(255, 0, 0), thickness=2):
-    # 转换为PIL Image以便绘制线段（也可用OpenCV）
-    img = Image.fromarray(top_down_map)
-    draw = ImageDraw.Draw(img)
-
-    # 遍历轨迹点，绘制线段
-    for i in range(len(trajectory) - 1):
-        # PIL的坐标是（x, y），对应网格坐标的（px, py）
-        start = (trajectory[i][1], trajectory[i][0])
-        end = (trajectory[i+1][1], trajectory[i+1][0])
-        draw.line([start, end], fill=color, width=thickness)
-
-    # 转换回numpy数组
-    top_down_map[:] = np.array(img)
-
-def draw_agent(top_down_map, agent_pos, angle, agent_radius_px=8, agent_color=(0, 255, 0), arrow_color=(0, 0, 255)):
-    # 转换为PIL Image以便绘制
-    img = Image.fromarray(top_down_map)
-    draw = ImageDraw.Draw(img)
-    py, px = agent_pos  # 网格坐标（行，列）
-    x, y = px, py  # PIL坐标（x=列，y=行）
-
-    # 1. 绘制智能体的圆形身体
-    # PIL的椭圆绘制需要左上角和右下角坐标
-    bbox = (x - agent_radius_px, y - agent_radius_px, x + agent_radius_px, y + agent_radius_px)
-    draw.ellipse(bbox, fill=agent_color, outline=(0, 0, 0), width=1)
-
-    # 2. 绘制朝向箭头（根据角度计算箭头终点）
-    arrow_length = agent_radius_px * 1.5
-    # 角度转换：math.atan2的角度是从x轴逆时针，这里调整为地图的朝向
-    end_x = x + arrow_length * math.cos(angle)
-    end_y = y + arrow_length * math.sin(angle)
-    draw.line([(x, y), (end_x, end_y)], fill=arrow_color, width=2)
-
-    # 转换回numpy数组
-    top_down_map[:] = np.array(img)
-
 display = True
+headless = False  # 为True时不弹出matplotlib窗口，观测帧由后台线程直接编码保存到./frames
+record_observations = False  # 为True时把路径点上渲染的观测和位姿记录到./recordings/pathfind
+collect_object_stats = False  # 为True时统计路径点上可见的物体（像素数、包围框、平均深度、类别），保存到./visible_objects_pathfind.npz
+build_occupancy = False  # 为True时把路径点上的深度观测融合为占据栅格（与顶视图网格对齐），保存到./occupancy_pathfind.png
+render_step = None  # 不为None时按该步长（米）重采样路径后再渲染，得到平滑的沿路径画面
+flythrough_video = False  # 为True时沿路径只渲染RGB并保存为./pathfind_flythrough.mp4
 test_scene = "../data/scene_datasets/mp3d_example/17DRP5sb8fy/17DRP5sb8fy.glb"
 mp3d_scene_dataset = "../data/scene_datasets/mp3d_example/mp3d.scene_dataset_config.json"
 rgb_sensor = True 
@@ -202,14 +73,18 @@ sim_settings = {
     "enable_physics": False,  # 仅运动学
 }
 
-cfg = make_cfg(sim_settings)
-sim = habitat_sim.Simulator(cfg)
+sim = get_simulator(sim_settings)  # 初始化仿真器（从仿真器池获取）
 
 meters_per_pixel = 0.12
+num_workers = None  # 查询可导航性的进程数（None=CPU核数，0=单进程）
+map_cache = TopdownMapCache("./topdown_cache")  # 顶视图地图缓存（场景、高度、分辨率不变时直接读取）
+adaptive_map = False  # 是否用由粗到细的自适应采样生成顶视图（只细化边界附近的块）
+path_cache = PathCache(sim.pathfinder, scene_id=test_scene, db_path="./path_cache.sqlite")  # find_path缓存（可跨进程共享）
 custom_height = False 
 height = 1  
 
 agent = sim.initialize_agent(sim_settings["default_agent"])
+lazy_sim = LazySimulator(sim, sim_settings["default_agent"])
 agent_state = habitat_sim.AgentState()
 agent_state.position = np.array([-0.6, 0.0, 0.0])  # 世界坐标系
 agent.set_state(agent_state)
@@ -220,18 +95,13 @@ def display_sample(rgb_obs, semantic_obs=np.array([]), depth_obs=np.array([])):
     """
     显示观测样本（RGB、语义分割、深度图）
     """
-    from habitat_sim.utils.common import d3_40_colors_rgb
-
     rgb_img = Image.fromarray(rgb_obs, mode="RGBA")
     global img_counter
 
     arr = [rgb_img]
     titles = ["rgb"]
     if semantic_obs.size != 0:
-        semantic_img = Image.new("P", (semantic_obs.shape[1], semantic_obs.shape[0]))
-        semantic_img.putpalette(d3_40_colors_rgb.flatten())
-        semantic_img.putdata((semantic_obs.flatten() % 40).astype(np.uint8))
-        semantic_img = semantic_img.convert("RGBA")
+        semantic_img = Image.fromarray(colorize_semantic(semantic_obs))
         arr.append(semantic_img)
         titles.append("semantic")
 
@@ -266,49 +136,46 @@ else:
     sample2 = sim.pathfinder.get_random_navigable_point()
     print("sample2:",sample2)
 
-    path = habitat_sim.ShortestPath()
-    path.requested_start = sample1
-    path.requested_end = sample2
-    found_path = sim.pathfinder.find_path(path)
-    geodesic_distance = path.geodesic_distance
-    path_points = path.points
+    # 带缓存的find_path（相同场景和起止点的查询直接返回缓存结果）
+    found_path, geodesic_distance, path_points = path_cache.find_path(sample1, sample2)
 
     print("found_path : " + str(found_path))
     print("geodesic_distance : " + str(geodesic_distance))
     print("path_points : " + str(path_points))
+    print("path_cache : " + str(path_cache.stats))
 
     if found_path:
         meters_per_pixel = 0.025
         scene_bb = sim.get_active_scene_graph().get_root_node().cumulative_bb
         height = scene_bb.y().min
         if display:
-            top_down_map = get_topdown_map(
-                sim.pathfinder, height, meters_per_pixel=meters_per_pixel
-            )
+            with NavigabilitySampler(sim.pathfinder, num_workers=num_workers) as sampler:
+                top_down_map = map_cache.get_topdown_map(
+                    sim.pathfinder,
+                    height,
+                    meters_per_pixel=meters_per_pixel,
+                    sampler=sampler,
+                    adaptive=adaptive_map,
+                )
+                if sampler.stats["points"] > 0:
+                    print("get_topdown_map: {points} points, {seconds:.2f}s, {points_per_sec:.0f} points/sec".format(**sampler.stats))
             recolor_map = np.array(
                 [[255, 255, 255], [128, 128, 128], [0, 0, 0]], dtype=np.uint8
             )
             top_down_map = recolor_map[top_down_map]
             grid_dimensions = (top_down_map.shape[0], top_down_map.shape[1])
-            # 将世界坐标系中的轨迹点转换为地图模块的网格点
-            trajectory = [
-                to_grid(
-                    path_point[2],
-                    path_point[0],
-                    grid_dimensions,
-                    pathfinder=sim.pathfinder,
-                )
-                for path_point in path_points
-            ]
+            # 将世界坐标系中的轨迹点批量转换为地图模块的网格点（行, 列）
+            map_frame = MapFrame.from_pathfinder(sim.pathfinder, grid_dimensions)
+            trajectory = map_frame.world_to_grid(np.array(path_points)).tolist()
             grid_tangent = mn.Vector2(
                 trajectory[1][1] - trajectory[0][1], trajectory[1][0] - trajectory[0][0]
             )
             path_initial_tangent = grid_tangent / grid_tangent.length()
             initial_angle = math.atan2(path_initial_tangent[0], path_initial_tangent[1])
             # 在地图上绘制智能体和轨迹
-            draw_path(top_down_map, trajectory)
-            draw_agent(
-                top_down_map, trajectory[0], initial_angle, agent_radius_px=8
+            draw_paths(top_down_map, [trajectory])
+            draw_agents(
+                top_down_map, [trajectory[0]], [initial_angle], agent_radius_px=8
             )
             print("\nDisplay the map with agent and path overlay:")
             display_map(top_down_map)
@@ -316,25 +183,66 @@ else:
         display_path_agent_renders = True
         if display_path_agent_renders:
             print("Rendering observations at path points:")
-            tangent = path_points[1] - path_points[0]
+            render_points = path_points if render_step is None else resample_path(path_points, render_step)
+            # 一次算出所有路径点朝向下一个点的旋转（代替逐点的look_at和四元数转换）
+            render_rotations = look_at_quaternions(render_points)
             agent_state = habitat_sim.AgentState()
-            for ix, point in enumerate(path_points):
-                if ix < len(path_points) - 1:
-                    tangent = path_points[ix + 1] - point
+            frame_writer = FrameWriter("./frames", prefix="pathfind2") if headless else None
+            recorder = ObservationRecorder("./recordings/pathfind") if record_observations else None
+            if collect_object_stats:
+                object_table = VisibleObjectTable(load_scene_index(sim.semantic_scene, test_scene))
+            if build_occupancy:
+                occupancy_mapper = OccupancyMapper.from_pathfinder(
+                    sim.pathfinder,
+                    meters_per_pixel,
+                    (sim_settings["height"], sim_settings["width"]),
+                    sensor_height=sim_settings["sensor_height"],
+                )
+            for ix, point in enumerate(render_points):
+                if ix < len(render_points) - 1:
                     agent_state.position = point
-                    tangent_orientation_matrix = mn.Matrix4.look_at(
-                        point, point + tangent, np.array([0, 1.0, 0])
-                    )
-                    tangent_orientation_q = mn.Quaternion.from_matrix(
-                        tangent_orientation_matrix.rotation()
-                    )
-                    agent_state.rotation = utils.quat_from_magnum(tangent_orientation_q)
+                    agent_state.rotation = utils.quat_from_coeffs(render_rotations[ix])
                     agent.set_state(agent_state)
 
-                    observations = sim.get_sensor_observations()
-                    rgb = observations["color_sensor"]
-                    semantic = observations["semantic_sensor"]
-                    depth = observations["depth_sensor"]
-
-                    if display:
-                        display_sample(rgb, semantic, depth)
\ No newline at end of file
+                    # 传感器在下面第一次访问时才渲染
+                    observations = lazy_sim.get_sensor_observations()
+
+                    if record_observations:
+                        recorder.append(
+                            observations, point, utils.quat_to_coeffs(agent_state.rotation)
+                        )
+
+                    if collect_object_stats:
+                        object_table.append(ix, observations["semantic_sensor"], observations["depth_sensor"])
+
+                    if build_occupancy:
+                        occupancy_mapper.update(
+                            observations["depth_sensor"], point, utils.quat_to_coeffs(agent_state.rotation)
+                        )
+
+                    if headless or display:
+                        rgb = observations["color_sensor"]
+                        semantic = observations["semantic_sensor"]
+                        depth = observations["depth_sensor"]
+                        if headless:
+                            frame_writer.write(rgb, semantic, depth)
+                        else:
+                            display_sample(rgb, semantic, depth)
+
+            if headless:
+                frame_writer.close()
+            if record_observations:
+                recorder.close()
+            if collect_object_stats:
+                object_table.save("./visible_objects_pathfind.npz")
+            if build_occupancy:
+                Image.fromarray(occupancy_mapper.to_image()).save("./occupancy_pathfind.png")
+
+        if flythrough_video:
+            # 按0.05米步长重采样，只渲染RGB
+            flythrough_points = resample_path(path_points, 0.05)
+            # 边渲染边编码，不在内存中保留整段视频
+            with VideoStreamWriter(".", "pathfind_flythrough", fps=30) as video:
+                for frames in render_path(sim, flythrough_points, look_at_quaternions(flythrough_points)):
+                    for frame in frames["color_sensor"]:
+                        video.append(frame[..., :3])
@@ -13,6 +13,12 @@ from PIL import Image  # PIL/Pillow：图像处理（读、写、裁剪等）
 import habitat_sim  # Habitat-Sim主库（仿真核心）
 from habitat_sim.utils import common as utils  # 通用工具函数（如坐标转换、数据格式处理）
 from habitat_sim.utils import viz_utils as vut  # 可视化工具函数（如绘制场景、轨迹）
+from frame_writer import FrameWriter, colorize_semantic  # 无界面的观测帧写出（后台线程编码）
+from lazy_sensors import LazySimulator  # 按需渲染传感器（只渲染本步实际用到的观测）
+from obs_recorder import ObservationRecorder  # 观测数据集记录（分块压缩存储）
+from scene_index import load_scene_index  # 语义物体空间索引（半径/包围盒/最近邻查询）
+from visible_objects import VisibleObjectTable  # 每帧可见物体统计（列式表）
+from sim_factory import get_simulator  # 共享的仿真器配置和仿真器池（同一进程内相同配置直接复用）
 # from habitat_sim.utils.visualizations import maps
 
 img_counter = 0
@@ -20,18 +26,13 @@ def display_sample(rgb_obs, semantic_obs=np.array([]), depth_obs=np.array([])):
     """
     显示观测样本（RGB、语义分割、深度图）
     """
-    from habitat_sim.utils.common import d3_40_colors_rgb
-
     rgb_img = Image.fromarray(rgb_obs, mode="RGBA")
     global img_counter
 
     arr = [rgb_img]
     titles = ["rgb"]
     if semantic_obs.size != 0:
-        semantic_img = Image.new("P", (semantic_obs.shape[1], semantic_obs.shape[0]))
-        semantic_img.putpalette(d3_40_colors_rgb.flatten())
-        semantic_img.putdata((semantic_obs.flatten() % 40).astype(np.uint8))
-        semantic_img = semantic_img.convert("RGBA")
+        semantic_img = Image.fromarray(colorize_semantic(semantic_obs))
         arr.append(semantic_img)
         titles.append("semantic")
 
@@ -55,30 +56,10 @@ def display_sample(rgb_obs, semantic_obs=np.array([]), depth_obs=np.array([])):
     plt.pause(3)  # 显示3秒（可修改秒数）
     plt.close()
 
-def make_simple_cfg(settings):
-    """
-    创建简单的仿真配置（仅RGB传感器）
-    """
-    # 仿真器后端配置
-    sim_cfg = habitat_sim.SimulatorConfiguration()
-    sim_cfg.scene_id = settings["scene"]
-
-    # 智能体配置
-    agent_cfg = habitat_sim.agent.AgentConfiguration()
-
-    # 在第一个例子中，我们只给智能体附加一个RGB视觉传感器
-    rgb_sensor_spec = habitat_sim.CameraSensorSpec()
-    rgb_sensor_spec.uuid = "color_sensor"
-    rgb_sensor_spec.sensor_type = habitat_sim.SensorType.COLOR
-    rgb_sensor_spec.resolution = [settings["height"], settings["width"]]
-    rgb_sensor_spec.position = habitat_sim.geo.UP * settings["sensor_height"]
-    rgb_sensor_spec.position = [0.0, settings["sensor_height"], 0.0]
-
-    agent_cfg.sensor_specifications = [rgb_sensor_spec]
-
-    return habitat_sim.Configuration(sim_cfg, [agent_cfg])
-
 display = True 
+headless = False # 为True时不弹出matplotlib窗口，观测帧由后台线程直接编码保存到./frames
+record_observations = False # 为True时把每一步的观测、位姿和动作记录到./recordings/random_walk
+collect_object_stats = False # 为True时统计每帧可见物体（像素数、包围框、平均深度、类别），保存到./visible_objects_random.npz
 
 test_scene = "../data/scene_datasets/mp3d_example/17DRP5sb8fy/17DRP5sb8fy.glb"
 mp3d_scene_dataset = "../data/scene_datasets/mp3d_example/mp3d.scene_dataset_config.json"
@@ -101,65 +82,8 @@ sim_settings = {
     "enable_physics": False,  # 仅运动学模拟
 }
 
-def make_cfg(settings):
-    """
-    创建完整的仿真配置（多传感器）
-    """
-    sim_cfg = habitat_sim.SimulatorConfiguration()
-    sim_cfg.gpu_device_id = 0
-    sim_cfg.scene_id = settings["scene"]
-    sim_cfg.scene_dataset_config_file = settings["scene_dataset"]
-    sim_cfg.enable_physics = settings["enable_physics"]
-
-    # 注意：所有传感器必须具有相同的分辨率
-    sensors = {
-        "color_sensor": {
-            "sensor_type": habitat_sim.SensorType.COLOR,
-            "resolution": [settings["height"], settings["width"]],
-            "position": [0.0, settings["sensor_height"], 0.0],
-        },
-        "depth_sensor": {
-            "sensor_type": habitat_sim.SensorType.DEPTH,
-            "resolution": [settings["height"], settings["width"]],
-            "position": [0.0, settings["sensor_height"], 0.0],
-        },
-        "semantic_sensor": {
-            "sensor_type": habitat_sim.SensorType.SEMANTIC,
-            "resolution": [settings["height"], settings["width"]],
-            "position": [0.0, settings["sensor_height"], 0.0],
-        },
-    }
-
-    sensor_specs = []
-    for sensor_uuid, sensor_params in sensors.items():
-        if settings[sensor_uuid]:
-            sensor_spec = habitat_sim.CameraSensorSpec()
-            sensor_spec.uuid = sensor_uuid
-            sensor_spec.sensor_type = sensor_params["sensor_type"]
-            sensor_spec.resolution = sensor_params["resolution"]
-            sensor_spec.position = sensor_params["position"]
-
-            sensor_specs.append(sensor_spec)
-
-    # 在这里可以指定前进动作的位移量和转向角度
-    agent_cfg = habitat_sim.agent.AgentConfiguration()
-    agent_cfg.sensor_specifications = sensor_specs
-    agent_cfg.action_space = {
-        "move_forward": habitat_sim.agent.ActionSpec(
-            "move_forward", habitat_sim.agent.ActuationSpec(amount=0.25)
-        ),
-        "turn_left": habitat_sim.agent.ActionSpec(
-            "turn_left", habitat_sim.agent.ActuationSpec(amount=30.0)
-        ),
-        "turn_right": habitat_sim.agent.ActionSpec(
-            "turn_right", habitat_sim.agent.ActuationSpec(amount=30.0)
-        ),
-    }
-
-    return habitat_sim.Configuration(sim_cfg, [agent_cfg])
-
-cfg = make_cfg(sim_settings)
-sim = habitat_sim.Simulator(cfg)
+sim = get_simulator(sim_settings)  # 初始化仿真器（从仿真器池获取）
+cfg = sim.config
 def print_scene_recur(scene, limit_output=10):
     """
     递归打印场景图信息（层级、区域、物体）
@@ -191,6 +115,7 @@ def print_scene_recur(scene, limit_output=10):
                 
 scene = sim.semantic_scene
 print_scene_recur(scene)
+scene_index = load_scene_index(scene, test_scene)  # 按场景文件缓存到磁盘，之后的运行直接读取
 random.seed(sim_settings["seed"])
 sim.seed(sim_settings["seed"])
 
@@ -203,21 +128,47 @@ agent.set_state(agent_state)
 # 获取智能体状态
 agent_state = agent.get_state()
 print("agent_state: position", agent_state.position, "rotation", agent_state.rotation)
+nearby = scene_index.query_radius(agent_state.position, 2.0)
+print("objects within 2m:", [(scene_index.object_ids[i], scene_index.categories[i]) for i in nearby[:10]])
 
 total_frames = 0
 action_names = list(cfg.agents[sim_settings["default_agent"]].action_space.keys())
 
 max_frames = 5
+frame_writer = FrameWriter("./frames", prefix="randomtest") if headless else None
+recorder = ObservationRecorder("./recordings/random_walk") if record_observations else None
+lazy_sim = LazySimulator(sim, sim_settings["default_agent"])
+object_table = VisibleObjectTable(scene_index) if collect_object_stats else None
 
 while total_frames < max_frames:
     action = random.choice(action_names)
     print("action", action)
-    observations = sim.step(action)
-    rgb = observations["color_sensor"]
-    semantic = observations["semantic_sensor"]
-    depth = observations["depth_sensor"]
+    # 传感器在下面第一次访问时才渲染；既不显示也不记录时本步不渲染任何传感器
+    observations = lazy_sim.step(action)
 
-    if display:
-        display_sample(rgb, semantic, depth)
+    if record_observations:
+        agent_state = agent.get_state()
+        recorder.append(
+            observations, agent_state.position, utils.quat_to_coeffs(agent_state.rotation), action
+        )
+
+    if collect_object_stats:
+        object_table.append(total_frames, observations["semantic_sensor"], observations["depth_sensor"])
+
+    if headless or display:
+        rgb = observations["color_sensor"]
+        semantic = observations["semantic_sensor"]
+        depth = observations["depth_sensor"]
+        if headless:
+            frame_writer.write(rgb, semantic, depth)
+        else:
+            display_sample(rgb, semantic, depth)
 
     total_frames += 1
+
+if headless:
+    frame_writer.close()
+if record_observations:
+    recorder.close()
+if collect_object_stats:
+    object_table.save("./visible_objects_random.npz")
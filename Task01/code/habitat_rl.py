@@ -10,9 +10,10 @@ import shutil
 import numpy as np
 
 import habitat
-from habitat.tasks.nav.shortest_path_follower import ShortestPathFollower
 from habitat.utils.visualizations import maps
-from habitat.utils.visualizations.utils import images_to_video
+
+from oracle_planner import OraclePlanner
+from video_stream import VideoStreamWriter
 
 IMAGE_DIR = os.path.dirname(os.path.abspath(__file__)) # 当前文件目录
 
@@ -69,14 +70,13 @@ def shortest_path_example():
         if goal_radius is None:
             goal_radius = config.habitat.simulator.forward_step_size
         
-        # 初始化最短路径跟随者
-        follower = ShortestPathFollower(
-            env.habitat_env.sim, goal_radius, False
-        )
+        # 初始化最短路径跟随者（每个episode一次算出完整动作序列并缓存，之后逐步回放）
+        planner = OraclePlanner(env.habitat_env.sim, goal_radius)
 
         print("Environment creation successful (环境创建成功)")
         for episode in range(3): # 运行3个episode
             env.reset()
+            planner.reset(env.habitat_env.current_episode)
             dirname = os.path.join(
                 IMAGE_DIR, "shortest_path_example", "%02d" % episode
             )
@@ -84,26 +84,24 @@ def shortest_path_example():
                 shutil.rmtree(dirname)
             os.makedirs(dirname)
             print("Agent stepping around inside environment (智能体在环境中移动).")
-            images = []
-            while not env.habitat_env.episode_over:
-                # 获取下一步的最优动作
-                best_action = follower.get_next_action(
-                    env.habitat_env.current_episode.goals[0].position
-                )
-                if best_action is None:
-                    break
-
-                # 执行动作
-                observations, reward, done, info = env.step(best_action)
-                im = observations["rgb"]
-                
-                # 绘制地图并拼接
-                top_down_map = draw_top_down_map(info, im.shape[0])
-                output_im = np.concatenate((im, top_down_map), axis=1)
-                images.append(output_im)
-            
-            # 生成视频
-            images_to_video(images, dirname, "trajectory")
+            # 帧在后台进程中边产生边编码，不在内存中累积整个episode
+            # 退出时等待剩余帧编码完成；出错时终止编码进程并删除不完整的视频
+            with VideoStreamWriter(dirname, "trajectory") as video:
+                while not env.habitat_env.episode_over:
+                    # 获取下一步的最优动作
+                    best_action = planner.get_next_action()
+                    if best_action is None:
+                        break
+
+                    # 执行动作
+                    observations, reward, done, info = env.step(best_action)
+                    im = observations["rgb"]
+
+                    # 绘制地图并拼接
+                    top_down_map = draw_top_down_map(info, im.shape[0])
+                    output_im = np.concatenate((im, top_down_map), axis=1)
+                    video.append(output_im)
+
             print("Episode finished")
 
 
@@ -4,24 +4,21 @@ from PIL import Image  # PIL/Pillow：图像处理（读、写、裁剪等）
 import habitat_sim  # Habitat-Sim主库（仿真核心）
 from habitat_sim.utils import common as utils  # 通用工具函数（如坐标转换、数据格式处理）
 from habitat_sim.utils import viz_utils as vut  # 可视化工具函数（如绘制场景、轨迹）
+from frame_writer import FrameWriter, colorize_semantic  # 无界面的观测帧写出（后台线程编码）
+from sim_factory import get_simulator  # 共享的仿真器配置和仿真器池（同一进程内相同配置直接复用）
 
 img_counter = 0
 def display_sample(rgb_obs, semantic_obs=np.array([]), depth_obs=np.array([])):
     """
     显示观测样本（RGB、语义分割、深度图）
     """
-    from habitat_sim.utils.common import d3_40_colors_rgb
-
     rgb_img = Image.fromarray(rgb_obs, mode="RGBA")
     global img_counter
 
     arr = [rgb_img]
     titles = ["rgb"]
     if semantic_obs.size != 0:
-        semantic_img = Image.new("P", (semantic_obs.shape[1], semantic_obs.shape[0]))
-        semantic_img.putpalette(d3_40_colors_rgb.flatten())
-        semantic_img.putdata((semantic_obs.flatten() % 40).astype(np.uint8))
-        semantic_img = semantic_img.convert("RGBA")
+        semantic_img = Image.fromarray(colorize_semantic(semantic_obs))
         arr.append(semantic_img)
         titles.append("semantic")
 
@@ -45,30 +42,8 @@ def display_sample(rgb_obs, semantic_obs=np.array([]), depth_obs=np.array([])):
     plt.pause(3)  # 显示3秒（可修改秒数）
     plt.close()
 
-def make_simple_cfg(settings):
-    """
-    创建简单的仿真配置
-    """
-    # 仿真器后端配置
-    sim_cfg = habitat_sim.SimulatorConfiguration()
-    sim_cfg.scene_id = settings["scene"]
-
-    # 智能体配置
-    agent_cfg = habitat_sim.agent.AgentConfiguration()
-
-    # 在第一个例子中，我们只给智能体附加一个RGB视觉传感器
-    rgb_sensor_spec = habitat_sim.CameraSensorSpec()
-    rgb_sensor_spec.uuid = "color_sensor"
-    rgb_sensor_spec.sensor_type = habitat_sim.SensorType.COLOR
-    rgb_sensor_spec.resolution = [settings["height"], settings["width"]]
-    rgb_sensor_spec.position = habitat_sim.geo.UP * settings["sensor_height"]
-    rgb_sensor_spec.position = [0.0, settings["sensor_height"], 0.0]
-
-    agent_cfg.sensor_specifications = [rgb_sensor_spec]
-
-    return habitat_sim.Configuration(sim_cfg, [agent_cfg])
-
 display = True
+headless = False  # 为True时不弹出matplotlib窗口，观测帧由后台线程直接编码保存到./frames
 test_scene = "../data/scene_datasets/mp3d_example/17DRP5sb8fy/17DRP5sb8fy.glb"
 
 sim_settings = {
@@ -79,8 +54,8 @@ sim_settings = {
     "height": 256, # 观测图像的空间分辨率（高度）
 }
 
-cfg = make_simple_cfg(sim_settings)
-sim = habitat_sim.Simulator(cfg)
+sim = get_simulator(sim_settings, simple=True)  # 初始化仿真器（从仿真器池获取）
+cfg = sim.config
 
 agent = sim.initialize_agent(sim_settings["default_agent"])
 
@@ -93,6 +68,8 @@ agent.set_state(agent_state)
 agent_state = agent.get_state()
 print("agent_state: position", agent_state.position, "rotation", agent_state.rotation)
 
+frame_writer = FrameWriter("./frames", prefix="observation") if headless else None
+
 action_names = list(cfg.agents[sim_settings["default_agent"]].action_space.keys())
 print("Discrete action space: ", action_names)
 
@@ -100,7 +77,9 @@ def navigateAndSee(action=""):
     if action in action_names:
         observations = sim.step(action)
         print("action: ", action)
-        if display:
+        if headless:
+            frame_writer.write(observations["color_sensor"])
+        elif display:
             display_sample(observations["color_sensor"])
 
 
@@ -115,3 +94,6 @@ navigateAndSee(action)
 
 action = "turn_left"
 navigateAndSee(action)
+
+if headless:
+    frame_writer.close()
@@ -1,3 +1,4 @@
+import contextlib
 import os
 from typing import TYPE_CHECKING, Union, cast
 
@@ -9,19 +10,21 @@ import habitat
 from habitat.config.default_structured_configs import (
     CollisionsMeasurementConfig,
     FogOfWarConfig,
-    TopDownMapMeasurementConfig,
 )
 from habitat.core.agent import Agent
 from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
-from habitat.tasks.nav.shortest_path_follower import ShortestPathFollower
 from habitat.utils.visualizations import maps
 from habitat.utils.visualizations.utils import (
-    images_to_video,
     observations_to_image,
     overlay_frame,
 )
 from habitat_sim.utils import viz_utils as vut
 
+from episode_log import EpisodeLog, replay_episode
+from oracle_planner import OraclePlanner
+from topdown_measure import CachedTopDownMapMeasurementConfig
+from video_stream import VideoStreamWriter
+
 # 禁用Habitat模拟器日志输出
 os.environ["MAGNUM_LOG"] = "quiet"
 os.environ["HABITAT_SIM_LOG"] = "quiet"
@@ -33,59 +36,82 @@ if TYPE_CHECKING:
 output_path = "./code"
 os.makedirs(output_path, exist_ok=True)
 
+# 为True时只记录每一步的位姿、动作、碰撞标志和指标（不构建顶视图地图、不合成帧），保存到log_path，
+# 之后只为render_episode_ids中的episode重放动作、离线生成视频
+metrics_only = False
+log_path = "./episode_logs"
+render_episode_ids = None  # 需要离线生成视频的episode ID列表，None表示本次运行记录的全部episode
+
 class ShortestPathFollowerAgent(Agent):
     r"""实现了 :ref:`habitat.core.agent.Agent` 接口的智能体，
-    使用 :ref`habitat.tasks.nav.shortest_path_follower.ShortestPathFollower` 工具类
-    来提取通往目标的最短路径动作。
+    使用 :ref:`oracle_planner.OraclePlanner` 在每个episode开始时一次算出通往目标的
+    最短路径动作序列（与ShortestPathFollower相同的贪心测地跟随），之后逐步回放。
     """
 
     def __init__(self, env: habitat.Env, goal_radius: float):
         self.env = env
-        self.shortest_path_follower = ShortestPathFollower(
+        self.planner = OraclePlanner(
             sim=cast("HabitatSim", env.sim),
             goal_radius=goal_radius,
-            return_one_hot=False,
         )
 
     def act(self, observations: "Observations") -> Union[int, np.ndarray]:
-        return self.shortest_path_follower.get_next_action(
-            cast(NavigationEpisode, self.env.current_episode).goals[0].position
-        )
+        return self.planner.get_next_action()
 
     def reset(self) -> None:
-        pass
+        # 在env.reset()之后调用：查找或计算当前episode的动作序列
+        self.planner.reset(cast(NavigationEpisode, self.env.current_episode))
 
 
-def example_top_down_map_measure():
+def make_config(visualize=True):
     """
-    演示顶视图地图测量指标的配置和使用，并生成视频
+    创建habitat配置
+
+    参数:
+    visualize: 为True时添加1024像素、带战争迷雾的顶视图地图测量指标
+               （CachedTopDownMap：底图按场景缓存、目标图层按episode缓存、迷雾原地更新）；
+               为False时只保留数值指标（仅指标模式）
     """
-    # 创建habitat配置
     config = habitat.get_config(
         config_path="benchmark/nav/pointnav/pointnav_habitat_test.yaml"
     )
     # 添加顶视图地图(TopDownMap)和碰撞(Collisions)测量指标
-    with habitat.config.read_write(config):
-        config.habitat.task.measurements.update(
-            {
-                "top_down_map": TopDownMapMeasurementConfig(
-                    map_padding=3,
-                    map_resolution=1024,
-                    draw_source=True,
-                    draw_border=True,
-                    draw_shortest_path=True,
-                    draw_view_points=True,
-                    draw_goal_positions=True,
-                    draw_goal_aabbs=True,
-                    fog_of_war=FogOfWarConfig(
-                        draw=True,
-                        visibility_dist=5.0,
-                        fov=90,
-                    ),
-                ),
-                "collisions": CollisionsMeasurementConfig(),
-            }
+    measurements = {"collisions": CollisionsMeasurementConfig()}
+    if visualize:
+        measurements["top_down_map"] = CachedTopDownMapMeasurementConfig(
+            map_padding=3,
+            map_resolution=1024,
+            draw_source=True,
+            draw_border=True,
+            draw_shortest_path=True,
+            draw_view_points=True,
+            draw_goal_positions=True,
+            draw_goal_aabbs=True,
+            fog_of_war=FogOfWarConfig(
+                draw=True,
+                visibility_dist=5.0,
+                fov=90,
+            ),
         )
+    with habitat.config.read_write(config):
+        config.habitat.task.measurements.update(measurements)
+    return config
+
+
+def make_frame(observations, info):
+    """将RGB-D观测和顶视图地图合并为一张图像，并叠加数值指标"""
+    frame = observations_to_image(observations, info)
+    # 从指标中移除top_down_map以便叠加其他文本信息
+    info.pop("top_down_map")
+    return overlay_frame(frame, info)
+
+
+def example_top_down_map_measure():
+    """
+    演示顶视图地图测量指标的配置和使用，并生成视频
+    （metrics_only为True时只记录每一步的状态，之后离线为选定的episode生成视频）
+    """
+    config = make_config(visualize=not metrics_only)
     # 创建数据集
     dataset = habitat.make_dataset(
         id_dataset=config.habitat.dataset.type, config=config.habitat.dataset
@@ -99,48 +125,74 @@ def example_top_down_map_measure():
         )
         # 录制智能体在第一个episode中导航的视频
         num_episodes = 1
+        logged_episodes = []  # 本次运行写出日志的episode（log_path中可能还有之前运行、其他配置留下的日志）
         for _ in range(num_episodes):
             # 加载第一个episode并重置智能体
             observations = env.reset()
             agent.reset()
 
-            # 获取指标
-            info = env.get_metrics()
-            # 将RGB-D观测和顶视图地图合并为一张图像
-            frame = observations_to_image(observations, info)
-
-            # 从指标中移除top_down_map以便叠加其他文本信息
-            info.pop("top_down_map")
-            # 将数值指标叠加到帧上
-            frame = overlay_frame(frame, info)
-            # 添加帧到vis_frames列表
-            vis_frames = [frame]
-
-            # 循环直到智能体到达目标或episode结束
-            while not env.episode_over:
-                # 获取下一个最佳动作
-                action = agent.act(observations)
-                if action is None:
-                    break
-
-                # 执行动作
-                observations = env.step(action)
-                info = env.get_metrics()
-                frame = observations_to_image(observations, info)
-
-                info.pop("top_down_map")
-                frame = overlay_frame(frame, info)
-                vis_frames.append(frame)
-
             current_episode = env.current_episode
             video_name = f"{os.path.basename(current_episode.scene_id)}_{current_episode.episode_id}"
-            # 将图像序列转换为视频保存到磁盘
-            images_to_video(
-                vis_frames, output_path, video_name, fps=6, quality=9
-            )
-            vis_frames.clear()
-            # 显示视频（如果运行在支持显示环境）
+            if metrics_only:
+                # 只记录位姿、动作和指标，不录制视频
+                log = EpisodeLog(current_episode.scene_id, current_episode.episode_id)
+                log.append(env.sim.get_agent_state(), None, env.get_metrics())
+                recorder = contextlib.nullcontext()
+            else:
+                # 帧在后台进程中边产生边编码为视频，队列满时等待编码（内存占用固定）
+                recorder = VideoStreamWriter(output_path, video_name, fps=6, quality=9)
+
+            # 退出时等待剩余帧编码完成；出错时终止编码进程并删除不完整的视频
+            with recorder as video:
+                if not metrics_only:
+                    video.append(make_frame(observations, env.get_metrics()))
+
+                # 循环直到智能体到达目标或episode结束
+                while not env.episode_over:
+                    # 获取下一个最佳动作
+                    action = agent.act(observations)
+                    if action is None:
+                        break
+
+                    # 执行动作
+                    observations = env.step(action)
+                    if metrics_only:
+                        log.append(env.sim.get_agent_state(), action, env.get_metrics())
+                    else:
+                        video.append(make_frame(observations, env.get_metrics()))
+
+            if metrics_only:
+                log.save(log_path)
+                logged_episodes.append(current_episode)
+            else:
+                # 显示视频（如果运行在支持显示环境）
+                vut.display_video(f"{output_path}/{video_name}.mp4")
+
+    if metrics_only:
+        render_logged_episodes(dataset, logged_episodes, render_episode_ids)
+
+
+def render_logged_episodes(dataset, logged_episodes, episode_ids=None):
+    """
+    离线重建帧：用带顶视图地图的完整配置重放仅指标模式记录的动作，为选定的episode生成视频
+
+    参数:
+    dataset: 创建环境时使用的数据集
+    logged_episodes: 本次运行写出日志的episode（只重放这些，避免误用log_path中其他配置留下的旧日志）
+    episode_ids: 需要生成视频的episode ID列表，None表示logged_episodes中的全部
+    """
+    wanted = None if episode_ids is None else {str(episode_id) for episode_id in episode_ids}
+    episodes = [episode for episode in logged_episodes if wanted is None or str(episode.episode_id) in wanted]
+    if not episodes:
+        return
+    with habitat.Env(config=make_config(visualize=True), dataset=dataset) as env:
+        for episode in episodes:
+            log = EpisodeLog.load(EpisodeLog.path(log_path, episode.scene_id, episode.episode_id))
+            video_name = f"{os.path.basename(episode.scene_id)}_{episode.episode_id}"
+            with VideoStreamWriter(output_path, video_name, fps=6, quality=9) as video:
+                for observations, info in replay_episode(env, episode, log):
+                    video.append(make_frame(observations, info))
             vut.display_video(f"{output_path}/{video_name}.mp4")
 
 if __name__ == "__main__":
-    example_top_down_map_measure()
\ No newline at end of file
+    example_top_down_map_measure()
@@ -0,0 +1,140 @@
+"""
+按需渲染传感器的仿真器包装：step只移动智能体，返回的观测对象在第一次访问某个传感器时才渲染它，
+也可以为每一步指定只需要的传感器子集。只需要位姿或RGB的步骤不再为深度和语义渲染付出开销
+"""
+from collections import Counter
+from collections.abc import Mapping
+
+
+class LazyObservations(Mapping):
+    """
+    一步的观测：按键访问时才渲染对应传感器，结果在本步内缓存。
+    智能体执行下一步（或再次调用get_sensor_observations）之后，未渲染的传感器不能再访问（渲染出的会是新位姿的画面）。
+    注意遍历取值（items()、values()、dict(observations)，如ObsRecorder.append）会渲染全部允许访问的传感器，
+    只需要部分传感器时请按键访问，或在step中指定sensors
+
+    参数:
+    owner: 所属的LazySimulator
+    step_id: 创建时的步序号
+    collided: 本步是否碰撞
+    sensors: 本步允许访问的传感器uuid列表
+    """
+
+    def __init__(self, owner, step_id, collided, sensors):
+        self._owner = owner
+        self._step_id = step_id
+        self._collided = collided
+        self._sensors = list(sensors)
+        self._cache = {}
+
+    def __getitem__(self, key):
+        if key == "collided":
+            return self._collided
+        if key in self._cache:
+            return self._cache[key]
+        if key not in self._sensors:
+            raise KeyError(key)
+        if self._owner._step_id != self._step_id:
+            raise RuntimeError(f"观测已过期：智能体已执行下一步，无法再渲染{key}")
+        value = self._owner._render(key)
+        self._cache[key] = value
+        return value
+
+    def __iter__(self):
+        yield from self._sensors
+        yield "collided"
+
+    def __len__(self):
+        return len(self._sensors) + 1
+
+    @property
+    def rendered(self):
+        """本步已经渲染过的传感器"""
+        return list(self._cache)
+
+
+class LazySimulator:
+    """
+    按需渲染传感器的仿真器包装（仅支持运动学仿真，即enable_physics=False）
+
+    参数:
+    sim: habitat_sim.Simulator（或接口相同的替身仿真器）
+    agent_id: 控制的智能体ID
+    """
+
+    def __init__(self, sim, agent_id=0):
+        self.sim = sim
+        self.agent_id = agent_id
+        self.agent = sim.get_agent(agent_id)
+        # 每个传感器实际渲染的次数
+        self.render_counts = Counter()
+        self._step_id = 0
+        self._frame = None
+
+        # habitat_sim没有公开单个传感器的渲染接口，这里使用Simulator内部的传感器表（每个智能体一个 uuid -> Sensor）；
+        # 替身仿真器没有传感器表，退化为：第一次访问任一传感器时一次渲染全部传感器
+        sensor_suites = getattr(sim, "_Simulator__sensors", None)
+        if sensor_suites is not None:
+            self._sensor_suite = sensor_suites[agent_id]
+            self.sensor_uuids = list(self._sensor_suite)
+        elif type(sim).__module__.startswith("habitat_sim"):
+            # habitat_sim版本变化导致内部属性改名时直接报错，而不是悄悄退化为每步渲染全部传感器
+            raise RuntimeError(
+                f"{type(sim).__name__}没有_Simulator__sensors属性，当前habitat_sim版本不支持按需渲染单个传感器"
+            )
+        else:
+            self._sensor_suite = None
+            self.sensor_uuids = list(sim.get_sensor_observations())
+
+    def _render(self, uuid):
+        if self._sensor_suite is not None:
+            self.render_counts[uuid] += 1
+            sensor = self._sensor_suite[uuid]
+            sensor.draw_observation()
+            return sensor.get_observation()
+        if self._frame is None:
+            self._frame = self.sim.get_sensor_observations()
+            self.render_counts.update(self._frame.keys())
+        return self._frame[uuid]
+
+    def _observations(self, collided, sensors):
+        self._step_id += 1
+        self._frame = None
+        if sensors is None:
+            return LazyObservations(self, self._step_id, collided, self.sensor_uuids)
+
+        unknown = set(sensors) - set(self.sensor_uuids)
+        if unknown:
+            raise KeyError(f"未知传感器: {sorted(unknown)}")
+        observations = LazyObservations(self, self._step_id, collided, sensors)
+        if self._sensor_suite is not None:
+            # 指定了子集时立即渲染：先全部提交绘制再逐个读取
+            for uuid in sensors:
+                self._sensor_suite[uuid].draw_observation()
+            for uuid in sensors:
+                self.render_counts[uuid] += 1
+                observations._cache[uuid] = self._sensor_suite[uuid].get_observation()
+        else:
+            for uuid in sensors:
+                observations[uuid]
+        return observations
+
+    def step(self, action, sensors=None):
+        """
+        执行一个动作
+
+        参数:
+        action: 动作名
+        sensors: 本步需要的传感器uuid列表（立即渲染，其余传感器本步不可访问）；None表示全部传感器按需渲染
+
+        返回:
+        LazyObservations: 可像sim.step的返回值一样按键访问（包含collided）
+        """
+        collided = self.agent.act(action)
+        return self._observations(collided, sensors)
+
+    def get_sensor_observations(self, sensors=None):
+        """
+        在当前位姿观测（如set_state之后），参数同step
+        """
+        return self._observations(False, sensors)
@@ -0,0 +1,191 @@
+"""
+顶视图地图磁盘缓存：按导航网格内容哈希 + 切片高度 + 分辨率缓存地图
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+from topdown_map import get_topdown_map
+
+
+def navmesh_hash(pathfinder, navmesh_path=None):
+    """
+    计算导航网格的内容哈希（sha1）
+
+    参数:
+    pathfinder: 导航网格对象
+    navmesh_path: 导航网格文件路径；为None时先把pathfinder保存到临时文件
+
+    返回:
+    str: 十六进制哈希字符串
+    """
+    if navmesh_path is None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_path = os.path.join(tmp_dir, "scene.navmesh")
+            pathfinder.save_nav_mesh(tmp_path)
+            return navmesh_hash(pathfinder, tmp_path)
+
+    digest = hashlib.sha1()
+    with open(navmesh_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TopdownMapCache:
+    """
+    顶视图地图的磁盘缓存，每个条目是一个压缩的.npz文件，按总大小做LRU淘汰
+
+    参数:
+    cache_dir: 缓存目录
+    max_bytes: 缓存总大小上限（字节），超出时删除最久未使用的条目
+    """
+
+    def __init__(self, cache_dir="./topdown_cache", max_bytes=1 << 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(kind, digest, height, meters_per_pixel, *extra):
+        """
+        由地图类型、导航网格哈希、切片高度、分辨率及其他生成参数生成缓存键
+        """
+        params = [kind, digest, float(height), float(meters_per_pixel), *extra]
+        return hashlib.sha1(json.dumps(params).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, key, required=()):
+        """
+        读取缓存条目，未命中时返回None
+
+        参数:
+        required: 条目中必须包含的数组名，缺少任何一个都视为未命中
+
+        返回:
+        dict: 数组名 -> np.ndarray
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                if any(name not in data.files for name in required):
+                    self.misses += 1
+                    return None
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, zipfile.BadZipFile):
+            self.misses += 1
+            return None
+        # 更新修改时间，作为LRU的"最近使用"时间
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # 刚被其他进程淘汰，已读出的数据仍然有效
+            pass
+        self.hits += 1
+        return arrays
+
+    def save(self, key, **arrays):
+        """
+        写入缓存条目（先写临时文件再原子替换，可被多个进程共享）
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            # 写入失败时不留下临时文件
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        # 从最久未使用的条目开始删除
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def get_topdown_map(
+        self,
+        pathfinder,
+        height,
+        meters_per_pixel,
+        sampler=None,
+        adaptive=False,
+        block_size=16,
+        tolerance=1e-3,
+        with_clearance=False,
+        navmesh_path=None,
+    ):
+        """
+        带缓存的get_topdown_map，参数与topdown_map.get_topdown_map相同；
+        距离场与地图保存在同一个缓存条目中
+
+        参数:
+        navmesh_path: 可选的导航网格文件路径，用于计算哈希（省去保存临时文件）
+        """
+        digest = navmesh_hash(pathfinder, navmesh_path)
+        if adaptive:
+            key = self.make_key("topdown_map_adaptive", digest, height, meters_per_pixel, block_size, tolerance)
+        else:
+            key = self.make_key("topdown_map", digest, height, meters_per_pixel)
+        # 需要距离场但缓存条目中没有时算作未命中
+        cached = self.load(key, required=("topdown_map", "clearance") if with_clearance else ("topdown_map",))
+        if cached is not None:
+            return (cached["topdown_map"], cached["clearance"]) if with_clearance else cached["topdown_map"]
+
+        result = get_topdown_map(
+            pathfinder,
+            height,
+            meters_per_pixel,
+            sampler=sampler,
+            adaptive=adaptive,
+            block_size=block_size,
+            tolerance=tolerance,
+            with_clearance=with_clearance,
+        )
+        if with_clearance:
+            topdown_map, clearance = result
+            self.save(key, topdown_map=topdown_map, clearance=clearance)
+        else:
+            self.save(key, topdown_map=result)
+        return result
+
+    def get_topdown_view(self, pathfinder, height, meters_per_pixel, navmesh_path=None):
+        """
+        带缓存的pathfinder.get_topdown_view
+        """
+        digest = navmesh_hash(pathfinder, navmesh_path)
+        key = self.make_key("topdown_view", digest, height, meters_per_pixel)
+        cached = self.load(key)
+        if cached is not None:
+            return cached["topdown_view"]
+
+        topdown_view = pathfinder.get_topdown_view(meters_per_pixel, height)
+        self.save(key, topdown_view=topdown_view)
+        return topdown_view
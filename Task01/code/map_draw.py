@@ -0,0 +1,194 @@
+"""
+顶视图地图的批量绘制：路径、智能体、关键点直接写入地图数组（不经过PIL来回转换），
+以及多条轨迹的访问密度热力图
+"""
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+
+def _disk_offsets(radius):
+    """半径为radius的实心圆内所有像素相对圆心的偏移 (K, 2)"""
+    r = int(np.ceil(radius))
+    dy, dx = np.mgrid[-r : r + 1, -r : r + 1]
+    inside = dy * dy + dx * dx <= radius * radius
+    return np.stack([dy[inside], dx[inside]], axis=1)
+
+
+def _pen_offsets(thickness):
+    """线宽为thickness的画笔覆盖的像素偏移 (K, 2)"""
+    if thickness <= 1:
+        return np.zeros((1, 2), dtype=np.int64)
+    return _disk_offsets(thickness / 2)
+
+
+def _stamp(top_down_map, pixels, offsets, color):
+    """
+    把offsets描述的形状印到每个像素位置上，超出地图的部分丢弃
+    """
+    if len(pixels) == 0:
+        return
+    stamped = (pixels[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+    height, width = top_down_map.shape[:2]
+    valid = (
+        (stamped[:, 0] >= 0)
+        & (stamped[:, 0] < height)
+        & (stamped[:, 1] >= 0)
+        & (stamped[:, 1] < width)
+    )
+    stamped = stamped[valid]
+    top_down_map[stamped[:, 0], stamped[:, 1]] = color
+
+
+def rasterize_segments(starts, ends):
+    """
+    把一批线段离散成像素（每条线段沿主方向每个像素取一个点）
+
+    参数:
+    starts: (S, 2) 线段起点的网格坐标 (行, 列)
+    ends: (S, 2) 线段终点的网格坐标 (行, 列)
+
+    返回:
+    (pixels, segment_ids): (P, 2) 整数像素坐标，以及每个像素所属的线段下标
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    delta = ends - starts
+    counts = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64) + 1
+    segment_ids = np.repeat(np.arange(len(starts)), counts)
+    # 每个像素在所属线段上的序号 -> 参数t∈[0, 1]
+    offsets = np.cumsum(counts) - counts
+    steps = np.arange(counts.sum()) - np.repeat(offsets, counts)
+    t = steps / np.maximum(counts - 1, 1)[segment_ids]
+    pixels = np.rint(starts[segment_ids] + t[:, None] * delta[segment_ids]).astype(np.int64)
+    return pixels, segment_ids
+
+
+def _polyline_segments(trajectories):
+    """把多条折线拆成线段的起点和终点数组，同时返回每条线段所属的轨迹下标"""
+    starts, ends, traj_ids = [], [], []
+    for i, trajectory in enumerate(trajectories):
+        trajectory = np.asarray(trajectory, dtype=np.float64).reshape(-1, 2)
+        if len(trajectory) == 0:
+            continue
+        if len(trajectory) == 1:
+            trajectory = np.repeat(trajectory, 2, axis=0)
+        starts.append(trajectory[:-1])
+        ends.append(trajectory[1:])
+        traj_ids.append(np.full(len(trajectory) - 1, i))
+    if not starts:
+        return np.zeros((0, 2)), np.zeros((0, 2)), np.zeros(0, dtype=np.int64)
+    return np.concatenate(starts), np.concatenate(ends), np.concatenate(traj_ids)
+
+
+def draw_paths(top_down_map, trajectories, color=(255, 0, 0), thickness=2):
+    """
+    一次绘制多条轨迹折线
+
+    参数:
+    top_down_map: (H, W, 3) 地图图像，原地修改
+    trajectories: 轨迹列表，每条轨迹是 (N, 2) 网格坐标 (行, 列)
+    color: 线条颜色
+    thickness: 线宽（像素）
+    """
+    starts, ends, _ = _polyline_segments(trajectories)
+    pixels, _ = rasterize_segments(starts, ends)
+    _stamp(top_down_map, pixels, _pen_offsets(thickness), color)
+
+
+def draw_points(top_down_map, points, color=(255, 0, 0), radius=5):
+    """
+    一次绘制多个关键点（实心圆）
+
+    参数:
+    top_down_map: (H, W, 3) 地图图像，原地修改
+    points: (N, 2) 网格坐标 (行, 列)
+    color: 点的颜色
+    radius: 点的半径（像素）
+    """
+    pixels = np.rint(np.asarray(points, dtype=np.float64).reshape(-1, 2)).astype(np.int64)
+    _stamp(top_down_map, pixels, _disk_offsets(radius), color)
+
+
+def draw_agents(
+    top_down_map,
+    agent_positions,
+    angles,
+    agent_radius_px=8,
+    agent_color=(0, 255, 0),
+    arrow_color=(0, 0, 255),
+):
+    """
+    一次绘制多个智能体：带黑色描边的圆形身体和朝向箭头
+
+    参数:
+    top_down_map: (H, W, 3) 地图图像，原地修改
+    agent_positions: (N, 2) 网格坐标 (行, 列)
+    angles: (N,) 朝向角（弧度，与列方向的夹角，向行增大的方向为正）
+    agent_radius_px: 身体半径（像素）
+    agent_color: 身体颜色
+    arrow_color: 箭头颜色
+    """
+    positions = np.rint(np.asarray(agent_positions, dtype=np.float64).reshape(-1, 2)).astype(np.int64)
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1)
+
+    # 先画黑色外圈，再画内部实心圆，得到1像素宽的描边
+    _stamp(top_down_map, positions, _disk_offsets(agent_radius_px), (0, 0, 0))
+    _stamp(top_down_map, positions, _disk_offsets(agent_radius_px - 1), agent_color)
+
+    # 朝向箭头：从圆心出发，长度为1.5倍半径
+    arrow_length = agent_radius_px * 1.5
+    ends = positions + arrow_length * np.stack([np.sin(angles), np.cos(angles)], axis=1)
+    pixels, _ = rasterize_segments(positions, ends)
+    _stamp(top_down_map, pixels, _pen_offsets(2), arrow_color)
+
+
+def visitation_heatmap(grid_dimensions, trajectories, count_once=True):
+    """
+    统计多条轨迹经过每个像素的次数（覆盖率分析）
+
+    参数:
+    grid_dimensions: 地图尺寸 (高度, 宽度)
+    trajectories: 轨迹列表，每条轨迹是 (N, 2) 网格坐标 (行, 列)
+    count_once: 为True时同一条轨迹多次经过同一像素只计1次
+
+    返回:
+    np.ndarray: (高度, 宽度) 的uint32计数图
+    """
+    height, width = grid_dimensions
+    starts, ends, traj_ids = _polyline_segments(trajectories)
+    pixels, segment_ids = rasterize_segments(starts, ends)
+    valid = (
+        (pixels[:, 0] >= 0)
+        & (pixels[:, 0] < height)
+        & (pixels[:, 1] >= 0)
+        & (pixels[:, 1] < width)
+    )
+    flat = pixels[valid, 0] * width + pixels[valid, 1]
+    if count_once:
+        # 以 (轨迹, 像素) 去重：排序后去掉相邻重复值（比np.unique更快）
+        keys = np.sort(traj_ids[segment_ids[valid]] * (height * width) + flat)
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+        flat = keys % (height * width)
+    # 与np.add.at累加等价，bincount对大量重复下标更快
+    counts = np.bincount(flat, minlength=height * width)
+    return counts.reshape(height, width).astype(np.uint32)
+
+
+def overlay_heatmap(top_down_map, heatmap, color=(255, 0, 0), max_alpha=0.8):
+    """
+    把热力图按对数归一化的透明度叠加到地图图像上
+
+    参数:
+    top_down_map: (H, W, 3) 地图图像
+    heatmap: (H, W) 计数图（visitation_heatmap的返回值）
+    color: 热力图颜色
+    max_alpha: 计数最大处的不透明度
+
+    返回:
+    np.ndarray: 叠加后的 (H, W, 3) uint8图像
+    """
+    weight = np.log1p(heatmap.astype(np.float32))
+    if weight.max() > 0:
+        weight /= weight.max()
+    alpha = (weight * max_alpha)[..., None]
+    blended = top_down_map * (1 - alpha) + np.asarray(color, dtype=np.float32) * alpha
+    return blended.astype(np.uint8)
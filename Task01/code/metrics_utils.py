@@ -0,0 +1,19 @@
+"""
+评估指标的通用处理：eval_runner的评估报告和episode_log的逐步日志共用
+"""
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+
+def flatten_metrics(metrics, prefix=""):
+    """
+    env.get_metrics()的结果展平为 名称 -> 数值：嵌套字典用点号连接键名（如collisions.count），
+    数组等非标量指标（如top_down_map）被忽略
+    """
+    flat = {}
+    for key, value in metrics.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, f"{name}."))
+        elif isinstance(value, (bool, int, float, np.bool_, np.integer, np.floating)):
+            flat[name] = float(value)
+    return flat
@@ -0,0 +1,226 @@
+"""
+观测数据集记录器：把每一步的RGB、深度（float32或16位毫米）、语义ID以及智能体位姿和动作
+追加写入分块存储（每块一个压缩.npz，或一个.npy目录供内存映射读取），
+并维护index.json索引，读取时可随机访问任意一步而不必解码整个episode
+"""
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+INDEX_FILE = "index.json"
+
+
+class ObservationRecorder:
+    """
+    分块追加写入观测
+
+    参数:
+    output_dir: 输出目录
+    chunk_size: 每个分块包含的步数
+    compress: True时每块保存为压缩的.npz；False时保存为.npy目录（读取时可内存映射，不需要解码）
+    depth_format: "float32" 保存原始深度；"uint16" 保存为毫米整数（0~65.535米，1毫米精度）
+    """
+
+    def __init__(self, output_dir, chunk_size=256, compress=True, depth_format="float32"):
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.depth_format = depth_format
+        self.num_steps = 0
+        self._chunks = []
+        self._actions = {}
+        self._buffer = {}
+        self._observation_keys = None  # 第一步的传感器名，之后每一步必须相同（各分块的数组一一对应）
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _encode(self, key, value):
+        # 复制一份，避免仿真器复用观测缓冲区时覆盖已记录的数据
+        value = np.array(value)
+        if key.startswith("depth") and self.depth_format == "uint16":
+            return np.clip(np.rint(value * 1000), 0, np.iinfo(np.uint16).max).astype(np.uint16)
+        return value
+
+    def append(self, observations, position, rotation, action=None, episode_id=0):
+        """
+        追加一步数据
+
+        参数:
+        observations: 传感器名 -> 观测数组（如sim.step的返回值）
+        position: 智能体位置 (3,)
+        rotation: 智能体朝向四元数系数 (4,)，如utils.quat_to_coeffs(agent_state.rotation)
+        action: 动作名（None表示没有动作，如直接set_state渲染的帧）
+        episode_id: 所属episode编号
+        """
+        keys = set(observations)
+        if self._observation_keys is None:
+            self._observation_keys = keys
+        elif keys != self._observation_keys:
+            raise ValueError(
+                f"第{self.num_steps}步的观测键 {sorted(keys)} 与第一步的 {sorted(self._observation_keys)} 不一致"
+            )
+
+        if action is None:
+            action_id = -1
+        else:
+            action_id = self._actions.setdefault(action, len(self._actions))
+
+        step = {key: self._encode(key, value) for key, value in observations.items()}
+        step["position"] = np.asarray(position, dtype=np.float32)
+        step["rotation"] = np.asarray(rotation, dtype=np.float32)
+        step["action"] = np.int16(action_id)
+        step["episode_id"] = np.int64(episode_id)
+        for key, value in step.items():
+            self._buffer.setdefault(key, []).append(value)
+
+        self.num_steps += 1
+        if len(self._buffer["action"]) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区中的步写成一个分块，并更新索引"""
+        if not self._buffer:
+            return
+        arrays = {key: np.stack(values) for key, values in self._buffer.items()}
+        name = f"chunk_{len(self._chunks):06d}"
+        if self.compress:
+            name += ".npz"
+            np.savez_compressed(os.path.join(self.output_dir, name), **arrays)
+        else:
+            chunk_dir = os.path.join(self.output_dir, name)
+            os.makedirs(chunk_dir, exist_ok=True)
+            for key, value in arrays.items():
+                np.save(os.path.join(chunk_dir, f"{key}.npy"), value)
+
+        num_steps = len(arrays["action"])
+        start = self._chunks[-1]["stop"] if self._chunks else 0
+        episode_ids = arrays["episode_id"]
+        self._chunks.append(
+            {
+                "name": name,
+                "start": start,
+                "stop": start + num_steps,
+                "episodes": sorted(int(e) for e in np.unique(episode_ids)),
+            }
+        )
+        self._buffer = {}
+        self._write_index()
+
+    def _write_index(self):
+        index = {
+            "num_steps": self._chunks[-1]["stop"] if self._chunks else 0,
+            "chunk_size": self.chunk_size,
+            "depth_format": self.depth_format,
+            "actions": sorted(self._actions, key=self._actions.get),
+            "chunks": self._chunks,
+        }
+        tmp_path = os.path.join(self.output_dir, INDEX_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.output_dir, INDEX_FILE))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ObservationDataset:
+    """
+    随机访问ObservationRecorder写出的数据：按索引定位分块，只读取需要的分块（最近使用的分块会被缓存）
+
+    参数:
+    output_dir: 记录目录
+    max_cached_chunks: 内存中缓存的分块数
+    """
+
+    def __init__(self, output_dir, max_cached_chunks=4):
+        self.output_dir = output_dir
+        self.max_cached_chunks = max_cached_chunks
+        with open(os.path.join(output_dir, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.actions = self.index["actions"]
+        self._starts = np.array([chunk["start"] for chunk in self.index["chunks"]])
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return self.index["num_steps"]
+
+    def _load_chunk(self, chunk_id):
+        """
+        返回 (npz, arrays)：压缩分块按键延迟解码并缓存到arrays中；.npy目录分块直接内存映射
+        """
+        if chunk_id in self._cache:
+            self._cache.move_to_end(chunk_id)
+            return self._cache[chunk_id]
+
+        path = os.path.join(self.output_dir, self.index["chunks"][chunk_id]["name"])
+        if path.endswith(".npz"):
+            chunk = (np.load(path), {})
+        else:
+            arrays = {
+                name[: -len(".npy")]: np.load(os.path.join(path, name), mmap_mode="r")
+                for name in os.listdir(path)
+                if name.endswith(".npy")
+            }
+            chunk = (None, arrays)
+        self._cache[chunk_id] = chunk
+        while len(self._cache) > self.max_cached_chunks:
+            npz, _ = self._cache.popitem(last=False)[1]
+            if npz is not None:
+                npz.close()
+        return chunk
+
+    def _array(self, chunk_id, key):
+        npz, arrays = self._load_chunk(chunk_id)
+        if key not in arrays:
+            arrays[key] = npz[key]
+        return arrays[key]
+
+    def get(self, step, keys=None):
+        """
+        读取第step步的数据
+
+        参数:
+        step: 全局步序号
+        keys: 需要读取的键（如["color_sensor", "position"]）；None表示全部
+
+        返回:
+        dict: 键 -> 数组；深度按记录格式还原为米，动作还原为动作名
+        """
+        if step < 0:
+            step += len(self)
+        chunk_id = int(np.searchsorted(self._starts, step, side="right") - 1)
+        offset = step - self.index["chunks"][chunk_id]["start"]
+        if keys is None:
+            npz, arrays = self._load_chunk(chunk_id)
+            keys = npz.files if npz is not None else list(arrays)
+
+        sample = {}
+        for key in keys:
+            value = self._array(chunk_id, key)[offset]
+            if key.startswith("depth") and self.index["depth_format"] == "uint16":
+                value = value.astype(np.float32) / 1000
+            elif key == "action":
+                value = self.actions[value] if value >= 0 else None
+            sample[key] = value
+        return sample
+
+    def __getitem__(self, step):
+        return self.get(step)
+
+    def episode_steps(self, episode_id):
+        """
+        某个episode包含的全局步序号
+        """
+        steps = []
+        for chunk_id, chunk in enumerate(self.index["chunks"]):
+            if episode_id in chunk["episodes"]:
+                episode_ids = np.asarray(self._array(chunk_id, "episode_id"))
+                steps.append(chunk["start"] + np.nonzero(episode_ids == episode_id)[0])
+        return np.concatenate(steps) if steps else np.zeros(0, dtype=np.int64)
@@ -0,0 +1,185 @@
+"""
+深度观测增量融合为二维占据栅格：按传感器分辨率和视场角预先计算每个像素的光线方向，
+每帧把深度反投影到世界坐标，落在障碍物高度范围内的点记为占据，相机到每列最近障碍物之间的格子记为空闲。
+栅格与get_topdown_map的网格对齐，每帧只更新被触及的格子
+"""
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+from map_draw import rasterize_segments
+from topdown_map import grid_indices, grid_spacing, topdown_grid
+
+UNKNOWN = -1
+FREE = 0
+OCCUPIED = 1
+
+
+def sensor_rays(height, width, hfov=90.0) -> np.ndarray:
+    """
+    针孔相机每个像素的光线方向（相机坐标系：x向右，y向上，-z向前），z分量归一化为-1，
+    因此 深度(沿光轴的距离) * 光线方向 即为该像素对应的三维点
+
+    返回:
+    np.ndarray: (H, W, 3) float32
+    """
+    focal = (width / 2) / np.tan(np.deg2rad(hfov) / 2)
+    cols = (np.arange(width) + 0.5 - width / 2) / focal
+    rows = (height / 2 - (np.arange(height) + 0.5)) / focal
+    rays = np.empty((height, width, 3), dtype=np.float32)
+    rays[..., 0] = cols[None, :]
+    rays[..., 1] = rows[:, None]
+    rays[..., 2] = -1.0
+    return rays
+
+
+def quat_coeffs_to_matrix(coeffs) -> np.ndarray:
+    """四元数系数 [x, y, z, w]（utils.quat_to_coeffs的格式）转换为3x3旋转矩阵"""
+    x, y, z, w = np.asarray(coeffs, dtype=np.float64) / np.linalg.norm(coeffs)
+    return np.array(
+        [
+            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+        ]
+    )
+
+
+def _accumulate(counts, flat):
+    """counts.flat[flat] += 出现次数（只写被触及的格子，uint16饱和），返回被触及的格子（去重）"""
+    if len(flat) == 0:
+        return flat
+    flat = np.sort(flat)
+    starts = np.flatnonzero(np.concatenate([[True], flat[1:] != flat[:-1]]))
+    cells = flat[starts]
+    hits = np.diff(np.append(starts, len(flat)))
+    view = counts.reshape(-1)
+    view[cells] = np.minimum(view[cells].astype(np.int64) + hits, np.iinfo(counts.dtype).max)
+    return cells
+
+
+class OccupancyMapper:
+    """
+    深度观测到二维占据栅格的增量融合
+
+    参数:
+    x_coords: 列对应的x坐标（一维数组，与get_topdown_map的网格一致）
+    z_coords: 行对应的z坐标（一维数组）
+    meters_per_pixel: 每个像素代表的米数
+    resolution: 深度传感器分辨率 (高度, 宽度)
+    hfov: 深度传感器的水平视场角（度）
+    sensor_height: 传感器相对智能体位置的高度（米）
+    obstacle_heights: 相对智能体脚下高度在该范围内的点视为障碍物（米），低于下限的点视为地面
+    max_depth: 超过该深度的像素被忽略（米）
+    stride: 每隔stride个像素取一个像素反投影
+    min_hits: 累计被击中至少min_hits次的格子才视为占据
+    """
+
+    def __init__(
+        self,
+        x_coords,
+        z_coords,
+        meters_per_pixel,
+        resolution,
+        hfov=90.0,
+        sensor_height=1.5,
+        obstacle_heights=(0.1, 1.8),
+        max_depth=10.0,
+        stride=2,
+        min_hits=2,
+    ):
+        self.x_coords = x_coords
+        self.z_coords = z_coords
+        self.meters_per_pixel = meters_per_pixel
+        self.sensor_height = sensor_height
+        self.obstacle_heights = obstacle_heights
+        self.max_depth = max_depth
+        self.stride = stride
+        self.min_hits = min_hits
+        self._rays = sensor_rays(resolution[0], resolution[1], hfov)[::stride, ::stride]
+        self._spacing = np.array(grid_spacing(x_coords, z_coords, meters_per_pixel))
+        self._origin = np.array([z_coords[0], x_coords[0]])
+
+        shape = (len(z_coords), len(x_coords))
+        self.hit_counts = np.zeros(shape, dtype=np.uint16)
+        self.free_counts = np.zeros(shape, dtype=np.uint16)
+        # 最近一次update触及的格子（展平下标），可用于增量重绘
+        self.updated_cells = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_pathfinder(cls, pathfinder, meters_per_pixel, resolution, **kwargs):
+        """使用与get_topdown_map相同的网格创建"""
+        x_coords, z_coords = topdown_grid(pathfinder, meters_per_pixel)
+        return cls(x_coords, z_coords, meters_per_pixel, resolution, **kwargs)
+
+    def _continuous_grid(self, xz):
+        """世界坐标 (..., [x, z]) 转换为连续的网格坐标 (..., [行, 列])"""
+        return (xz[..., [1, 0]] - self._origin) / self._spacing
+
+    def update(self, depth_obs, position, rotation):
+        """
+        融合一帧深度观测
+
+        参数:
+        depth_obs: (H, W) 深度观测（米）
+        position: 智能体位置 (3,)
+        rotation: 智能体朝向四元数系数 [x, y, z, w]（utils.quat_to_coeffs(agent_state.rotation)）
+
+        返回:
+        int: 本帧触及的格子数
+        """
+        position = np.asarray(position, dtype=np.float64)
+        depth = depth_obs[:: self.stride, :: self.stride]
+        valid = np.isfinite(depth) & (depth > 0) & (depth < self.max_depth)
+
+        # 相机坐标 -> 世界坐标
+        camera = position + np.array([0.0, self.sensor_height, 0.0])
+        points = (depth[..., None] * self._rays) @ quat_coeffs_to_matrix(rotation).T.astype(np.float32) + camera
+        relative_height = points[..., 1] - position[1]
+        obstacle = valid & (relative_height >= self.obstacle_heights[0]) & (relative_height <= self.obstacle_heights[1])
+        floor = valid & (relative_height < self.obstacle_heights[0])
+
+        # 每一列：相机到最近障碍物之间（没有障碍物时到最远的有效点）的格子为空闲
+        horizontal = np.hypot(points[..., 0] - camera[0], points[..., 2] - camera[2])
+        nearest_obstacle = np.where(obstacle, horizontal, np.inf)
+        farthest_valid = np.where(valid, horizontal, -np.inf)
+        has_obstacle = np.isfinite(nearest_obstacle.min(axis=0))
+        end_row = np.where(has_obstacle, nearest_obstacle.argmin(axis=0), farthest_valid.argmax(axis=0))
+        columns = valid.any(axis=0)
+        end_points = points[end_row, np.arange(points.shape[1])][columns]
+        starts = np.broadcast_to(self._continuous_grid(camera[[0, 2]]), (len(end_points), 2))
+        free_pixels, _ = rasterize_segments(starts, self._continuous_grid(end_points[:, [0, 2]]))
+
+        height, width = self.hit_counts.shape
+        inside = (
+            (free_pixels[:, 0] >= 0)
+            & (free_pixels[:, 0] < height)
+            & (free_pixels[:, 1] >= 0)
+            & (free_pixels[:, 1] < width)
+        )
+        free_cells = free_pixels[inside, 0] * width + free_pixels[inside, 1]
+
+        rows, cols, in_map = grid_indices(points[floor], self.x_coords, self.z_coords, self.meters_per_pixel)
+        free_cells = np.concatenate([free_cells, (rows * width + cols)[in_map]])
+        rows, cols, in_map = grid_indices(points[obstacle], self.x_coords, self.z_coords, self.meters_per_pixel)
+        hit_cells = (rows * width + cols)[in_map]
+
+        self.updated_cells = np.union1d(
+            _accumulate(self.free_counts, free_cells), _accumulate(self.hit_counts, hit_cells)
+        )
+        return len(self.updated_cells)
+
+    def occupancy(self) -> np.ndarray:
+        """
+        返回:
+        np.ndarray: (H, W) int8栅格，UNKNOWN(-1)未观测、FREE(0)空闲、OCCUPIED(1)占据
+        """
+        grid = np.full(self.hit_counts.shape, UNKNOWN, dtype=np.int8)
+        grid[self.free_counts > 0] = FREE
+        grid[self.hit_counts >= self.min_hits] = OCCUPIED
+        return grid
+
+    def to_image(self) -> np.ndarray:
+        """
+        栅格转换为 (H, W, 3) uint8图像：未观测为灰色，空闲为白色，占据为黑色
+        """
+        palette = np.array([[128, 128, 128], [255, 255, 255], [0, 0, 0]], dtype=np.uint8)
+        return palette[self.occupancy() + 1]
@@ -0,0 +1,210 @@
+"""
+ShortestPathFollower的预计算版本：episode开始时用贪心测地跟随器的find_path一次算出到达目标的完整动作序列，
+按 (场景, episode_id, 目标半径) 缓存并在之后的rollout中直接回放；
+只有智能体位姿偏离预期轨迹（缓存中记录的，或新规划时按动作空间推算的）或到达终点时不在目标半径内时才重新规划
+"""
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+import habitat_sim  # Habitat-Sim主库（仿真核心）
+from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat_sim.utils import common as utils  # 通用工具函数（如坐标转换、数据格式处理）
+
+from cache_store import CacheStore
+
+
+def _pose(agent_state):
+    """智能体位姿 -> [x, y, z, qx, qy, qz, qw]"""
+    return np.concatenate([agent_state.position, utils.quat_to_coeffs(agent_state.rotation)]).astype(np.float32)
+
+
+def _quat_multiply(a, b):
+    """四元数系数 [x, y, z, w] 的乘积 a * b"""
+    ax, ay, az, aw = a
+    bx, by, bz, bw = b
+    return np.array(
+        [
+            aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw,
+            aw * bw - ax * bx - ay * by - az * bz,
+        ]
+    )
+
+
+def _decode_plan(row):
+    actions, poses = row
+    return np.frombuffer(actions, dtype=np.int64), np.frombuffer(poses, dtype=np.float32).reshape(-1, 7)
+
+
+class OraclePlanner:
+    """
+    回放预计算动作序列的最短路径跟随者（可替代ShortestPathFollower.get_next_action）
+
+    参数:
+    sim: HabitatSim（env.sim）
+    goal_radius: 目标半径，距离目标小于该值时输出stop
+    max_entries: 内存中最多缓存的episode数，超出时淘汰最久未使用的条目
+    db_path: 可选的SQLite文件路径，作为跨进程共享的磁盘存储
+    position_tolerance: 位置偏差超过该值（米）视为偏离轨迹
+    rotation_tolerance: 朝向偏差超过该值（1 - |四元数点积|）视为偏离轨迹
+    """
+
+    def __init__(
+        self,
+        sim,
+        goal_radius,
+        max_entries=10000,
+        db_path=None,
+        position_tolerance=1e-3,
+        rotation_tolerance=1e-4,
+    ):
+        self.sim = sim
+        self.goal_radius = goal_radius
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.position_tolerance = position_tolerance
+        self.rotation_tolerance = rotation_tolerance
+        self.replans = 0
+        # 缓存的值为 (动作序列, 每个动作执行前的位姿)
+        self._cache = CacheStore(
+            "plans",
+            "actions BLOB, poses BLOB",
+            encode=lambda entry: (entry[0].tobytes(), entry[1].tobytes()),
+            decode=_decode_plan,
+            max_entries=max_entries,
+            db_path=db_path,
+        )
+        self._follower = None
+        self._follower_scene = None
+
+        # 当前episode的回放状态
+        self._key = None
+        self._goal = None
+        self._actions = np.zeros(0, dtype=np.int64)
+        self._expected_poses = None  # 每个动作执行前的预期位姿（缓存中记录的，或新规划时推算的）
+        self._recorded_poses = []
+        self._recording = False
+        self._step = 0
+
+    def _plan(self):
+        """从智能体当前位姿一次算出到目标的完整动作序列（以stop结尾）"""
+        try:
+            actions = list(self._follower.find_path(self._goal))
+        except habitat_sim.errors.GreedyFollowerError:
+            # 与ShortestPathFollower(stop_on_error=True)一致：找不到路径时直接stop
+            actions = []
+        if not actions or actions[-1] != HabitatSimActions.stop:
+            actions.append(HabitatSimActions.stop)
+        return np.array(actions, dtype=np.int64)
+
+    def _predict_poses(self, actions):
+        """
+        从当前位姿按动作空间的运动学推算每个动作执行前的位姿（与仿真器的默认动作一致：前进沿朝向移动后
+        用pathfinder.try_step贴合导航网格，转向绕y轴旋转）；含无法推算的动作（如带噪声的动作）时返回None
+        """
+        action_space = self.sim.get_agent(0).agent_config.action_space
+        config = getattr(self.sim, "config", None)
+        allow_sliding = getattr(getattr(config, "sim_cfg", None), "allow_sliding", True)
+        try_step = self.sim.pathfinder.try_step if allow_sliding else self.sim.pathfinder.try_step_no_sliding
+        pose = _pose(self.sim.get_agent_state()).astype(np.float64)
+        poses = []
+        for action in actions:
+            poses.append(pose.astype(np.float32))
+            if action == HabitatSimActions.stop:
+                continue
+            spec = action_space.get(int(action))
+            if spec is None:
+                return None
+            if spec.name == "move_forward":
+                forward = utils.quat_rotate_vector(utils.quat_from_coeffs(pose[3:]), np.array([0.0, 0.0, -1.0]))
+                target = pose[:3] + spec.actuation.amount * np.asarray(forward)
+                pose = np.concatenate([np.asarray(try_step(pose[:3], target), dtype=np.float64), pose[3:]])
+            elif spec.name in ("turn_left", "turn_right"):
+                angle = np.deg2rad(spec.actuation.amount) * (1.0 if spec.name == "turn_left" else -1.0)
+                turn = np.array([0.0, np.sin(angle / 2), 0.0, np.cos(angle / 2)])
+                pose = np.concatenate([pose[:3], _quat_multiply(pose[3:], turn)])
+            else:
+                return None
+        return np.stack(poses)
+
+    def _replan(self):
+        self.replans += 1
+        self._actions = self._plan()
+        self._expected_poses = self._predict_poses(self._actions)
+        # 偏离后的序列只对这一次rollout有效，不写入缓存
+        self._recording = False
+        self._step = 0
+
+    def _deviates(self, pose, expected):
+        if np.linalg.norm(pose[:3] - expected[:3]) > self.position_tolerance:
+            return True
+        return 1.0 - abs(float(np.dot(pose[3:], expected[3:]))) > self.rotation_tolerance
+
+    def reset(self, episode):
+        """
+        开始一个新episode（在env.reset()之后调用），命中缓存时回放缓存的动作序列
+
+        参数:
+        episode: NavigationEpisode（env.current_episode）
+        """
+        if self._follower is None or self._follower_scene != episode.scene_id:
+            self._follower = self.sim.make_greedy_follower(
+                0,
+                self.goal_radius,
+                stop_key=HabitatSimActions.stop,
+                forward_key=HabitatSimActions.move_forward,
+                left_key=HabitatSimActions.turn_left,
+                right_key=HabitatSimActions.turn_right,
+            )
+            self._follower_scene = episode.scene_id
+
+        self._key = (episode.scene_id, str(episode.episode_id), float(self.goal_radius))
+        self._goal = np.asarray(episode.goals[0].position, dtype=np.float32)
+        self._step = 0
+        self._recorded_poses = []
+        entry = self._cache.get(self._key)
+        if entry is not None:
+            self._actions, self._expected_poses = entry
+            self._recording = False
+        else:
+            self._actions = self._plan()
+            # 第一次执行时用推算的位姿检测偏离，同时记录实际的位姿写入缓存
+            self._expected_poses = self._predict_poses(self._actions)
+            self._recording = True
+
+    def get_next_action(self):
+        """
+        返回:
+        int: 下一个动作（HabitatSimActions）
+        """
+        pose = _pose(self.sim.get_agent_state())
+        if self._expected_poses is not None and (
+            self._step >= len(self._expected_poses) or self._deviates(pose, self._expected_poses[self._step])
+        ):
+            self._replan()
+        elif self._step >= len(self._actions):
+            # 序列已执行完（stop之后仍在调用）
+            self._replan()
+
+        action = int(self._actions[self._step])
+        if action == HabitatSimActions.stop and self._step > 0:
+            # 执行动作有噪声时可能在目标半径外就走完了序列：从当前位姿重新规划一次
+            if self.sim.geodesic_distance(pose[:3], self._goal) > self.goal_radius + self.position_tolerance:
+                self._replan()
+                action = int(self._actions[self._step])
+
+        if self._recording:
+            self._recorded_poses.append(pose)
+            if action == HabitatSimActions.stop:
+                self._cache.put(self._key, (self._actions[: self._step + 1].copy(), np.stack(self._recorded_poses)))
+                self._recording = False
+        self._step += 1
+        return action
+
+    @property
+    def stats(self):
+        """缓存命中/未命中和重新规划计数"""
+        return dict(self._cache.stats, replans=self.replans)
+
+    def close(self):
+        self._cache.close()
@@ -0,0 +1,88 @@
+"""
+find_path的缓存服务：按场景和量化后的起点/终点缓存测地距离与路径点，
+内存中LRU淘汰，可选的SQLite磁盘存储可在多个worker进程之间共享
+"""
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+import habitat_sim  # Habitat-Sim主库（仿真核心）
+
+from cache_store import CacheStore
+
+
+def _decode_path(row):
+    found, distance, points = row
+    points = np.frombuffer(points, dtype=np.float32).reshape(-1, 3)
+    return (bool(found), distance, points)
+
+
+class PathCache:
+    """
+    带缓存的pathfinder.find_path
+
+    参数:
+    pathfinder: 导航网格对象
+    scene_id: 场景标识（缓存键的一部分，磁盘存储在多个场景间共享时用于区分）
+    quantization: 起点/终点的量化步长（米），同一量化格内的请求视为同一请求
+    max_entries: 内存中最多缓存的条目数，超出时淘汰最久未使用的条目
+    db_path: 可选的SQLite文件路径，作为跨进程共享的磁盘存储
+    """
+
+    def __init__(self, pathfinder, scene_id, quantization=0.01, max_entries=100000, db_path=None):
+        self.pathfinder = pathfinder
+        self.scene_id = scene_id
+        self.quantization = quantization
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._cache = CacheStore(
+            "paths",
+            "found INTEGER, distance REAL, points BLOB",
+            encode=lambda result: (int(result[0]), result[1], result[2].tobytes()),
+            decode=_decode_path,
+            max_entries=max_entries,
+            db_path=db_path,
+        )
+
+    def _quantize(self, position):
+        return tuple(int(v) for v in np.rint(np.asarray(position, dtype=np.float64) / self.quantization))
+
+    def find_path(self, start, end):
+        """
+        查询起点到终点的最短路径（未命中时用量化格中心点调用pathfinder.find_path）
+
+        参数:
+        start: 起点世界坐标
+        end: 终点世界坐标
+
+        返回:
+        (found_path, geodesic_distance, path_points): 是否找到路径、测地距离、(N, 3) float32路径点
+        """
+        start_key, end_key = self._quantize(start), self._quantize(end)
+        key = (self.scene_id, start_key, end_key)
+
+        result = self._cache.get(key)
+        if result is not None:
+            return result
+
+        path = habitat_sim.ShortestPath()
+        path.requested_start = np.array(start_key, dtype=np.float32) * self.quantization
+        path.requested_end = np.array(end_key, dtype=np.float32) * self.quantization
+        found_path = self.pathfinder.find_path(path)
+        points = np.array(path.points, dtype=np.float32).reshape(-1, 3)
+        # 缓存的数组设为只读，避免调用方修改后污染缓存
+        points.setflags(write=False)
+        result = (bool(found_path), float(path.geodesic_distance), points)
+        self._cache.put(key, result)
+        return result
+
+    def geodesic_distance(self, start, end):
+        """只返回测地距离（找不到路径时为inf）"""
+        found_path, distance, _ = self.find_path(start, end)
+        return distance if found_path else float("inf")
+
+    @property
+    def stats(self):
+        """命中/未命中计数"""
+        return self._cache.stats
+
+    def close(self):
+        self._cache.close()
@@ -0,0 +1,131 @@
+"""
+沿最短路径渲染：按固定步长重采样路径，一次NumPy运算算出所有路径点的朝向四元数
+（与逐点调用 mn.Matrix4.look_at -> mn.Quaternion.from_matrix -> utils.quat_from_magnum 的结果一致），
+并批量设置位姿、只渲染需要的传感器，按批产出观测，用于低成本生成平滑的沿路径漫游视频
+"""
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+from habitat_sim.utils import common as utils  # 通用工具函数（如坐标转换、数据格式处理）
+
+from lazy_sensors import LazySimulator
+
+
+def resample_path(points, step) -> np.ndarray:
+    """
+    按固定弧长步长重采样折线路径（保留起点和终点）
+
+    参数:
+    points: (N, 3) 路径点（如ShortestPath.points）
+    step: 相邻采样点之间的路径长度（米）
+
+    返回:
+    np.ndarray: (M, 3) float32采样点
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) < 2:
+        return points.astype(np.float32)
+    arc = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    samples = np.arange(0.0, arc[-1], step)
+    if len(samples) == 0 or arc[-1] - samples[-1] > 1e-6:
+        samples = np.append(samples, arc[-1])
+    resampled = np.stack([np.interp(samples, arc, points[:, axis]) for axis in range(3)], axis=1)
+    return resampled.astype(np.float32)
+
+
+def _matrix_to_quat_coeffs(matrices):
+    """(N, 3, 3) 旋转矩阵 -> (N, 4) 四元数系数 [x, y, z, w]（按最大分量分支，数值稳定）"""
+    m = matrices
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    candidates = np.stack(
+        [
+            # w最大
+            [m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0], m[:, 1, 0] - m[:, 0, 1], 1 + trace],
+            # x最大
+            [1 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2], m[:, 0, 1] + m[:, 1, 0], m[:, 0, 2] + m[:, 2, 0], m[:, 2, 1] - m[:, 1, 2]],
+            # y最大
+            [m[:, 0, 1] + m[:, 1, 0], 1 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2], m[:, 1, 2] + m[:, 2, 1], m[:, 0, 2] - m[:, 2, 0]],
+            # z最大
+            [m[:, 0, 2] + m[:, 2, 0], m[:, 1, 2] + m[:, 2, 1], 1 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2], m[:, 1, 0] - m[:, 0, 1]],
+        ]
+    )  # (4分支, 4分量, N)
+    diagonal = np.stack([trace, m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]])
+    branch = np.argmax(diagonal, axis=0)
+    quats = candidates[branch, :, np.arange(len(m))]
+    quats /= np.linalg.norm(quats, axis=1, keepdims=True)
+    # 统一取w >= 0的表示
+    return quats * np.where(quats[:, 3:] < 0, -1.0, 1.0)
+
+
+def look_at_quaternions(points, up=(0.0, 1.0, 0.0)) -> np.ndarray:
+    """
+    每个路径点朝向下一个路径点的旋转（最后一个点沿用前一段的方向），
+    与 mn.Matrix4.look_at(point, next_point, up) 得到的旋转相同；
+    沿up方向的竖直路径段（look_at的结果为nan）沿用之前最近一个非竖直段的朝向
+
+    参数:
+    points: (N, 3) 路径点
+    up: 世界坐标系的上方向
+
+    返回:
+    np.ndarray: (N, 4) 四元数系数 [x, y, z, w]，可用utils.quat_from_coeffs转换
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) < 2:
+        return np.tile([0.0, 0.0, 0.0, 1.0], (len(points), 1))
+    tangents = np.diff(points, axis=0)
+    tangents = np.concatenate([tangents, tangents[-1:]])
+    lengths = np.linalg.norm(tangents, axis=1)
+    up = np.asarray(up, dtype=np.float64)
+    right = np.cross(tangents, up)
+    right_lengths = np.linalg.norm(right, axis=1)
+    # 重合的相邻点没有方向，竖直段的右方向不确定，都沿用之前最近一个有效方向（开头的无效点使用第一个有效方向）
+    valid = (lengths > 1e-9) & (right_lengths > 1e-6 * lengths * np.linalg.norm(up))
+    if not valid.any():
+        return np.tile([0.0, 0.0, 0.0, 1.0], (len(points), 1))
+    source = np.maximum.accumulate(np.where(valid, np.arange(len(points)), -1))
+    source[source < 0] = np.argmax(valid)
+    forward = tangents[source] / lengths[source, None]
+    right = right[source] / right_lengths[source, None]
+    true_up = np.cross(right, forward)
+    # 相机坐标系：x向右，y向上，-z向前
+    matrices = np.stack([right, true_up, -forward], axis=2)
+    return _matrix_to_quat_coeffs(matrices)
+
+
+def render_path(sim, positions, rotations, sensors=("color_sensor",), agent_id=0, batch_size=32):
+    """
+    依次把智能体放到每个位姿并渲染指定的传感器，每渲染batch_size帧产出一批，内存占用不随路径长度增长
+
+    参数:
+    sim: habitat_sim.Simulator
+    positions: (N, 3) 位置
+    rotations: (N, 4) 四元数系数 [x, y, z, w]（look_at_quaternions的返回值）
+    sensors: 需要渲染的传感器uuid（其余传感器不渲染）
+    agent_id: 智能体ID
+    batch_size: 每批的帧数
+
+    返回:
+    生成器，产出 dict: 传感器uuid -> (B, ...) 观测数组（B <= batch_size，各批复用同一块缓冲区，
+    在取下一批之前有效，需要保留时请复制）
+    """
+    lazy_sim = LazySimulator(sim, agent_id)
+    agent = lazy_sim.agent
+    agent_state = agent.get_state()
+    frames = {}
+    count = 0
+    for position, rotation in zip(positions, rotations):
+        agent_state.position = position
+        agent_state.rotation = utils.quat_from_coeffs(rotation)
+        agent.set_state(agent_state)
+        observations = lazy_sim.get_sensor_observations(list(sensors))
+        for uuid in sensors:
+            value = observations[uuid]
+            if uuid not in frames:
+                frames[uuid] = np.empty((batch_size,) + value.shape, dtype=value.dtype)
+            frames[uuid][count] = value
+        count += 1
+        if count == batch_size:
+            yield frames
+            count = 0
+    if count:
+        yield {uuid: frame[:count] for uuid, frame in frames.items()}
@@ -0,0 +1,290 @@
+"""
+多进程PointNav episode生成：每个场景的episode按固定大小分片，worker进程从任务队列领取分片
+（同一场景的分片连续排列；worker只加载导航网格（PathFinder，不创建仿真器和渲染器），场景变化时才重新加载），
+按楼层、岛（连通区域）、测地距离和测地/直线距离比过滤起终点，
+每个分片的随机种子由 (种子, 场景, 分片号) 确定，与由哪个worker生成无关；
+分片生成完立即写出gzip JSON（habitat PointNav数据集格式），可由habitat.make_dataset直接读取：
+    {output_dir}/{split}/{split}.json.gz                      （episodes为空）
+    {output_dir}/{split}/content/{场景名}_{分片号}.json.gz    （content_scenes=["*"]时全部读取）
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import tempfile
+import time
+import traceback
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+import habitat_sim  # Habitat-Sim主库（仿真核心）
+
+# 与habitat的pointnav_generator一致的默认过滤参数
+ISLAND_RADIUS_LIMIT = 1.5
+REJECT_REASONS = ("floor", "distance", "island", "no_path", "ratio")
+
+
+def shard_seed(seed, scene_id, shard):
+    """由 (种子, 场景, 分片号) 确定的分片随机种子"""
+    digest = hashlib.sha1(f"{seed}:{scene_id}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:4], "little") & 0x7FFFFFFF
+
+
+def sample_episodes(
+    pathfinder,
+    num_episodes,
+    rng,
+    scene_id,
+    first_episode_id=0,
+    closest_dist_limit=1.0,
+    furthest_dist_limit=30.0,
+    geodesic_to_euclid_min_ratio=1.1,
+    ratio_sample_rate=0.2,
+    island_radius_limit=ISLAND_RADIUS_LIMIT,
+    max_floor_delta=0.5,
+    batch_size=256,
+    max_attempts=None,
+):
+    """
+    采样满足条件的PointNav episode：每批采样batch_size对起终点，先用NumPy做便宜的过滤（楼层、直线距离），
+    再查岛（每个岛的半径只查一次），最后只对剩下的点对调用find_path
+
+    参数:
+    pathfinder: 已加载导航网格并设置好种子的PathFinder
+    num_episodes: 需要的episode数
+    rng: np.random.Generator（起点朝向和距离比的随机接受）
+    scene_id: 写入episode的场景ID
+    first_episode_id: 第一个episode的编号
+    closest_dist_limit, furthest_dist_limit: 测地距离范围（米）
+    geodesic_to_euclid_min_ratio: 测地/直线距离比低于该值的点对（几乎是直线）只以ratio_sample_rate的概率保留
+    island_radius_limit: 起点所在岛的半径下限（米），过滤导航网格上的小碎片
+    max_floor_delta: 起终点高度差上限（米），不跨楼层
+    batch_size: 每批采样的点对数
+    max_attempts: 最多尝试的点对数（None为不限），超出时返回已有的episode
+
+    返回:
+    (episodes, stats): episode字典列表，以及 attempts、accepted 和各拒绝原因的计数
+    """
+    stats = {"attempts": 0, "accepted": 0, **{reason: 0 for reason in REJECT_REASONS}}
+    episodes = []
+    island_radius = {}
+    path = habitat_sim.ShortestPath()
+    while len(episodes) < num_episodes and (max_attempts is None or stats["attempts"] < max_attempts):
+        points = np.array([pathfinder.get_random_navigable_point() for _ in range(2 * batch_size)], dtype=np.float32)
+        sources, targets = points[:batch_size], points[batch_size:]
+        stats["attempts"] += batch_size
+
+        same_floor = np.abs(sources[:, 1] - targets[:, 1]) <= max_floor_delta
+        euclid = np.linalg.norm(targets - sources, axis=1)
+        # 测地距离不小于直线距离：直线距离已超过上限的点对不必查路径
+        in_range = same_floor & (euclid > 0) & (euclid <= furthest_dist_limit)
+        stats["floor"] += int(np.count_nonzero(~same_floor))
+        stats["distance"] += int(np.count_nonzero(same_floor & ~in_range))
+
+        for i in np.flatnonzero(in_range):
+            source, target = sources[i], targets[i]
+            island = pathfinder.get_island(source)
+            if island not in island_radius:
+                island_radius[island] = pathfinder.island_radius(source)
+            if island != pathfinder.get_island(target) or island_radius[island] < island_radius_limit:
+                stats["island"] += 1
+                continue
+            path.requested_start = source
+            path.requested_end = target
+            if not pathfinder.find_path(path) or not np.isfinite(path.geodesic_distance):
+                stats["no_path"] += 1
+                continue
+            geodesic = float(path.geodesic_distance)
+            if not closest_dist_limit <= geodesic <= furthest_dist_limit:
+                stats["distance"] += 1
+                continue
+            if geodesic / euclid[i] < geodesic_to_euclid_min_ratio and rng.random() > ratio_sample_rate:
+                stats["ratio"] += 1
+                continue
+
+            angle = rng.uniform(0, 2 * np.pi)
+            episodes.append(
+                {
+                    "episode_id": str(first_episode_id + len(episodes)),
+                    "scene_id": scene_id,
+                    "start_position": source.tolist(),
+                    "start_rotation": [0.0, float(np.sin(angle / 2)), 0.0, float(np.cos(angle / 2))],
+                    "info": {"geodesic_distance": geodesic, "euclidean_distance": float(euclid[i])},
+                    "goals": [{"position": target.tolist(), "radius": None}],
+                    "shortest_paths": None,
+                    "start_room": None,
+                }
+            )
+            if len(episodes) == num_episodes:
+                break
+    stats["accepted"] = len(episodes)
+    return episodes, stats
+
+
+def _write_json_gz(path, data):
+    # 先写临时文件再原子替换，中断后不会留下不完整的分片
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f, gzip.open(f, "wt") as gz:
+        json.dump(data, gz)
+    os.replace(tmp_path, path)
+
+
+def shard_path(output_dir, split, scene_id, shard):
+    scene_name = os.path.splitext(os.path.basename(scene_id))[0]
+    return os.path.join(output_dir, split, "content", f"{scene_name}_{shard:05d}.json.gz")
+
+
+def _generate_worker(worker_id, tasks, results, seed, options):
+    """worker进程主循环：领取 (场景, 导航网格, 分片号, episode数) 任务，生成并写出分片"""
+    pathfinder, loaded = None, None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            scene_id, navmesh_path, shard, num_episodes, path = task
+            start = time.perf_counter()
+            if navmesh_path != loaded:
+                pathfinder = habitat_sim.nav.PathFinder()
+                if not pathfinder.load_nav_mesh(navmesh_path):
+                    raise RuntimeError(f"无法加载导航网格: {navmesh_path}")
+                loaded = navmesh_path
+            shard_rng_seed = shard_seed(seed, scene_id, shard)
+            pathfinder.seed(shard_rng_seed)
+            rng = np.random.default_rng(shard_rng_seed)
+            episodes, stats = sample_episodes(
+                pathfinder, num_episodes, rng, scene_id, first_episode_id=shard * options["episodes_per_shard"],
+                **options["filters"],
+            )
+            _write_json_gz(path, {"episodes": episodes})
+            stats["time"] = time.perf_counter() - start
+            results.put(("shard", (scene_id, shard, stats)))
+    except Exception:
+        results.put(("error", f"worker {worker_id}:\n{traceback.format_exc()}"))
+    finally:
+        results.put(("done", worker_id))
+
+
+def generate_dataset(
+    scenes,
+    output_dir,
+    split="train",
+    episodes_per_scene=1000,
+    episodes_per_shard=1000,
+    num_workers=None,
+    seed=0,
+    **filters,
+):
+    """
+    多进程生成PointNav数据集，按完成顺序逐个产出分片的统计
+
+    参数:
+    scenes: 场景列表，每项为场景路径（导航网格为同名的.navmesh）或 (scene_id, 导航网格路径)
+    output_dir: 输出目录
+    split: 数据集划分名
+    episodes_per_scene: 每个场景的episode数
+    episodes_per_shard: 每个分片的episode数
+    num_workers: worker进程数，None为CPU核数
+    seed: 数据集种子
+    filters: 传给sample_episodes的过滤参数（closest_dist_limit、furthest_dist_limit等）
+
+    返回:
+    生成器，产出 (scene_id, shard, stats)；已存在的分片被跳过（相同参数下结果相同，可中断后继续）
+    """
+    num_workers = os.cpu_count() if num_workers is None else num_workers
+    os.makedirs(os.path.join(output_dir, split, "content"), exist_ok=True)
+    main_path = os.path.join(output_dir, split, f"{split}.json.gz")
+    if not os.path.exists(main_path):
+        _write_json_gz(main_path, {"episodes": []})
+
+    ctx = mp.get_context("fork")
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    for scene in scenes:
+        scene_id, navmesh_path = (scene, os.path.splitext(scene)[0] + ".navmesh") if isinstance(scene, str) else scene
+        for shard, first in enumerate(range(0, episodes_per_scene, episodes_per_shard)):
+            path = shard_path(output_dir, split, scene_id, shard)
+            if not os.path.exists(path):
+                tasks.put((scene_id, navmesh_path, shard, min(episodes_per_shard, episodes_per_scene - first), path))
+    for _ in range(num_workers):
+        tasks.put(None)
+
+    # 导航网格太小或过滤条件太严时不会无限采样下去
+    filters.setdefault("max_attempts", 1000 * episodes_per_shard)
+    options = {"episodes_per_shard": episodes_per_shard, "filters": filters}
+    processes = [
+        ctx.Process(target=_generate_worker, args=(worker_id, tasks, results, seed, options), daemon=True)
+        for worker_id in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+
+    errors = []
+    running = set(range(num_workers))
+    try:
+        while running:
+            try:
+                message = results.get(timeout=1.0)
+            except queue.Empty:
+                # worker被系统杀死时收不到done消息
+                for worker_id in list(running):
+                    if not processes[worker_id].is_alive() and processes[worker_id].exitcode != 0:
+                        errors.append(f"worker {worker_id}: 异常退出（exitcode={processes[worker_id].exitcode}）")
+                        running.discard(worker_id)
+                continue
+            if message[0] == "shard":
+                yield message[1]
+            elif message[0] == "error":
+                errors.append(message[1])
+            else:
+                running.discard(message[1])
+    finally:
+        for process in processes:
+            if running:
+                process.terminate()
+            process.join()
+    if errors:
+        raise RuntimeError("生成进程出错:\n" + "\n".join(errors))
+
+
+if __name__ == "__main__":
+    # python pointnav_generator.py --scenes a.glb b.glb --episodes-per-scene 100000 --workers 8
+    # 之后在配置中设置 habitat.dataset.data_path={output_dir}/{split}/{split}.json.gz 即可用habitat.make_dataset读取
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", nargs="+", required=True)
+    parser.add_argument("--output-dir", default="./pointnav_dataset")
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--episodes-per-scene", type=int, default=10000)
+    parser.add_argument("--episodes-per-shard", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--closest-dist-limit", type=float, default=1.0)
+    parser.add_argument("--furthest-dist-limit", type=float, default=30.0)
+    parser.add_argument("--geodesic-to-euclid-min-ratio", type=float, default=1.1)
+    args = parser.parse_args()
+
+    start = time.time()
+    totals = {}
+    for scene_id, shard, stats in generate_dataset(
+        args.scenes,
+        args.output_dir,
+        args.split,
+        args.episodes_per_scene,
+        args.episodes_per_shard,
+        args.workers,
+        args.seed,
+        closest_dist_limit=args.closest_dist_limit,
+        furthest_dist_limit=args.furthest_dist_limit,
+        geodesic_to_euclid_min_ratio=args.geodesic_to_euclid_min_ratio,
+    ):
+        for key, value in stats.items():
+            totals[key] = totals.get(key, 0) + value
+        print(f"{os.path.basename(scene_id)} shard {shard}: {stats['accepted']} episodes ({stats['time']:.2f}s)")
+    elapsed = time.time() - start
+    accepted = totals.get("accepted", 0)
+    print(f"生成 {accepted} 个episode，耗时 {elapsed:.1f}s（{accepted / elapsed * 3600:.0f} episodes/小时）")
+    if accepted:
+        print("拒绝原因: " + ", ".join(f"{reason}={totals[reason]}" for reason in REJECT_REASONS))
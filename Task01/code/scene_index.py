@@ -0,0 +1,284 @@
+"""
+语义场景的空间索引：把semantic_scene中所有物体的AABB、类别和所属区域展开成数组，
+并在水平面(x, z)上建立均匀网格，半径/包围盒/最近邻查询只检查附近网格中的物体；
+索引可保存为.npz文件，按场景文件缓存到磁盘，不必每次递归遍历 levels -> regions -> objects
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+
+def _name(category):
+    # 部分物体/区域没有类别
+    return category.name() if category is not None else ""
+
+
+class SceneIndex:
+    """
+    语义物体的网格空间索引
+
+    参数:
+    arrays: 数组名 -> np.ndarray（由from_scene构建或从文件读取）
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.object_ids = arrays["object_ids"]
+        self.semantic_ids = arrays["semantic_ids"]
+        self.categories = arrays["categories"]
+        self.region_ids = arrays["region_ids"]
+        self.lower = arrays["lower"]
+        self.upper = arrays["upper"]
+        self.cell_size = float(arrays["cell_size"])
+        self.grid_origin = arrays["grid_origin"]
+        self.grid_shape = tuple(int(v) for v in arrays["grid_shape"])
+        self._cell_offsets = arrays["cell_offsets"]
+        self._cell_objects = arrays["cell_objects"]
+
+        # 类别 -> 物体下标、区域 -> 物体下标
+        self._by_category = self._group(self.categories)
+        self._by_region = self._group(self.region_ids)
+
+    @staticmethod
+    def _group(labels):
+        order = np.argsort(labels, kind="stable")
+        names, starts = np.unique(labels[order], return_index=True)
+        return dict(zip(names.tolist(), np.split(order, starts[1:])))
+
+    def __len__(self):
+        return len(self.object_ids)
+
+    @classmethod
+    def from_scene(cls, semantic_scene, cell_size=1.0):
+        """
+        遍历一次semantic_scene构建索引
+
+        参数:
+        semantic_scene: sim.semantic_scene
+        cell_size: 水平网格的边长（米）
+
+        返回:
+        SceneIndex
+        """
+        objects = [obj for obj in semantic_scene.objects if obj is not None]
+        centers = np.array([obj.aabb.center for obj in objects], dtype=np.float32).reshape(-1, 3)
+        sizes = np.array([obj.aabb.sizes for obj in objects], dtype=np.float32).reshape(-1, 3)
+        regions = [region for region in semantic_scene.regions if region is not None]
+
+        arrays = {
+            "object_ids": np.array([obj.id for obj in objects], dtype=str),
+            "semantic_ids": np.array([obj.semantic_id for obj in objects], dtype=np.int64),
+            "categories": np.array([_name(obj.category) for obj in objects], dtype=str),
+            "region_ids": np.array([obj.region.id if obj.region is not None else "" for obj in objects], dtype=str),
+            "lower": centers - sizes / 2,
+            "upper": centers + sizes / 2,
+            "region_table_ids": np.array([region.id for region in regions], dtype=str),
+            "region_table_categories": np.array([_name(region.category) for region in regions], dtype=str),
+            "cell_size": np.float64(cell_size),
+        }
+        arrays.update(cls._build_grid(arrays["lower"], arrays["upper"], cell_size))
+        return cls(arrays)
+
+    @staticmethod
+    def _build_grid(lower, upper, cell_size):
+        """
+        把每个物体登记到它的AABB在水平面上覆盖的所有网格中，按网格编号存为CSR格式
+        """
+        if len(lower) == 0:
+            return {
+                "grid_origin": np.zeros(2),
+                "grid_shape": np.array([1, 1]),
+                "cell_offsets": np.zeros(2, dtype=np.int64),
+                "cell_objects": np.zeros(0, dtype=np.int64),
+            }
+        origin = lower[:, [0, 2]].min(axis=0).astype(np.float64)
+        extent = upper[:, [0, 2]].max(axis=0) - origin
+        grid_shape = np.maximum(np.ceil(extent / cell_size).astype(np.int64), 1)  # (x方向格数, z方向格数)
+
+        first = np.clip(((lower[:, [0, 2]] - origin) // cell_size).astype(np.int64), 0, grid_shape - 1)
+        last = np.clip(((upper[:, [0, 2]] - origin) // cell_size).astype(np.int64), 0, grid_shape - 1)
+        spans = last - first + 1
+        counts = spans[:, 0] * spans[:, 1]
+
+        # 展开每个物体覆盖的 (ix, iz)
+        object_index = np.repeat(np.arange(len(lower)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        ix = first[object_index, 0] + local % spans[object_index, 0]
+        iz = first[object_index, 1] + local // spans[object_index, 0]
+        cells = iz * grid_shape[0] + ix
+
+        order = np.argsort(cells, kind="stable")
+        cell_offsets = np.zeros(grid_shape[0] * grid_shape[1] + 1, dtype=np.int64)
+        cell_offsets[1:] = np.cumsum(np.bincount(cells, minlength=grid_shape[0] * grid_shape[1]))
+        return {
+            "grid_origin": origin,
+            "grid_shape": grid_shape,
+            "cell_offsets": cell_offsets,
+            "cell_objects": object_index[order],
+        }
+
+    def _candidates(self, lower, upper):
+        """与水平范围 [lower, upper]（x, z）重叠的网格中登记的物体（去重）"""
+        first = np.floor((np.asarray(lower) - self.grid_origin) / self.cell_size).astype(np.int64)
+        last = np.floor((np.asarray(upper) - self.grid_origin) / self.cell_size).astype(np.int64)
+        shape = np.array(self.grid_shape)
+        if np.any(last < 0) or np.any(first >= shape):
+            return np.zeros(0, dtype=np.int64)
+        first = np.maximum(first, 0)
+        last = np.minimum(last, shape - 1)
+        # 同一行(z)中相邻的网格在CSR中是连续的，每行只需一次切片
+        width = self.grid_shape[0]
+        pieces = [
+            self._cell_objects[self._cell_offsets[iz * width + first[0]] : self._cell_offsets[iz * width + last[0] + 1]]
+            for iz in range(first[1], last[1] + 1)
+        ]
+        # 跨多个网格的物体会重复出现：排序后去掉相邻重复值（比np.unique更快）
+        candidates = np.sort(np.concatenate(pieces))
+        keep = np.ones(len(candidates), dtype=bool)
+        keep[1:] = candidates[1:] != candidates[:-1]
+        return candidates[keep]
+
+    def _filter(self, indices, category=None, region_id=None):
+        if category is not None:
+            indices = indices[self.categories[indices] == category]
+        if region_id is not None:
+            indices = indices[self.region_ids[indices] == region_id]
+        return indices
+
+    def query_box(self, lower, upper, category=None, region_id=None) -> np.ndarray:
+        """
+        与三维包围盒 [lower, upper] 相交的物体
+
+        参数:
+        lower, upper: 包围盒的最小/最大角点 (3,)
+        category: 可选，只返回该类别的物体
+        region_id: 可选，只返回该区域中的物体
+
+        返回:
+        np.ndarray: 物体下标（self.object_ids[下标] 为物体ID）
+        """
+        lower = np.asarray(lower, dtype=np.float32)
+        upper = np.asarray(upper, dtype=np.float32)
+        indices = self._filter(self._candidates(lower[[0, 2]], upper[[0, 2]]), category, region_id)
+        overlap = np.all((self.lower[indices] <= upper) & (self.upper[indices] >= lower), axis=1)
+        return indices[overlap]
+
+    def distances(self, point, indices=None) -> np.ndarray:
+        """点到物体AABB的距离（点在AABB内部时为0）"""
+        point = np.asarray(point, dtype=np.float32)
+        lower = self.lower if indices is None else self.lower[indices]
+        upper = self.upper if indices is None else self.upper[indices]
+        gap = np.maximum(np.maximum(lower - point, point - upper), 0)
+        return np.sqrt(np.sum(gap * gap, axis=1))
+
+    def query_radius(self, point, radius, category=None, region_id=None) -> np.ndarray:
+        """
+        AABB到point的距离不超过radius的物体，按距离从近到远排序
+
+        返回:
+        np.ndarray: 物体下标
+        """
+        point = np.asarray(point, dtype=np.float32)
+        indices = self.query_box(point - radius, point + radius, category, region_id)
+        dist = self.distances(point, indices)
+        keep = dist <= radius
+        return indices[keep][np.argsort(dist[keep], kind="stable")]
+
+    def nearest(self, point, k=1, category=None, region_id=None) -> np.ndarray:
+        """
+        距离point最近的k个物体（从一个网格的半径开始逐步扩大搜索范围）
+
+        返回:
+        np.ndarray: 物体下标，按距离从近到远排序（满足条件的物体不足k个时返回全部）
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        point = np.asarray(point, dtype=np.float32)
+        # 搜索半径达到point到场景包围盒最远角点的距离时，已覆盖全部物体
+        farthest = np.linalg.norm(np.maximum(np.abs(point - self.lower.min(axis=0)), np.abs(point - self.upper.max(axis=0))))
+        radius = self.cell_size
+        while True:
+            indices = self.query_radius(point, radius, category, region_id)
+            # 半径内已有k个物体时，半径外的物体不可能更近
+            if len(indices) >= k or radius >= farthest:
+                return indices[:k]
+            radius *= 2
+
+    def by_category(self, category) -> np.ndarray:
+        """某类别的所有物体下标"""
+        return self._by_category.get(category, np.zeros(0, dtype=np.int64))
+
+    def in_region(self, region_id, category=None) -> np.ndarray:
+        """某区域中的所有物体下标，可按类别过滤"""
+        return self._filter(self._by_region.get(region_id, np.zeros(0, dtype=np.int64)), category)
+
+    def region_category(self, region_id):
+        """区域的类别名"""
+        match = np.nonzero(self.arrays["region_table_ids"] == region_id)[0]
+        return str(self.arrays["region_table_categories"][match[0]]) if len(match) else ""
+
+    def save(self, path):
+        """把索引保存为压缩的.npz文件"""
+        np.savez_compressed(path, **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        """从save保存的.npz文件恢复索引"""
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+
+def _semantic_files(scene_path):
+    """
+    场景文件旁边的语义标注文件：MP3D的{场景名}.house、HM3D的{场景名}.semantic.txt/.semantic.glb、Replica的info_semantic.json
+    """
+    directory = os.path.dirname(scene_path)
+    stem = os.path.basename(scene_path).split(".")[0]
+    names = [f"{stem}.house", f"{stem}.semantic.txt", f"{stem}.semantic.glb", "info_semantic.json"]
+    return [os.path.join(directory, name) for name in names if os.path.exists(os.path.join(directory, name))]
+
+
+def load_scene_index(semantic_scene, scene_path, cache_dir="./scene_index_cache", cell_size=1.0, semantic_paths=None):
+    """
+    读取磁盘缓存的场景索引，未命中时遍历semantic_scene构建并写入缓存
+
+    参数:
+    semantic_scene: sim.semantic_scene
+    scene_path: 场景文件路径
+    cache_dir: 缓存目录
+    cell_size: 水平网格的边长（米）
+    semantic_paths: 语义标注文件路径列表，None时自动查找场景文件旁边的标注文件（见_semantic_files）。
+        缓存键由场景文件和标注文件的路径、大小、修改时间以及物体数生成，只更新语义标注时也会重建
+
+    返回:
+    SceneIndex
+    """
+    if semantic_paths is None:
+        semantic_paths = _semantic_files(scene_path)
+    params = []
+    for file_path in [scene_path, *semantic_paths]:
+        st = os.stat(file_path)
+        params.append([os.path.abspath(file_path), st.st_size, st.st_mtime_ns])
+    params.append([len(semantic_scene.objects), float(cell_size)])
+    key = hashlib.sha1(json.dumps(params).encode()).hexdigest()
+    path = os.path.join(cache_dir, f"{key}.npz")
+    if os.path.exists(path):
+        return SceneIndex.load(path)
+
+    index = SceneIndex.from_scene(semantic_scene, cell_size)
+    os.makedirs(cache_dir, exist_ok=True)
+    # 先写临时文件再原子替换，可被多个进程共享
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, **index.arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # 写入失败时不留下临时文件
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return index
@@ -0,0 +1,233 @@
+"""
+共享的仿真器配置与仿真器池：各脚本共用make_cfg / make_simple_cfg，
+仿真器按场景和传感器配置放入池中复用（reset或reconfigure，而不是重新创建），并记录加载耗时
+"""
+import argparse
+import time
+from collections import OrderedDict
+
+import habitat_sim  # Habitat-Sim主库（仿真核心）
+
+
+def make_cfg(settings):
+    """
+    创建完整的仿真配置（多传感器）
+
+    参数:
+    settings (dict): 仿真设置（scene、width、height、sensor_height、enable_physics，
+                     可选的scene_dataset以及color_sensor/depth_sensor/semantic_sensor开关）
+
+    返回:
+    habitat_sim.Configuration: 配置好的仿真器配置对象
+    """
+    sim_cfg = habitat_sim.SimulatorConfiguration()
+    sim_cfg.gpu_device_id = 0
+    sim_cfg.scene_id = settings["scene"]
+    if settings.get("scene_dataset"):
+        sim_cfg.scene_dataset_config_file = settings["scene_dataset"]  # 场景数据集配置文件
+    sim_cfg.enable_physics = settings.get("enable_physics", False)
+
+    # 注意：所有传感器必须具有相同的分辨率
+    sensors = {
+        "color_sensor": {
+            "sensor_type": habitat_sim.SensorType.COLOR,
+            "resolution": [settings["height"], settings["width"]],
+            "position": [0.0, settings["sensor_height"], 0.0],
+        },
+        "depth_sensor": {
+            "sensor_type": habitat_sim.SensorType.DEPTH,
+            "resolution": [settings["height"], settings["width"]],
+            "position": [0.0, settings["sensor_height"], 0.0],
+        },
+        "semantic_sensor": {
+            "sensor_type": habitat_sim.SensorType.SEMANTIC,
+            "resolution": [settings["height"], settings["width"]],
+            "position": [0.0, settings["sensor_height"], 0.0],
+        },
+    }
+
+    sensor_specs = []
+    for sensor_uuid, sensor_params in sensors.items():
+        if settings.get(sensor_uuid, False):
+            sensor_spec = habitat_sim.CameraSensorSpec()
+            sensor_spec.uuid = sensor_uuid
+            sensor_spec.sensor_type = sensor_params["sensor_type"]
+            sensor_spec.resolution = sensor_params["resolution"]
+            sensor_spec.position = sensor_params["position"]
+
+            sensor_specs.append(sensor_spec)
+
+    # 在这里可以指定前进动作的位移量和转向角度
+    agent_cfg = habitat_sim.agent.AgentConfiguration()
+    agent_cfg.sensor_specifications = sensor_specs
+    agent_cfg.action_space = {
+        "move_forward": habitat_sim.agent.ActionSpec(
+            "move_forward", habitat_sim.agent.ActuationSpec(amount=0.25)
+        ),
+        "turn_left": habitat_sim.agent.ActionSpec(
+            "turn_left", habitat_sim.agent.ActuationSpec(amount=30.0)
+        ),
+        "turn_right": habitat_sim.agent.ActionSpec(
+            "turn_right", habitat_sim.agent.ActuationSpec(amount=30.0)
+        ),
+    }
+
+    return habitat_sim.Configuration(sim_cfg, [agent_cfg])
+
+
+def make_simple_cfg(settings):
+    """
+    创建简单的仿真配置（仅RGB传感器）
+    """
+    # 仿真器后端配置
+    sim_cfg = habitat_sim.SimulatorConfiguration()
+    sim_cfg.scene_id = settings["scene"]
+
+    # 智能体配置
+    agent_cfg = habitat_sim.agent.AgentConfiguration()
+
+    # 只给智能体附加一个RGB视觉传感器
+    rgb_sensor_spec = habitat_sim.CameraSensorSpec()
+    rgb_sensor_spec.uuid = "color_sensor"
+    rgb_sensor_spec.sensor_type = habitat_sim.SensorType.COLOR
+    rgb_sensor_spec.resolution = [settings["height"], settings["width"]]
+    rgb_sensor_spec.position = [0.0, settings["sensor_height"], 0.0]
+
+    agent_cfg.sensor_specifications = [rgb_sensor_spec]
+
+    return habitat_sim.Configuration(sim_cfg, [agent_cfg])
+
+
+def make_simulator(settings):
+    """按make_cfg创建一个新的仿真器（可作为VectorSimulator的make_sim）"""
+    return habitat_sim.Simulator(make_cfg(settings))
+
+
+class SimulatorPool:
+    """
+    仿真器池：相同配置的请求直接复用存活的仿真器（reset），
+    配置不同时优先reconfigure同场景的仿真器（habitat_sim只重建传感器，不重新加载场景），
+    池满时reconfigure最久未使用的仿真器，避免重新创建渲染上下文
+
+    参数:
+    max_size: 池中最多同时存活的仿真器数
+    """
+
+    def __init__(self, max_size=1):
+        self.max_size = max_size
+        self._sims = OrderedDict()
+        self.stats = {"cold_starts": 0, "reconfigures": 0, "reuses": 0, "load_time": 0.0}
+        # 每次获取仿真器的记录：(方式, 场景, 耗时秒)
+        self.load_times = []
+
+    @staticmethod
+    def _key(settings, simple):
+        # 种子和默认智能体不影响仿真器配置，复用时重新设置即可
+        return (simple,) + tuple(
+            sorted((k, repr(v)) for k, v in settings.items() if k not in ("seed", "default_agent"))
+        )
+
+    def get(self, settings, simple=False):
+        """
+        获取与settings匹配的仿真器（调用方不要关闭它，由池统一关闭）
+
+        参数:
+        settings: 仿真设置字典
+        simple: 为True时使用make_simple_cfg（仅RGB），否则使用make_cfg
+
+        返回:
+        habitat_sim.Simulator
+        """
+        key = self._key(settings, simple)
+        start = time.time()
+        if key in self._sims:
+            sim = self._sims[key]
+            self._sims.move_to_end(key)
+            sim.reset()
+            kind = "reuse"
+            self.stats["reuses"] += 1
+        else:
+            cfg = make_simple_cfg(settings) if simple else make_cfg(settings)
+            same_scene = [k for k, s in self._sims.items() if s.config.sim_cfg.scene_id == settings["scene"]]
+            if not same_scene and len(self._sims) < self.max_size:
+                sim = habitat_sim.Simulator(cfg)
+                kind = "cold_start"
+                self.stats["cold_starts"] += 1
+            else:
+                # 优先选择同一场景的仿真器，否则选最久未使用的
+                old_key = same_scene[-1] if same_scene else next(iter(self._sims))
+                sim = self._sims.pop(old_key)
+                sim.reconfigure(cfg)
+                kind = "reconfigure"
+                self.stats["reconfigures"] += 1
+            self._sims[key] = sim
+
+        if "seed" in settings:
+            sim.seed(settings["seed"])
+        elapsed = time.time() - start
+        self.stats["load_time"] += elapsed
+        self.load_times.append((kind, settings["scene"], elapsed))
+        return sim
+
+    def close(self):
+        for sim in self._sims.values():
+            sim.close()
+        self._sims.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# 进程内共享的默认仿真器池
+default_pool = SimulatorPool()
+
+
+def get_simulator(settings, simple=False):
+    """从默认仿真器池获取仿真器，参数同SimulatorPool.get"""
+    return default_pool.get(settings, simple)
+
+
+if __name__ == "__main__":
+    # 比较每次重新创建仿真器（冷启动）和从池中复用（热启动）的耗时：
+    # python sim_factory.py --scene ../data/scene_datasets/mp3d_example/17DRP5sb8fy/17DRP5sb8fy.glb
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scene", default="../data/scene_datasets/mp3d_example/17DRP5sb8fy/17DRP5sb8fy.glb")
+    parser.add_argument("--scene-dataset", default="../data/scene_datasets/mp3d_example/mp3d.scene_dataset_config.json")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    settings = {
+        "width": 256,
+        "height": 256,
+        "scene": args.scene,
+        "scene_dataset": args.scene_dataset,
+        "sensor_height": 1.5,
+        "color_sensor": True,
+        "depth_sensor": True,
+        "semantic_sensor": True,
+        "seed": 1,
+        "enable_physics": False,
+    }
+
+    cold = []
+    for _ in range(args.repeats):
+        start = time.time()
+        sim = make_simulator(settings)
+        cold.append(time.time() - start)
+        sim.close()
+
+    with SimulatorPool() as pool:
+        pool.get(settings)
+        for i in range(args.repeats):
+            pool.get({**settings, "seed": i})
+        # 只改变传感器配置：同场景reconfigure
+        pool.get({**settings, "semantic_sensor": False})
+        for kind, scene, elapsed in pool.load_times:
+            print(f"{kind:12s} {elapsed * 1000:9.1f} ms")
+        warm = [elapsed for kind, _, elapsed in pool.load_times if kind == "reuse"]
+
+    print(f"cold start: {sum(cold) / len(cold) * 1000:.1f} ms/run")
+    print(f"warm reuse: {sum(warm) / len(warm) * 1000:.1f} ms/run")
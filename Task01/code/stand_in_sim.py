@@ -0,0 +1,332 @@
+"""
+本地替身仿真器：接口与habitat_sim.Simulator中数据采集用到的部分一致（reset/step/get_agent/seed/close），
+用NumPy对一个长方体房间做光线求交生成RGB、深度和语义观测，不需要GPU、场景文件和habitat_sim，
+用于在没有渲染环境的机器上测试和压测多进程数据采集流程
+"""
+from dataclasses import dataclass
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+# 房间的半尺寸 (x, y, z)，地面在y=0
+ROOM_HALF_EXTENTS = np.array([4.0, 1.5, 3.0])
+# 六个面的语义ID和颜色：-x, +x, 地面, 天花板, -z, +z
+FACE_IDS = np.array([1, 2, 3, 4, 5, 6], dtype=np.uint32)
+FACE_COLORS = np.array(
+    [[200, 80, 80], [80, 200, 80], [120, 120, 120], [230, 230, 230], [80, 80, 200], [200, 200, 80]],
+    dtype=np.float32,
+)
+
+
+def yaw_to_quat_coeffs(yaw) -> np.ndarray:
+    """绕y轴旋转yaw（弧度）的四元数系数 [x, y, z, w]"""
+    return np.array([0.0, np.sin(yaw / 2), 0.0, np.cos(yaw / 2)])
+
+
+def quat_coeffs(rotation) -> np.ndarray:
+    """四元数（系数数组，或habitat_sim使用的np.quaternion）-> 系数 [x, y, z, w]"""
+    if hasattr(rotation, "w"):
+        return np.array([rotation.x, rotation.y, rotation.z, rotation.w])
+    return np.asarray(rotation, dtype=np.float64)
+
+
+@dataclass
+class StandInAgentState:
+    """替身智能体状态（对应habitat_sim.AgentState），rotation为四元数系数 [x, y, z, w]"""
+
+    position: np.ndarray
+    rotation: np.ndarray
+
+
+class _StandInAgent:
+    def __init__(self, sim):
+        self._sim = sim
+
+    def get_state(self):
+        return StandInAgentState(self._sim.position.copy(), yaw_to_quat_coeffs(self._sim.yaw))
+
+    def act(self, action):
+        """执行一个动作（move_forward / turn_left / turn_right），不渲染，返回是否碰撞"""
+        sim = self._sim
+        collided = False
+        if action == "move_forward":
+            # 朝向yaw时的前向为 (-sin(yaw), 0, -cos(yaw))，与quat_from_angle_axis绕y轴旋转一致
+            target = sim.position + sim.forward_amount * np.array(
+                [-np.sin(sim.yaw), 0.0, -np.cos(sim.yaw)], dtype=np.float32
+            )
+            limit = ROOM_HALF_EXTENTS - 0.2
+            clipped = np.clip(target, -limit, limit)
+            clipped[1] = sim.position[1]
+            collided = bool(np.any(clipped != target))
+            sim.position = clipped.astype(np.float32)
+        elif action == "turn_left":
+            sim.yaw += sim.turn_amount
+        elif action == "turn_right":
+            sim.yaw -= sim.turn_amount
+        else:
+            raise ValueError(f"未知动作: {action}")
+        return collided
+
+    def set_state(self, state):
+        self._sim.position = np.array(state.position, dtype=np.float32)
+        # 只取绕y轴的旋转：前向向量 (0, 0, -1) 旋转后的方向
+        x, y, z, w = quat_coeffs(state.rotation)
+        forward = -np.array([2 * (x * z + y * w), 2 * (y * z - x * w), 1 - 2 * (x * x + y * y)])
+        self._sim.yaw = float(np.arctan2(-forward[0], -forward[2]))
+
+
+class StandInSimulator:
+    """
+    替身仿真器
+
+    参数:
+    settings: 与sim_settings相同格式的配置（使用width、height、sensor_height、seed
+              以及color_sensor/depth_sensor/semantic_sensor开关）
+    hfov: 水平视场角（度）
+    forward_amount: move_forward的位移（米）
+    turn_amount: turn_left/turn_right的转角（度）
+    """
+
+    def __init__(self, settings, hfov=90.0, forward_amount=0.25, turn_amount=30.0):
+        self.settings = settings
+        self.forward_amount = forward_amount
+        self.turn_amount = np.deg2rad(turn_amount)
+        self.sensor_height = settings.get("sensor_height", 1.5)
+        self._rng = np.random.default_rng(settings.get("seed", 0))
+        self._agent = _StandInAgent(self)
+
+        # 相机坐标系下每个像素的光线方向（x向右，y向上，-z向前），只计算一次
+        height, width = settings["height"], settings["width"]
+        focal = (width / 2) / np.tan(np.deg2rad(hfov) / 2)
+        cols = np.arange(width) + 0.5 - width / 2
+        rows = height / 2 - (np.arange(height) + 0.5)
+        self._rays = np.stack(
+            [
+                np.broadcast_to(cols[None, :], (height, width)),
+                np.broadcast_to(rows[:, None], (height, width)),
+                np.full((height, width), -focal),
+            ],
+            axis=-1,
+        ) / focal
+        self.reset()
+
+    def seed(self, new_seed):
+        self._rng = np.random.default_rng(new_seed)
+
+    def get_agent(self, agent_id=0):
+        return self._agent
+
+    def initialize_agent(self, agent_id=0, initial_state=None):
+        if initial_state is not None:
+            self._agent.set_state(initial_state)
+        return self._agent
+
+    def reset(self):
+        """把智能体放到房间内的随机位置和朝向，返回观测"""
+        limit = ROOM_HALF_EXTENTS[[0, 2]] - 0.5
+        x, z = self._rng.uniform(-limit, limit)
+        self.position = np.array([x, 0.0, z], dtype=np.float32)
+        self.yaw = float(self._rng.uniform(-np.pi, np.pi))
+        return self.get_sensor_observations()
+
+    def step(self, action):
+        """
+        执行一个动作（move_forward / turn_left / turn_right），返回观测（含collided）
+        """
+        collided = self._agent.act(action)
+        observations = self.get_sensor_observations()
+        observations["collided"] = collided
+        return observations
+
+    def get_sensor_observations(self):
+        """对房间的六个面做光线求交，生成RGB(A)、深度和语义观测"""
+        cos_yaw, sin_yaw = np.cos(self.yaw), np.sin(self.yaw)
+        # 绕y轴旋转光线到世界坐标系
+        rays = self._rays
+        directions = np.stack(
+            [
+                cos_yaw * rays[..., 0] + sin_yaw * rays[..., 2],
+                rays[..., 1],
+                -sin_yaw * rays[..., 0] + cos_yaw * rays[..., 2],
+            ],
+            axis=-1,
+        )
+        origin = self.position + np.array([0.0, self.sensor_height, 0.0])
+        lower = -ROOM_HALF_EXTENTS + [0.0, ROOM_HALF_EXTENTS[1], 0.0]
+        upper = ROOM_HALF_EXTENTS + [0.0, ROOM_HALF_EXTENTS[1], 0.0]
+
+        # 每条光线到六个平面的距离，只保留前方的交点
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_lower = (lower - origin) / directions
+            t_upper = (upper - origin) / directions
+        t = np.stack(
+            [t_lower[..., 0], t_upper[..., 0], t_lower[..., 1], t_upper[..., 1], t_lower[..., 2], t_upper[..., 2]],
+            axis=-1,
+        )
+        t = np.where(t > 0, t, np.inf)
+        face = np.argmin(t, axis=-1)
+        hit = np.take_along_axis(t, face[..., None], axis=-1)[..., 0]
+
+        observations = {}
+        if self.settings.get("color_sensor", True):
+            shade = 1.0 / (1.0 + 0.15 * hit)
+            rgb = (FACE_COLORS[face] * shade[..., None]).astype(np.uint8)
+            alpha = np.full(rgb.shape[:2] + (1,), 255, dtype=np.uint8)
+            observations["color_sensor"] = np.concatenate([rgb, alpha], axis=-1)
+        if self.settings.get("depth_sensor", True):
+            # 深度为沿相机光轴的距离（与habitat_sim的深度传感器一致）
+            observations["depth_sensor"] = (hit * -self._rays[..., 2]).astype(np.float32)
+        if self.settings.get("semantic_sensor", True):
+            observations["semantic_sensor"] = FACE_IDS[face]
+        return observations
+
+    def close(self):
+        pass
+
+
+# HabitatSimActions的离散动作编号
+STOP, MOVE_FORWARD, TURN_LEFT, TURN_RIGHT = 0, 1, 2, 3
+_ACTION_NAMES = {MOVE_FORWARD: "move_forward", TURN_LEFT: "turn_left", TURN_RIGHT: "turn_right"}
+
+
+class StandInEpisode:
+    """替身PointNav episode，字段与NavigationEpisode中评估用到的部分一致"""
+
+    def __init__(self, episode_id, start_position, start_rotation, goal_position, scene_id="stand_in"):
+        self.episode_id = episode_id
+        self.scene_id = scene_id
+        self.start_position = list(start_position)
+        self.start_rotation = list(start_rotation)
+        self.goals = [_StandInGoal(goal_position)]
+
+
+class _StandInGoal:
+    def __init__(self, position, radius=None):
+        self.position = list(position)
+        self.radius = radius
+
+
+def make_stand_in_episodes(num_episodes, seed=0, min_distance=1.0):
+    """
+    在替身房间中随机生成PointNav episode（起点和终点的距离不小于min_distance）
+
+    返回:
+    list: StandInEpisode列表
+    """
+    rng = np.random.default_rng(seed)
+    limit = ROOM_HALF_EXTENTS[[0, 2]] - 0.5
+    episodes = []
+    while len(episodes) < num_episodes:
+        start, goal = rng.uniform(-limit, limit, size=(2, 2))
+        if np.linalg.norm(goal - start) < min_distance:
+            continue
+        rotation = yaw_to_quat_coeffs(rng.uniform(-np.pi, np.pi))
+        episodes.append(
+            StandInEpisode(str(len(episodes)), [start[0], 0.0, start[1]], rotation, [goal[0], 0.0, goal[1]])
+        )
+    return episodes
+
+
+class StandInNavEnv:
+    """
+    替身PointNav环境：接口与habitat.Env中评估用到的部分一致
+    （episodes/current_episode/reset/step/episode_over/get_metrics/close），在StandInSimulator的房间中导航到目标点。
+    指标与habitat的distance_to_goal/success/spl/collisions含义相同（房间中没有障碍物，测地距离即直线距离）
+
+    参数:
+    settings: StandInSimulator的配置
+    episodes: episode列表，默认用make_stand_in_episodes按settings中的seed生成
+    success_distance: 调用stop时距离目标小于该值视为成功
+    max_episode_steps: episode的最大步数
+    """
+
+    def __init__(self, settings, episodes=None, success_distance=0.2, max_episode_steps=500):
+        self.sim = StandInSimulator(settings)
+        self.episodes = episodes if episodes is not None else make_stand_in_episodes(10, settings.get("seed", 0))
+        self.success_distance = success_distance
+        self.max_episode_steps = max_episode_steps
+        self._current_episode = None
+        self._episode_from_iter_on_reset = True
+        self._next_episode = 0
+        self.episode_over = True
+
+    @property
+    def current_episode(self):
+        return self._current_episode
+
+    @current_episode.setter
+    def current_episode(self, episode):
+        # 与habitat.Env一致：指定current_episode后，下一次reset使用该episode
+        self._current_episode = episode
+        self._episode_from_iter_on_reset = False
+
+    def reset(self):
+        """开始current_episode（没有指定时按顺序取下一个episode），返回观测"""
+        if self._episode_from_iter_on_reset:
+            self._current_episode = self.episodes[self._next_episode % len(self.episodes)]
+            self._next_episode += 1
+        self._episode_from_iter_on_reset = True
+        state = StandInAgentState(
+            np.array(self.current_episode.start_position, dtype=np.float32),
+            np.array(self.current_episode.start_rotation, dtype=np.float64),
+        )
+        self.sim.get_agent().set_state(state)
+
+        self._goal = np.array(self.current_episode.goals[0].position, dtype=np.float32)
+        self._start_distance = self._distance_to_goal()
+        self._path_length = 0.0
+        self._collisions = 0
+        self._is_collision = False
+        self._called_stop = False
+        self._steps = 0
+        self.episode_over = False
+        return self.sim.get_sensor_observations()
+
+    def _distance_to_goal(self):
+        return float(np.linalg.norm((self.sim.position - self._goal)[[0, 2]]))
+
+    def step(self, action):
+        """
+        执行一个动作（HabitatSimActions编号、动作名或 {"action": ...}），返回观测
+        """
+        if isinstance(action, dict):
+            action = action["action"]
+        if isinstance(action, str):
+            action = {name: key for key, name in _ACTION_NAMES.items()}.get(action, STOP)
+        self._steps += 1
+        if action == STOP:
+            self._called_stop = True
+            self._is_collision = False
+            observations = self.sim.get_sensor_observations()
+        else:
+            previous = self.sim.position.copy()
+            observations = self.sim.step(_ACTION_NAMES[int(action)])
+            self._is_collision = bool(observations.pop("collided"))
+            self._collisions += self._is_collision
+            self._path_length += float(np.linalg.norm(self.sim.position - previous))
+        self.episode_over = self._called_stop or self._steps >= self.max_episode_steps
+        return observations
+
+    def get_metrics(self):
+        distance = self._distance_to_goal()
+        success = float(self._called_stop and distance < self.success_distance)
+        return {
+            "distance_to_goal": distance,
+            "success": success,
+            "spl": success * self._start_distance / max(self._start_distance, self._path_length),
+            "collisions": {"count": self._collisions, "is_collision": self._is_collision},
+        }
+
+    def oracle_action(self):
+        """最短路径跟随者的替身：转向目标，对准后前进，进入成功半径后stop"""
+        offset = (self._goal - self.sim.position)[[0, 2]]
+        if np.linalg.norm(offset) < self.success_distance:
+            return STOP
+        # 朝向yaw时的前向为 (-sin(yaw), -cos(yaw))
+        target_yaw = np.arctan2(-offset[0], -offset[1])
+        error = (target_yaw - self.sim.yaw + np.pi) % (2 * np.pi) - np.pi
+        if abs(error) > self.sim.turn_amount / 2:
+            return TURN_LEFT if error > 0 else TURN_RIGHT
+        return MOVE_FORWARD
+
+    def close(self):
+        self.sim.close()
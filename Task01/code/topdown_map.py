@@ -0,0 +1,713 @@
+"""
+顶视图导航地图工具：批量可导航性查询、由粗到细的自适应采样、分块（内存受限）生成、
+多楼层地图、世界坐标与地图网格坐标的转换（MapFrame）、距障碍物距离场（ClearanceField）
+与get_topdown_map
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+import scipy.ndimage as ndimage
+
+import habitat_sim  # Habitat-Sim主库（仿真核心）
+
+# worker进程中的导航网格（每个worker只加载一次）
+_worker_pathfinder = None
+
+
+def _init_worker(navmesh_path):
+    """
+    进程池初始化函数：在worker中加载一次导航网格
+    """
+    global _worker_pathfinder
+    _worker_pathfinder = habitat_sim.nav.PathFinder()
+    _worker_pathfinder.load_nav_mesh(navmesh_path)
+
+
+def _query_points(pathfinder, points):
+    """
+    逐点查询 (N, 3) 世界坐标是否可导航，返回长度为N的bool数组
+    """
+    return np.array([pathfinder.is_navigable(coord) for coord in points], dtype=bool)
+
+
+def _query_stack(pathfinder, x_coords, z_coords, heights):
+    """
+    查询多个切片高度下 z_coords × x_coords 网格上每个点是否可导航
+
+    返回:
+    np.ndarray: 形状为 (len(heights), len(z_coords), len(x_coords)) 的bool数组
+    """
+    navigable = np.zeros((len(heights), len(z_coords), len(x_coords)), dtype=bool)
+    # 每次只构造一行的(x, height, z)坐标，避免整张地图的N×3数组
+    row_coords = np.empty((len(x_coords), 3))
+    row_coords[:, 0] = x_coords
+    for i, z in enumerate(z_coords):
+        row_coords[:, 2] = z
+        for f, height in enumerate(heights):
+            row_coords[:, 1] = height
+            navigable[f, i] = _query_points(pathfinder, row_coords)
+    return navigable
+
+
+def _query_grid(pathfinder, x_coords, z_coords, height):
+    """
+    查询 z_coords × x_coords 网格（固定高度）上每个点是否可导航
+
+    返回:
+    np.ndarray: 形状为 (len(z_coords), len(x_coords)) 的bool数组
+    """
+    return _query_stack(pathfinder, x_coords, z_coords, [height])[0]
+
+
+def _query_stack_task(task):
+    x_coords, z_coords, heights = task
+    return _query_stack(_worker_pathfinder, x_coords, z_coords, heights)
+
+
+def _query_points_task(points):
+    return _query_points(_worker_pathfinder, points)
+
+
+class NavigabilitySampler:
+    """
+    批量可导航性查询引擎：把查询网格分块，分发到进程池中并行执行
+
+    参数:
+    pathfinder: 导航网格对象（num_workers=0时直接在本进程中查询）
+    navmesh_path: 导航网格文件路径；为None时把pathfinder保存到临时文件供worker加载
+    num_workers: worker进程数，默认为CPU核数；0表示在本进程中串行查询
+    chunk_points: 每个任务包含的查询点数（网格按整行切分）
+    """
+
+    def __init__(self, pathfinder, navmesh_path=None, num_workers=None, chunk_points=65536):
+        self.pathfinder = pathfinder
+        self.navmesh_path = navmesh_path
+        self.num_workers = os.cpu_count() if num_workers is None else num_workers
+        self.chunk_points = chunk_points
+        # 最近一次查询的统计：点数、耗时（秒）、吞吐量（点/秒）
+        self.stats = {"points": 0, "seconds": 0.0, "points_per_sec": 0.0}
+        self._pool = None
+        self._tmp_dir = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.navmesh_path is None:
+                self._tmp_dir = tempfile.TemporaryDirectory()
+                self.navmesh_path = os.path.join(self._tmp_dir.name, "scene.navmesh")
+                self.pathfinder.save_nav_mesh(self.navmesh_path)
+            # 使用fork启动worker：spawn会在子进程中重新执行主脚本（包括创建仿真器）
+            ctx = mp.get_context("fork")
+            self._pool = ctx.Pool(
+                self.num_workers, initializer=_init_worker, initargs=(self.navmesh_path,)
+            )
+        return self._pool
+
+    def _record(self, num_points, seconds):
+        self.stats = {
+            "points": num_points,
+            "seconds": seconds,
+            "points_per_sec": num_points / seconds if seconds > 0 else 0.0,
+        }
+
+    def query_grid(self, x_coords, z_coords, height) -> np.ndarray:
+        """
+        查询 z_coords × x_coords 网格上每个点是否可导航
+
+        参数:
+        x_coords: 列对应的x坐标（一维数组）
+        z_coords: 行对应的z坐标（一维数组）
+        height: 切片高度
+
+        返回:
+        np.ndarray: 形状为 (len(z_coords), len(x_coords)) 的bool数组
+        """
+        return self.query_stack(x_coords, z_coords, [height])[0]
+
+    def query_stack(self, x_coords, z_coords, heights) -> np.ndarray:
+        """
+        一次查询多个切片高度（楼层）下的网格，各楼层共享网格和分块任务
+
+        返回:
+        np.ndarray: 形状为 (len(heights), len(z_coords), len(x_coords)) 的bool数组
+        """
+        start = time.perf_counter()
+        if self.num_workers == 0:
+            navigable = _query_stack(self.pathfinder, x_coords, z_coords, heights)
+        else:
+            navigable = np.zeros((len(heights), len(z_coords), len(x_coords)), dtype=bool)
+            rows = max(1, self.chunk_points // max(1, len(x_coords) * len(heights)))
+            tasks = [
+                (x_coords, z_coords[i : i + rows], heights)
+                for i in range(0, len(z_coords), rows)
+            ]
+            # imap保持任务顺序，结果块直接写入输出数组
+            for i, block in enumerate(self._get_pool().imap(_query_stack_task, tasks)):
+                navigable[:, i * rows : i * rows + block.shape[1]] = block
+        self._record(navigable.size, time.perf_counter() - start)
+        return navigable
+
+    def query_points(self, points) -> np.ndarray:
+        """
+        查询任意 (N, 3) 世界坐标是否可导航，返回长度为N的bool数组
+        """
+        start = time.perf_counter()
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if self.num_workers == 0:
+            navigable = _query_points(self.pathfinder, points)
+        else:
+            navigable = np.zeros(len(points), dtype=bool)
+            tasks = [
+                points[i : i + self.chunk_points]
+                for i in range(0, len(points), self.chunk_points)
+            ]
+            for i, block in enumerate(self._get_pool().imap(_query_points_task, tasks)):
+                navigable[i * self.chunk_points : i * self.chunk_points + len(block)] = block
+        self._record(len(points), time.perf_counter() - start)
+        return navigable
+
+    def close(self):
+        """关闭进程池并删除临时导航网格文件"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+            self._tmp_dir = None
+            self.navmesh_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _lattice(n, step):
+    """长度为n的轴上间隔为step的格点下标（总是包含最后一个下标）"""
+    return np.union1d(np.arange(0, n, step), [n - 1])
+
+
+def _quadtree_pass(query, values, queried, block_size):
+    """
+    一轮由粗到细的四叉树填充：只查询活跃块的角点，角点一致的块直接填充，
+    角点不一致的块对半细分，直到块大小为1
+
+    返回:
+    (fill, filled): 填充值与被填充（未实际查询）的像素掩码
+    """
+    map_height, map_width = values.shape
+    fill = np.zeros_like(values)
+    filled = np.zeros_like(queried)
+    step = block_size
+    rows, cols = _lattice(map_height, step), _lattice(map_width, step)
+    active = np.ones((len(rows) - 1, len(cols) - 1), dtype=bool)
+    while True:
+        # 活跃块的四个角点中尚未确定的格点需要查询
+        need = np.zeros((len(rows), len(cols)), dtype=bool)
+        need[:-1, :-1] |= active
+        need[1:, :-1] |= active
+        need[:-1, 1:] |= active
+        need[1:, 1:] |= active
+        r, c = np.nonzero(need)
+        r, c = rows[r], cols[c]
+        unknown = ~(queried[r, c] | filled[r, c])
+        if unknown.any():
+            query(r[unknown], c[unknown])
+
+        lattice = np.ix_(rows, cols)
+        corners = np.where(queried[lattice], values[lattice], fill[lattice])
+        top_left = corners[:-1, :-1]
+        homogeneous = (
+            active
+            & (top_left == corners[1:, :-1])
+            & (top_left == corners[:-1, 1:])
+            & (top_left == corners[1:, 1:])
+        )
+
+        if homogeneous.any():
+            # 每个像素所属的块（格点行/列归入下方/右侧的块）
+            row_block = np.minimum(np.searchsorted(rows, np.arange(map_height), "right") - 1, len(rows) - 2)
+            col_block = np.minimum(np.searchsorted(cols, np.arange(map_width), "right") - 1, len(cols) - 2)
+            mask = homogeneous[row_block][:, col_block] & ~queried & ~filled
+            fill[mask] = top_left[row_block][:, col_block][mask]
+            filled |= mask
+
+        split = active & ~homogeneous
+        if step == 1 or not split.any():
+            return fill, filled
+
+        step //= 2
+        sub_rows, sub_cols = _lattice(map_height, step), _lattice(map_width, step)
+        # 子块继承父块的"需要细分"标记
+        parent_row = np.minimum(np.searchsorted(rows, sub_rows[:-1], "right") - 1, len(rows) - 2)
+        parent_col = np.minimum(np.searchsorted(cols, sub_cols[:-1], "right") - 1, len(cols) - 2)
+        active = split[parent_row][:, parent_col]
+        rows, cols = sub_rows, sub_cols
+
+
+def adaptive_navigability(
+    query_points, x_coords, z_coords, height, block_size=16, tolerance=1e-3, verify_samples=1000, seed=0
+):
+    """
+    由粗到细（四叉树）计算网格可导航性：先查询粗网格，只细分角点不一致的块（即边界附近），
+    角点一致的块直接填充。填充结果随机抽查verify_samples个像素，错误率超过tolerance时
+    把块大小减半重新填充（已查询的点不会重复查询），块大小为2时仍超过则逐点查询其余填充像素
+
+    参数:
+    query_points: 查询函数，输入 (N, 3) 世界坐标，返回长度为N的bool数组
+    x_coords: 列对应的x坐标（一维数组）
+    z_coords: 行对应的z坐标（一维数组）
+    height: 切片高度
+    block_size: 粗网格的块大小（像素，向下取整为2的幂）
+    tolerance: 允许的抽查错误率
+    verify_samples: 每轮抽查的填充像素数
+    seed: 抽查使用的随机种子
+
+    返回:
+    (navigable, num_queries): 形状为 (len(z_coords), len(x_coords)) 的bool数组，以及实际查询的点数
+    """
+    values = np.zeros((len(z_coords), len(x_coords)), dtype=bool)
+    queried = np.zeros_like(values)
+    num_queries = 0
+
+    def query(rows, cols):
+        nonlocal num_queries
+        points = np.empty((len(rows), 3))
+        points[:, 0] = x_coords[cols]
+        points[:, 1] = height
+        points[:, 2] = z_coords[rows]
+        values[rows, cols] = query_points(points)
+        queried[rows, cols] = True
+        num_queries += len(rows)
+
+    block_size = 1 << (max(1, int(block_size)).bit_length() - 1)
+    if min(values.shape) < 2:
+        block_size = 1
+    if block_size == 1:
+        query(*np.nonzero(~queried))
+        return values, num_queries
+
+    rng = np.random.default_rng(seed)
+    while True:
+        fill, filled = _quadtree_pass(query, values, queried, block_size)
+        r, c = np.nonzero(filled)
+        if len(r) == 0:
+            break
+        pick = rng.choice(len(r), min(len(r), verify_samples), replace=False)
+        r, c = r[pick], c[pick]
+        query(r, c)
+        error_rate = np.count_nonzero(values[r, c] != fill[r, c]) / len(r)
+        if error_rate <= tolerance:
+            break
+        if block_size <= 2:
+            # 最小的块仍超出容差（如单像素宽的障碍物落在角点之间）：逐点查询其余填充像素
+            query(*np.nonzero(filled & ~queried))
+            break
+        block_size //= 2
+
+    return np.where(queried, values, fill), num_queries
+
+
+def topdown_grid(pathfinder, meters_per_pixel):
+    """
+    计算顶视图地图每一列的x坐标和每一行的z坐标
+
+    参数:
+    pathfinder: 导航网格对象
+    meters_per_pixel: 每个像素代表的米数（分辨率）
+
+    返回:
+    (x_coords, z_coords): 两个一维数组，长度分别为地图宽度和高度
+    """
+    # 获取场景的导航边界（x, z轴，忽略y轴高度）
+    bounds = pathfinder.get_bounds()
+    min_x, _, min_z = bounds[0]
+    max_x, _, max_z = bounds[1]
+
+    # 计算地图的像素尺寸（x对应宽度，z对应高度）
+    map_width = int(np.ceil((max_x - min_x) / meters_per_pixel))
+    map_height = int(np.ceil((max_z - min_z) / meters_per_pixel))
+
+    x_coords = np.linspace(min_x, max_x, map_width, endpoint=False)
+    z_coords = np.linspace(min_z, max_z, map_height, endpoint=False)
+    return x_coords, z_coords
+
+
+class MapFrame:
+    """
+    顶视图地图的坐标系：缓存导航网格边界和地图尺寸，向量化地在世界坐标与网格坐标之间转换
+
+    参数:
+    lower_bound: 导航网格边界的最小角 (x, y, z)
+    upper_bound: 导航网格边界的最大角 (x, y, z)
+    grid_dimensions: 地图尺寸 (高度, 宽度)
+    """
+
+    def __init__(self, lower_bound, upper_bound, grid_dimensions):
+        self.lower_bound = np.array(lower_bound, dtype=np.float64)
+        self.upper_bound = np.array(upper_bound, dtype=np.float64)
+        self.grid_dimensions = (int(grid_dimensions[0]), int(grid_dimensions[1]))
+        grid_height, grid_width = self.grid_dimensions
+        # 按 (行, 列) = (z, x) 的顺序缓存原点、范围和最大下标
+        self._origin = self.lower_bound[[2, 0]]
+        self._extent = (self.upper_bound - self.lower_bound)[[2, 0]]
+        self._max_index = np.array([grid_height - 1, grid_width - 1])
+
+    @classmethod
+    def from_pathfinder(cls, pathfinder, grid_dimensions=None, meters_per_pixel=None):
+        """
+        由导航网格边界创建坐标系，地图尺寸直接给出或由meters_per_pixel计算（与get_topdown_map一致）
+        """
+        lower_bound, upper_bound = pathfinder.get_bounds()
+        if grid_dimensions is None:
+            x_coords, z_coords = topdown_grid(pathfinder, meters_per_pixel)
+            grid_dimensions = (len(z_coords), len(x_coords))
+        return cls(lower_bound, upper_bound, grid_dimensions)
+
+    def world_to_grid(self, points) -> np.ndarray:
+        """
+        世界坐标转换为网格坐标（超出地图的点截断到边缘）
+
+        参数:
+        points: (N, 3) 或 (3,) 世界坐标 (x, y, z)
+
+        返回:
+        np.ndarray: (N, 2) 或 (2,) 整数网格坐标 (行, 列)
+        """
+        points = np.asarray(points, dtype=np.float64)
+        # 归一化z到[0, grid_height-1]，x到[0, grid_width-1]
+        grid = (points[..., [2, 0]] - self._origin) / self._extent * self._max_index
+        grid = np.clip(grid, 0, self._max_index)
+        return np.rint(grid).astype(np.int64)
+
+    def grid_to_world(self, grid, height=0.0) -> np.ndarray:
+        """
+        网格坐标转换为世界坐标
+
+        参数:
+        grid: (N, 2) 或 (2,) 网格坐标 (行, 列)
+        height: 世界坐标的y值
+
+        返回:
+        np.ndarray: (N, 3) 或 (3,) 世界坐标 (x, y, z)
+        """
+        grid = np.asarray(grid, dtype=np.float64)
+        zx = grid / self._max_index * self._extent + self._origin
+        points = np.empty(grid.shape[:-1] + (3,))
+        points[..., 0] = zx[..., 1]
+        points[..., 1] = height
+        points[..., 2] = zx[..., 0]
+        return points
+
+
+def get_navigable_grid(pathfinder, height, meters_per_pixel, sampler=None):
+    """
+    查询get_topdown_map网格（指定高度）上每个像素是否可导航
+
+    参数:
+    pathfinder: 导航网格对象
+    height: 切片高度
+    meters_per_pixel: 每个像素代表的米数（分辨率）
+    sampler: 可选的NavigabilitySampler，用于多进程批量查询
+
+    返回:
+    (navigable, x_coords, z_coords): (H, W) bool数组，以及列/行对应的坐标
+    """
+    x_coords, z_coords = topdown_grid(pathfinder, meters_per_pixel)
+    if sampler is None:
+        navigable = _query_grid(pathfinder, x_coords, z_coords, height)
+    else:
+        navigable = sampler.query_grid(x_coords, z_coords, height)
+    return navigable, x_coords, z_coords
+
+
+def grid_spacing(x_coords, z_coords, meters_per_pixel):
+    """网格的实际像素间距 (行方向dz, 列方向dx)，与meters_per_pixel略有差别"""
+    dx = x_coords[1] - x_coords[0] if len(x_coords) > 1 else meters_per_pixel
+    dz = z_coords[1] - z_coords[0] if len(z_coords) > 1 else meters_per_pixel
+    return dz, dx
+
+
+def compute_clearance(navigable, x_coords, z_coords, meters_per_pixel) -> np.ndarray:
+    """
+    计算每个可导航像素到最近不可导航像素的欧氏距离（米），不可导航像素为0
+
+    参数:
+    navigable: (H, W) bool可导航性数组
+    x_coords: 列对应的x坐标（一维数组）
+    z_coords: 行对应的z坐标（一维数组）
+    meters_per_pixel: 每个像素代表的米数（网格只有一行或一列时使用）
+
+    返回:
+    np.ndarray: (H, W) float32距离场
+    """
+    spacing = grid_spacing(x_coords, z_coords, meters_per_pixel)
+    return ndimage.distance_transform_edt(navigable, sampling=spacing).astype(np.float32)
+
+
+def grid_indices(positions, x_coords, z_coords, meters_per_pixel):
+    """
+    世界坐标转换为get_topdown_map网格中最近像素的下标
+
+    参数:
+    positions: (N, 3) 或 (3,) 世界坐标
+    x_coords: 列对应的x坐标（一维数组）
+    z_coords: 行对应的z坐标（一维数组）
+    meters_per_pixel: 每个像素代表的米数
+
+    返回:
+    (rows, cols, inside): 截断到地图范围内的行、列下标，以及该点是否位于地图范围内
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    spacing = np.array(grid_spacing(x_coords, z_coords, meters_per_pixel))
+    origin = np.array([z_coords[0], x_coords[0]], dtype=np.float64)
+    max_index = np.array([len(z_coords) - 1, len(x_coords) - 1])
+    grid = np.rint((positions[..., [2, 0]] - origin) / spacing).astype(np.int64)
+    inside = np.all((grid >= 0) & (grid <= max_index), axis=-1)
+    grid = np.clip(grid, 0, max_index)
+    return grid[..., 0], grid[..., 1], inside
+
+
+class ClearanceField:
+    """
+    与get_topdown_map网格对齐的距障碍物距离场，支持批量世界坐标的O(1)查询
+
+    参数:
+    clearance: (H, W) 距离场（米），get_topdown_map(with_clearance=True)的第二个返回值
+    x_coords: 列对应的x坐标（一维数组）
+    z_coords: 行对应的z坐标（一维数组）
+    meters_per_pixel: 每个像素代表的米数
+    """
+
+    def __init__(self, clearance, x_coords, z_coords, meters_per_pixel):
+        self.clearance = clearance
+        self.x_coords = x_coords
+        self.z_coords = z_coords
+        self.meters_per_pixel = meters_per_pixel
+
+    @classmethod
+    def from_pathfinder(cls, pathfinder, meters_per_pixel, clearance):
+        """由导航网格边界重建网格坐标（与get_topdown_map一致）"""
+        x_coords, z_coords = topdown_grid(pathfinder, meters_per_pixel)
+        return cls(clearance, x_coords, z_coords, meters_per_pixel)
+
+    def lookup(self, positions) -> np.ndarray:
+        """
+        查询世界坐标处到最近障碍物的距离（米），地图范围外返回0
+
+        参数:
+        positions: (N, 3) 或 (3,) 世界坐标
+
+        返回:
+        np.ndarray: (N,) 或标量形状的float32距离
+        """
+        rows, cols, inside = grid_indices(positions, self.x_coords, self.z_coords, self.meters_per_pixel)
+        return np.where(inside, self.clearance[rows, cols], np.float32(0))
+
+
+def get_topdown_map(
+    pathfinder,
+    height,
+    meters_per_pixel,
+    sampler=None,
+    adaptive=False,
+    block_size=16,
+    tolerance=1e-3,
+    with_clearance=False,
+):
+    """
+    获取指定高度的顶视图导航网格地图（实现旧版本maps.get_topdown_map的核心功能）
+
+    参数:
+    pathfinder: 导航网格对象
+    height: 切片高度
+    meters_per_pixel: 每个像素代表的米数（分辨率）
+    sampler: 可选的NavigabilitySampler，用于多进程批量查询；为None时在本进程中逐点查询
+    adaptive: 是否使用由粗到细的自适应采样（见adaptive_navigability），大场景可减少一个数量级的查询
+    block_size: 自适应采样的粗网格块大小（像素）
+    tolerance: 自适应采样允许的抽查错误率
+    with_clearance: 是否同时返回距障碍物距离场（米，见compute_clearance）
+
+    返回:
+    np.ndarray: 生成的地图，0=不可导航，1=可导航，2=边界；
+    with_clearance=True时返回 (地图, 距离场)
+    """
+    if adaptive:
+        x_coords, z_coords = topdown_grid(pathfinder, meters_per_pixel)
+        if sampler is None:
+            query_points = lambda points: _query_points(pathfinder, points)
+        else:
+            query_points = sampler.query_points
+        navigable, _ = adaptive_navigability(
+            query_points, x_coords, z_coords, height, block_size=block_size, tolerance=tolerance
+        )
+    else:
+        navigable, x_coords, z_coords = get_navigable_grid(pathfinder, height, meters_per_pixel, sampler)
+    topdown_map = navigable.astype(np.uint8)
+
+    # 计算边界（匹配旧版本的2值）
+    edges = ndimage.laplace(topdown_map) != 0
+    topdown_map[edges] = 2
+
+    if with_clearance:
+        return topdown_map, compute_clearance(navigable, x_coords, z_coords, meters_per_pixel)
+    return topdown_map
+
+
+def get_topdown_map_tiled(
+    pathfinder, height, meters_per_pixel, output_path, tile_size=1024, sampler=None
+) -> np.memmap:
+    """
+    分块生成顶视图地图并直接写入磁盘上的np.memmap（.npy格式），峰值内存只与tile_size有关。
+    每个分块多查询一圈1像素的halo来计算边界，结果与get_topdown_map完全一致
+
+    参数:
+    pathfinder: 导航网格对象
+    height: 切片高度
+    meters_per_pixel: 每个像素代表的米数（分辨率）
+    output_path: 输出的.npy文件路径（之后可用np.load(output_path, mmap_mode="r")读取）
+    tile_size: 分块边长（像素）
+    sampler: 可选的NavigabilitySampler，用于多进程批量查询
+
+    返回:
+    np.memmap: 生成的地图，0=不可导航，1=可导航，2=边界
+    """
+    x_coords, z_coords = topdown_grid(pathfinder, meters_per_pixel)
+    map_height, map_width = len(z_coords), len(x_coords)
+    topdown_map = np.lib.format.open_memmap(
+        output_path, mode="w+", dtype=np.uint8, shape=(map_height, map_width)
+    )
+
+    for r0 in range(0, map_height, tile_size):
+        r1 = min(r0 + tile_size, map_height)
+        # 分块四周各扩展1像素的halo（地图边缘除外，边缘处与整图一样使用reflect边界）
+        hr0, hr1 = max(r0 - 1, 0), min(r1 + 1, map_height)
+        for c0 in range(0, map_width, tile_size):
+            c1 = min(c0 + tile_size, map_width)
+            hc0, hc1 = max(c0 - 1, 0), min(c1 + 1, map_width)
+            if sampler is None:
+                navigable = _query_grid(pathfinder, x_coords[hc0:hc1], z_coords[hr0:hr1], height)
+            else:
+                navigable = sampler.query_grid(x_coords[hc0:hc1], z_coords[hr0:hr1], height)
+            tile = navigable.astype(np.uint8)
+            tile[ndimage.laplace(tile) != 0] = 2
+            topdown_map[r0:r1, c0:c1] = tile[r0 - hr0 : r1 - hr0, c0 - hc0 : c1 - hc0]
+        # 每写完一行分块就刷回磁盘，限制脏页占用的内存
+        topdown_map.flush()
+
+    return topdown_map
+
+
+def detect_floor_heights(pathfinder, num_samples=2000, bin_size=0.1, min_floor_gap=1.0, min_fraction=0.05):
+    """
+    从导航网格检测各楼层的高度：随机采样可导航点（按面积均匀），对高度做直方图，
+    取样本占比足够大、且彼此相距至少min_floor_gap的峰值作为楼层（楼梯面积小，不会成为峰值）
+
+    参数:
+    pathfinder: 导航网格对象（会修改其随机种子状态）
+    num_samples: 采样点数
+    bin_size: 高度直方图的箱宽（米）
+    min_floor_gap: 两个楼层之间的最小高度差（米）
+    min_fraction: 楼层所占样本的最小比例
+
+    返回:
+    np.ndarray: 升序排列的楼层高度
+    """
+    ys = np.array([pathfinder.get_random_navigable_point()[1] for _ in range(num_samples)])
+    ys = ys[np.isfinite(ys)]
+    if len(ys) == 0:
+        return np.array([pathfinder.get_bounds()[0][1]])
+
+    num_bins = max(1, int(np.ceil((ys.max() - ys.min()) / bin_size)))
+    counts, edges = np.histogram(ys, bins=num_bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    heights = []
+    # 从样本最多的箱开始，依次接受与已有楼层相距足够远的峰值
+    for i in np.argsort(counts)[::-1]:
+        if counts[i] < min_fraction * len(ys):
+            break
+        if all(abs(centers[i] - h) >= min_floor_gap for h in heights):
+            heights.append(centers[i])
+    # 用峰值附近样本的中位数作为楼层高度
+    heights = [np.median(ys[np.abs(ys - h) <= bin_size]) for h in heights]
+    return np.sort(np.array(heights))
+
+
+def get_topdown_map_stack(pathfinder, meters_per_pixel, heights=None, sampler=None):
+    """
+    一次生成多个楼层的顶视图地图，所有楼层共享网格和批量查询
+
+    参数:
+    pathfinder: 导航网格对象
+    meters_per_pixel: 每个像素代表的米数（分辨率）
+    heights: 各楼层的切片高度；为None时使用detect_floor_heights自动检测
+    sampler: 可选的NavigabilitySampler，用于多进程批量查询
+
+    返回:
+    (heights, topdown_maps): 楼层高度数组，以及形状为 (楼层数, H, W) 的地图（0/1/2）
+    """
+    if heights is None:
+        heights = detect_floor_heights(pathfinder)
+    heights = np.asarray(heights, dtype=np.float64).reshape(-1)
+
+    x_coords, z_coords = topdown_grid(pathfinder, meters_per_pixel)
+    if sampler is None:
+        navigable = _query_stack(pathfinder, x_coords, z_coords, heights)
+    else:
+        navigable = sampler.query_stack(x_coords, z_coords, heights)
+    topdown_maps = navigable.astype(np.uint8)
+
+    # 每个楼层分别计算边界
+    for topdown_map in topdown_maps:
+        edges = ndimage.laplace(topdown_map) != 0
+        topdown_map[edges] = 2
+
+    return heights, topdown_maps
+
+
+def floor_index(heights, positions):
+    """
+    查询世界坐标所在的楼层（高度最接近的楼层）
+
+    参数:
+    heights: 楼层高度数组（get_topdown_map_stack的返回值）
+    positions: 单个 (3,) 或一批 (N, 3) 世界坐标
+
+    返回:
+    int 或 np.ndarray: 楼层下标
+    """
+    heights = np.asarray(heights)
+    positions = np.asarray(positions, dtype=np.float64)
+    ys = positions[..., 1]
+    index = np.argmin(np.abs(ys[..., None] - heights), axis=-1)
+    return int(index) if index.ndim == 0 else index
+
+
+if __name__ == "__main__":
+    # 测试不同worker数下的查询吞吐量（点/秒）
+    parser = argparse.ArgumentParser()
+    parser.add_argument("navmesh", help="导航网格文件(.navmesh)路径")
+    parser.add_argument("--meters-per-pixel", type=float, default=0.025)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    args = parser.parse_args()
+
+    pathfinder = habitat_sim.nav.PathFinder()
+    pathfinder.load_nav_mesh(args.navmesh)
+    height = pathfinder.get_bounds()[0][1]
+    x_coords, z_coords = topdown_grid(pathfinder, args.meters_per_pixel)
+    for num_workers in args.workers:
+        with NavigabilitySampler(pathfinder, args.navmesh, num_workers=num_workers) as sampler:
+            if num_workers > 0:
+                sampler._get_pool()  # 先启动进程池，计时不包含worker加载导航网格的时间
+            sampler.query_grid(x_coords, z_coords, height)
+            print(
+                "workers={}: {points} points, {seconds:.2f}s, {points_per_sec:.0f} points/sec".format(
+                    num_workers, **sampler.stats
+                )
+            )
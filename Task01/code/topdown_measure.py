@@ -0,0 +1,436 @@
+"""
+带缓存的TopDownMap测量：静态底图按场景和楼层缓存（不必每个episode从导航网格重新生成1024像素地图），
+reset时绘制的目标/视点/最短路径图层按episode缓存，
+战争迷雾原地更新：一次NumPy运算投射视野扇形内的所有光线（与habitat的reveal_fog_of_war逐像素相同），
+位姿不变时跳过，不再每一步复制整张迷雾遮罩
+"""
+import argparse
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+# 与habitat.utils.visualizations.maps.MAP_INVALID_POINT一致：光线遇到不可导航的像素时停止
+MAP_INVALID_POINT = 0
+
+
+def _cast_rays(top_down_map, fog_of_war_mask, point, d, steps, major_axis, chunk):
+    """
+    投射主方向相同的一组光线（major_axis为每次迭代前进一个像素的坐标轴），像素序列与habitat的
+    bresenham_supercover_line相同：线段跨过像素角时补上相邻的像素（光线不会从对角相接的两个墙壁像素之间穿过），
+    误差项的初值也与其一致（两个分支都从dx开始）。每次推进chunk步，已被阻挡或走完的光线不再计算
+
+    返回:
+    int: 标记为可见的像素数（不含起点）
+    """
+    minor_axis = 1 - major_axis
+    height, width = fog_of_war_mask.shape
+    d_major, d_minor = d[:, major_axis], d[:, minor_axis]
+    step_major, step_minor = steps[:, major_axis, None], steps[:, minor_axis, None]
+    counts = d_major.astype(np.int64)
+    threshold = 2 * d_major[:, None]
+    error0 = d[:, 0, None]
+
+    visible_count = 0
+    active = np.flatnonzero(counts > 0)
+    start = 1
+    while len(active):
+        # 第k次迭代后的累计误差 E_k = dx + k * 2 * d_minor，次方向已前进 m_k = max(ceil(E_k / D) - 1, 0) 步；
+        # 多算一列k = start - 1作为上一次迭代的状态
+        k = np.arange(start - 1, min(start + chunk, counts[active].max() + 1))
+        thr = threshold[active]
+        accumulated = error0[active] + k * (2 * d_minor[active, None])
+        m = np.maximum(np.ceil(accumulated / thr) - 1, 0)
+        error = accumulated - m * thr
+        k = k[1:]
+        in_range = k <= counts[active, None]
+        stepped = in_range & (m[:, 1:] > m[:, :-1])
+        total = error[:, 1:] + error[:, :-1]
+        tie = total == thr
+
+        major = point[major_axis] + k * step_major[active]
+        minor = point[minor_axis] + m[:, 1:].astype(np.int64) * step_minor[active]
+        back_major = major - step_major[active]
+        back_minor = minor - step_minor[active]
+        # 跨过像素角时补上的像素：误差和小于阈值时退回次方向一步，大于时退回主方向一步，相等时两个都补
+        # （habitat的实现中相等时先补的像素在两个分支中不同）
+        minor_first = (total < thr) | (tie if major_axis == 1 else False)
+        if major_axis == 0:
+            extra_b = (major, back_minor)
+        else:
+            extra_b = (back_major, minor)
+        # 每次迭代最多3个像素：补充像素A、补充像素B（误差和恰好等于阈值时）、主方向前进后的像素
+        majors = np.stack([np.where(minor_first, major, back_major), extra_b[0], major], axis=2).reshape(len(active), -1)
+        minors = np.stack([np.where(minor_first, back_minor, minor), extra_b[1], minor], axis=2).reshape(len(active), -1)
+        valid = np.stack([stepped, stepped & tie, in_range], axis=2).reshape(len(active), -1)
+        rows, cols = (majors, minors) if major_axis == 0 else (minors, majors)
+
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        blocked = ~inside
+        blocked[inside] = top_down_map[rows[inside], cols[inside]] == MAP_INVALID_POINT
+        blocked &= valid
+        # 每条光线只保留第一个被阻挡的像素之前的部分
+        visible = valid & (np.cumsum(blocked, axis=1) == 0)
+        fog_of_war_mask[rows[visible], cols[visible]] = 1
+        visible_count += int(visible.sum())
+
+        done = blocked.any(axis=1) | (counts[active] <= k[-1])
+        active = active[~done]
+        start = k[-1] + 1
+    return visible_count
+
+
+def fog_of_war_rays(top_down_map, fog_of_war_mask, point, angles, max_line_len, chunk=32):
+    """
+    从point沿每个角度投射长度为max_line_len的光线，把遇到不可导航像素或地图边界之前经过的像素标记为可见（原地修改），
+    结果与habitat的reveal_fog_of_war逐像素相同
+
+    参数:
+    top_down_map: (H, W) 顶视图地图
+    fog_of_war_mask: (H, W) 迷雾遮罩，可见为1
+    point: 网格坐标 (行, 列)，整数
+    angles: 光线的绝对角度（弧度，方向为 (cos, sin)，与habitat的reveal_fog_of_war一致）
+    max_line_len: 光线长度（像素）
+    chunk: 每次向前推进的步数
+
+    返回:
+    int: 本次标记的像素数（各光线重复经过的像素分别计数）
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    point = np.asarray(point, dtype=np.int64)
+    height, width = fog_of_war_mask.shape
+    # 所有光线的第一个像素都是起点
+    if len(angles) == 0 or not (0 <= point[0] < height and 0 <= point[1] < width):
+        return 0
+    if top_down_map[point[0], point[1]] == MAP_INVALID_POINT:
+        return 0
+    fog_of_war_mask[point[0], point[1]] = 1
+
+    ends = point + max_line_len * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    delta = ends - point
+    d = np.abs(delta)
+    steps = np.where(delta < 0, -1, 1)
+    major_x = d[:, 0] > d[:, 1]
+    count = 1
+    for major_axis, rays in ((0, major_x), (1, ~major_x)):
+        if rays.any():
+            count += _cast_rays(top_down_map, fog_of_war_mask, point, d[rays], steps[rays], major_axis, chunk)
+    return count
+
+
+def _cone_angles(angle, fov, max_line_len):
+    # 与reveal_fog_of_war相同：以朝向为中心的float32角度偏移，最远处相邻光线相距约1像素
+    half_fov = np.deg2rad(fov) / 2
+    offsets = np.arange(-half_fov, half_fov, step=1.0 / max_line_len, dtype=np.float32)
+    return float(angle) + offsets.astype(np.float64)
+
+
+def reveal_fog_of_war(top_down_map, current_fog_of_war_mask, current_point, current_angle, fov=90, max_line_len=100):
+    """与habitat.utils.visualizations.fog_of_war.reveal_fog_of_war参数和结果相同的NumPy实现（复制遮罩后投射整个视野扇形）"""
+    fog_of_war_mask = current_fog_of_war_mask.copy()
+    angles = _cone_angles(current_angle, fov, max_line_len)
+    fog_of_war_rays(top_down_map, fog_of_war_mask, current_point, angles, max_line_len)
+    return fog_of_war_mask
+
+
+class IncrementalFogOfWar:
+    """
+    原地更新的战争迷雾：结果与逐步调用reveal_fog_of_war相同，但不复制遮罩，位姿（网格位置和朝向）不变的步骤直接跳过。
+
+    snap_angles为True时光线取在全局固定的角度网格上，原地转向时只投射新转入扇形的光线（新旧扇形重叠部分的光线完全相同），
+    代价是光线方向与habitat的相差不到一个角度步长，遮罩会有少量远处像素与habitat不同。
+    前进（位置变化）后所有光线的起点都变了，两种模式都重新投射整个扇形，耗时与全量更新相同
+
+    参数:
+    fov: 视场角（度）
+    max_line_len: 可见距离（像素）
+    snap_angles: 是否把光线取在全局角度网格上
+    """
+
+    def __init__(self, fov, max_line_len, snap_angles=False):
+        self.fov = fov
+        self.max_line_len = max_line_len
+        self.snap_angles = snap_angles
+        self.angle_step = 1.0 / max_line_len
+        self.rays_cast = 0
+        self.reset()
+
+    def reset(self, point=None, angle=None):
+        """开始新的episode；给出位姿时表示遮罩中已包含该位姿的视野"""
+        self._point = None if point is None else (int(point[0]), int(point[1]))
+        self._angle = None if angle is None else float(angle)
+
+    def cone(self, angle):
+        """snap_angles模式下朝向angle时视野扇形内的光线在角度网格上的编号范围 [first, last)"""
+        half_fov = np.deg2rad(self.fov) / 2
+        first = int(np.ceil((angle - half_fov) / self.angle_step))
+        last = int(np.ceil((angle + half_fov) / self.angle_step))
+        return first, last
+
+    def update(self, top_down_map, fog_of_war_mask, point, angle):
+        """
+        按当前位姿更新迷雾遮罩（原地修改）
+
+        返回:
+        int: 本次投射的光线数
+        """
+        point = (int(point[0]), int(point[1]))
+        angle = float(angle)
+        if self.snap_angles:
+            rays = np.arange(*self.cone(angle))
+            if point == self._point and self._angle is not None:
+                # 原地转向：只投射不在上一个视野扇形内的光线（朝向跨过±pi时重新投射整个扇形）
+                previous = self.cone(self._angle)
+                rays = rays[(rays < previous[0]) | (rays >= previous[1])]
+            angles = rays * self.angle_step
+        elif point == self._point and angle == self._angle:
+            angles = np.zeros(0)
+        else:
+            angles = _cone_angles(angle, self.fov, self.max_line_len)
+        fog_of_war_rays(top_down_map, fog_of_war_mask, point, angles, self.max_line_len)
+        self._point = point
+        self._angle = angle
+        self.rays_cast += len(angles)
+        return len(angles)
+
+
+try:
+    from topdown_map import detect_floor_heights, floor_index
+    from habitat.config.default_structured_configs import TopDownMapMeasurementConfig
+    from habitat.core.registry import registry
+    from habitat.tasks.nav.nav import TopDownMap
+    from habitat.utils.visualizations import maps
+except ImportError:
+    # 没有安装habitat-sim/habitat-lab时只提供迷雾计算（基准测试使用）
+    TopDownMap = None
+
+# 场景 -> 导航网格上检测到的楼层高度（每个场景只检测一次）
+_scene_floor_heights = {}
+
+
+def floor_slice_height(scene, pathfinder, position):
+    """
+    get_topdown_map_from_sim在智能体的高度切片导航网格，底图随楼层变化。
+    把智能体高度对齐到所在楼层的高度作为底图缓存键的一部分：不同楼层使用各自的底图，
+    同一楼层内的高度差（斜坡、地面起伏）共享一张底图
+
+    参数:
+    scene: 场景路径（楼层高度的缓存键）
+    pathfinder: 场景的导航网格（首次检测楼层时会修改其随机种子状态）
+    position: 智能体的世界坐标
+
+    返回:
+    float: 所在楼层的高度
+    """
+    heights = _scene_floor_heights.get(scene)
+    if heights is None:
+        heights = detect_floor_heights(pathfinder)
+        _scene_floor_heights[scene] = heights
+    return float(heights[floor_index(heights, position)])
+
+if TopDownMap is not None:
+
+    @dataclass
+    class CachedTopDownMapMeasurementConfig(TopDownMapMeasurementConfig):
+        """
+        CachedTopDownMap的配置：参数与TopDownMapMeasurementConfig相同，
+        cache_scenes为所有实例共享的底图缓存数（多楼层场景每层一张），cache_episodes为按episode缓存的初始地图数（每个约两张地图大小），
+        fog_snap_angles见IncrementalFogOfWar的snap_angles（默认与habitat的迷雾逐像素相同）
+        """
+
+        type: str = "CachedTopDownMap"
+        cache_scenes: int = 8
+        cache_episodes: int = 64
+        fog_snap_angles: bool = False
+
+    @registry.register_measure
+    class CachedTopDownMap(TopDownMap):
+        """
+        TopDownMap的缓存版本，指标名和输出格式不变（top_down_map）。
+        注意迷雾遮罩是原地更新的，之前步骤返回的fog_of_war_mask会随之变化（与map相同）
+        """
+
+        # 场景底图在所有实例之间共享：(场景, 分辨率, 是否绘制边界, 楼层高度) -> 地图，超出cache_scenes时淘汰最久未使用的底图
+        _base_maps = OrderedDict()
+
+        def __init__(self, sim, config, *args, **kwargs):
+            super().__init__(sim, config, *args, **kwargs)
+            self._episode_maps = OrderedDict()
+            self._cache_scenes = getattr(config, "cache_scenes", 8)
+            self._cache_episodes = getattr(config, "cache_episodes", 64)
+            self._fog_snap_angles = getattr(config, "fog_snap_angles", False)
+            self._fog = None
+            self._fog_scene = None
+
+        def _scene_key(self):
+            return (self._sim.habitat_config.scene, self._map_resolution, self._config.draw_border)
+
+        def _base_map_key(self):
+            # 底图在智能体（reset时位于episode起点）的高度切片，多楼层场景的每层各有一张底图
+            scene = self._sim.habitat_config.scene
+            height = floor_slice_height(scene, self._sim.pathfinder, self._sim.get_agent(0).state.position)
+            return self._scene_key() + (height,)
+
+        def get_original_map(self):
+            key = self._base_map_key()
+            base_map = self._base_maps.get(key)
+            if base_map is None:
+                base_map = maps.get_topdown_map_from_sim(
+                    self._sim, map_resolution=self._map_resolution, draw_border=self._config.draw_border
+                )
+                self._base_maps[key] = base_map
+                while len(self._base_maps) > self._cache_scenes:
+                    self._base_maps.popitem(last=False)
+            else:
+                self._base_maps.move_to_end(key)
+            top_down_map = base_map.copy()
+            self._fog_of_war_mask = np.zeros_like(top_down_map) if self._config.fog_of_war.draw else None
+            self._reset_fog()
+            return top_down_map
+
+        def _reset_fog(self, point=None, angle=None):
+            if not self._config.fog_of_war.draw:
+                return
+            scene = self._scene_key()
+            if self._fog is None or self._fog_scene != scene:
+                # 每像素的米数取决于场景导航网格的范围，换场景时重新计算以像素为单位的可见距离
+                max_line_len = self._config.fog_of_war.visibility_dist / maps.calculate_meters_per_pixel(
+                    self._map_resolution, sim=self._sim
+                )
+                self._fog = IncrementalFogOfWar(self._config.fog_of_war.fov, max_line_len, self._fog_snap_angles)
+                self._fog_scene = scene
+            self._fog.reset(point, angle)
+
+        def update_fog_of_war_mask(self, agent_position, angle):
+            if self._config.fog_of_war.draw:
+                self._fog.update(self._top_down_map, self._fog_of_war_mask, agent_position, angle)
+
+        def reset_metric(self, episode, *args, **kwargs):
+            key = self._base_map_key() + (
+                episode.episode_id,
+                tuple(np.round(episode.start_position, 4)),
+                tuple(np.round(episode.start_rotation, 4)),
+            )
+            cached = self._episode_maps.get(key)
+            if cached is None:
+                super().reset_metric(episode, *args, **kwargs)
+                # reset绘制的目标/视点/最短路径/起点图层和起点的迷雾只取决于episode，缓存起来
+                fog = None if self._fog_of_war_mask is None else self._fog_of_war_mask.copy()
+                self._episode_maps[key] = (self._top_down_map.copy(), fog, self._shortest_path_points)
+                while len(self._episode_maps) > self._cache_episodes:
+                    self._episode_maps.popitem(last=False)
+                return
+
+            self._episode_maps.move_to_end(key)
+            top_down_map, fog, self._shortest_path_points = cached
+            self._top_down_map = top_down_map.copy()
+            self._fog_of_war_mask = None if fog is None else fog.copy()
+            num_agents = len(self._sim.habitat_config.agents)
+            self._previous_xy_location = [None for _ in range(num_agents)]
+            # 缓存的迷雾已包含起点的视野：记下最后一个更新迷雾的智能体的位姿，update_metric中位姿不变时不再投射
+            agent_state = self._sim.get_agent_state(num_agents - 1)
+            a_x, a_y = maps.to_grid(
+                agent_state.position[2], agent_state.position[0], self._top_down_map.shape[0:2], sim=self._sim
+            )
+            self._reset_fog((a_x, a_y), TopDownMap.get_polar_angle(agent_state))
+            self._step_count = 0
+            self.update_metric(episode, None)
+            self._step_count = 0
+
+
+def diagonal_wall_map(size, seed=0):
+    """合成地图：可导航区域中散布不可导航的方块和单像素宽的斜墙（检验光线不会从对角相接的墙壁像素之间穿过）"""
+    rng = np.random.default_rng(seed)
+    top_down_map = np.ones((size, size), dtype=np.uint8)
+    top_down_map[[0, -1], :] = MAP_INVALID_POINT
+    top_down_map[:, [0, -1]] = MAP_INVALID_POINT
+    for row, col in rng.integers(0, size - size // 25, size=(40, 2)):
+        top_down_map[row : row + size // 25, col : col + size // 25] = MAP_INVALID_POINT
+    length = np.arange(size // 5)
+    for row, col in rng.integers(0, size - size // 5, size=(20, 2)):
+        cols = col + (length if rng.random() < 0.5 else length[::-1])
+        top_down_map[row + length, cols] = MAP_INVALID_POINT
+    return top_down_map
+
+
+if __name__ == "__main__":
+    # 比较战争迷雾每一步的耗时（前进和转向分开统计）：habitat-lab的reveal_fog_of_war（安装时） vs 全量NumPy vs 原地更新，
+    # 使用带斜墙的合成1024像素地图和随机的前进/转向轨迹，并统计各方法与habitat结果不同的像素数
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resolution", type=int, default=1024)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--meters-per-pixel", type=float, default=0.02)
+    parser.add_argument("--visibility-dist", type=float, default=5.0)
+    parser.add_argument("--fov", type=float, default=90.0)
+    args = parser.parse_args()
+
+    size = args.resolution
+    top_down_map = diagonal_wall_map(size)
+
+    # 与ShortestPathFollower相似的动作分布：前进0.25米、转向10度
+    rng = np.random.default_rng(0)
+    point = np.array([size / 2, size / 2])
+    angle = 0.0
+    poses, actions = [], []
+    for _ in range(args.steps):
+        action = rng.choice(["forward", "turn"], p=[0.6, 0.4])
+        if action == "forward":
+            candidate = point + 0.25 / args.meters_per_pixel * np.array([np.cos(angle), np.sin(angle)])
+            if top_down_map[int(candidate[0]) % size, int(candidate[1]) % size] != MAP_INVALID_POINT:
+                point = candidate
+        else:
+            angle += np.deg2rad(rng.choice([10, -10]))
+        poses.append((point.astype(np.int64), angle))
+        actions.append(action)
+    actions = np.array(actions)
+    max_line_len = args.visibility_dist / args.meters_per_pixel
+
+    def run(make_update):
+        # 预热（habitat-lab的实现第一次调用时编译numba函数），计时使用新的更新函数
+        make_update()(np.zeros_like(top_down_map), *poses[0])
+        update = make_update()
+        mask = np.zeros_like(top_down_map)
+        times = np.zeros(len(poses))
+        for i, (point, angle) in enumerate(poses):
+            start = time.perf_counter()
+            mask = update(mask, point, angle)
+            times[i] = time.perf_counter() - start
+        return times, mask
+
+    def in_place(snap_angles):
+        fog = IncrementalFogOfWar(args.fov, max_line_len, snap_angles)
+
+        def update(mask, point, angle):
+            fog.update(top_down_map, mask, point, angle)
+            return mask
+
+        return update
+
+    results = {}
+    try:
+        from habitat.utils.visualizations import fog_of_war
+
+        results["habitat-lab"] = run(
+            lambda: lambda mask, point, angle: fog_of_war.reveal_fog_of_war(
+                top_down_map, mask, point, np.array(angle), args.fov, max_line_len
+            )
+        )
+    except ImportError:
+        pass
+    results["full (numpy)"] = run(
+        lambda: lambda mask, point, angle: reveal_fog_of_war(top_down_map, mask, point, angle, args.fov, max_line_len)
+    )
+    results["in-place"] = run(lambda: in_place(snap_angles=False))
+    results["in-place (snap)"] = run(lambda: in_place(snap_angles=True))
+
+    reference_name = "habitat-lab" if "habitat-lab" in results else "full (numpy)"
+    reference = results[reference_name][1]
+    forward = actions == "forward"
+    print(f"对照: {reference_name}（前进 {np.count_nonzero(forward)} 步，转向 {np.count_nonzero(~forward)} 步）")
+    for name, (times, mask) in results.items():
+        print(
+            f"{name:>16}: 前进 {times[forward].mean() * 1000:.3f} ms/step, "
+            f"转向 {times[~forward].mean() * 1000:.3f} ms/step, "
+            f"与对照不同的像素 {np.count_nonzero(mask != reference)} / {np.count_nonzero(reference)}"
+        )
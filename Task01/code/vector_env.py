@@ -0,0 +1,326 @@
+"""
+多进程向量化随机游走数据采集：N个worker进程各自持有一个仿真器（各自的种子和场景），
+观测直接写入预先分配的共享内存环形缓冲区，进程间只传递槽位下标，不序列化观测数组。
+支持同步步进（step，所有环境一起走一步，返回批量观测）和异步采集（random_walk，各环境独立游走）
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+from stand_in_sim import quat_coeffs
+
+DEFAULT_ACTIONS = ("move_forward", "turn_left", "turn_right")
+
+# 除传感器观测外，每一步还写入缓冲区的位姿和碰撞标志
+_POSE_SPACES = {
+    "position": ((3,), np.float32),
+    "rotation": ((4,), np.float32),
+    "collided": ((), np.bool_),
+}
+
+
+def _attach_buffers(names, spaces, ring_size, num_envs):
+    """按名字映射共享内存，返回 (SharedMemory列表, 键 -> (ring_size, num_envs, ...) 数组)"""
+    shms, arrays = [], {}
+    for key, (shape, dtype) in spaces.items():
+        shm = SharedMemory(name=names[key])
+        shms.append(shm)
+        arrays[key] = np.ndarray((ring_size, num_envs) + tuple(shape), dtype=dtype, buffer=shm.buf)
+    return shms, arrays
+
+
+def _worker(env_id, make_sim, settings, action_names, agent_id, conn, results, free_slots, stop):
+    """
+    worker进程主循环：创建仿真器，上报观测格式，然后按父进程的命令写入共享缓冲区
+    """
+    sim = make_sim(settings)
+    sim.seed(settings.get("seed", env_id))
+    rng = random.Random(settings.get("seed", env_id))
+    agent = sim.get_agent(agent_id)
+
+    observations = sim.reset()
+    spaces = {key: (np.shape(value), np.asarray(value).dtype) for key, value in observations.items()}
+    conn.send(spaces)
+    names, ring_size, num_envs = conn.recv()
+    shms, buffers = _attach_buffers(names, {**spaces, **_POSE_SPACES}, ring_size, num_envs)
+
+    def write(slot, observations, collided):
+        for key in spaces:
+            buffers[key][slot, env_id] = observations[key]
+        state = agent.get_state()
+        buffers["position"][slot, env_id] = state.position
+        buffers["rotation"][slot, env_id] = quat_coeffs(state.rotation)
+        buffers["collided"][slot, env_id] = collided
+
+    write(0, observations, False)
+    conn.send(None)
+
+    try:
+        while True:
+            command, arg, slot = conn.recv()
+            if command == "step":
+                action = arg if arg is not None else rng.choice(action_names)
+                observations = sim.step(action)
+                write(slot, observations, observations.get("collided", False))
+                conn.send(action_names.index(action))
+            elif command == "reset":
+                write(slot, sim.reset(), False)
+                conn.send(None)
+            elif command == "walk":
+                # 异步游走：每一步先占用一个空闲槽位（父进程消费完后释放），实现背压
+                for step in range(arg):
+                    if stop.is_set():
+                        break
+                    free_slots.acquire()
+                    action = rng.choice(action_names)
+                    observations = sim.step(action)
+                    slot = step % ring_size
+                    write(slot, observations, observations.get("collided", False))
+                    results.put((env_id, slot, action_names.index(action)))
+                results.put((env_id, None, None))
+            elif command == "close":
+                break
+    finally:
+        for shm in shms:
+            shm.close()
+        sim.close()
+
+
+class VectorSimulator:
+    """
+    多进程仿真器集合，观测通过共享内存环形缓冲区返回
+
+    参数:
+    make_sim: 根据配置创建仿真器的函数（如sim_factory.make_simulator，或替身仿真器StandInSimulator）
+    settings: 一个配置字典（各环境复制一份，种子依次加1），或每个环境一个配置的列表（可以是不同场景）
+    num_envs: 环境（worker进程）数，settings为字典时默认为CPU核数
+    ring_size: 每个环境的环形缓冲区槽位数；返回的观测是缓冲区视图，在之后ring_size - 1步内保持有效
+    action_names: 动作名列表（随机游走时从中均匀采样）
+    agent_id: 记录位姿的智能体ID
+    """
+
+    def __init__(self, make_sim, settings, num_envs=None, ring_size=8, action_names=DEFAULT_ACTIONS, agent_id=0):
+        if isinstance(settings, dict):
+            num_envs = os.cpu_count() if num_envs is None else num_envs
+            base_seed = settings.get("seed", 0)
+            settings = [{**settings, "seed": base_seed + i} for i in range(num_envs)]
+        self.num_envs = len(settings)
+        self.ring_size = ring_size
+        self.action_names = list(action_names)
+        self.frames = 0
+        self._slot = 0
+
+        # 父进程先启动资源跟踪进程，fork出的worker共用它，共享内存只由父进程负责释放
+        resource_tracker.ensure_running()
+        ctx = mp.get_context("fork")
+        self._results = ctx.Queue()
+        self._stop = ctx.Event()
+        self._free_slots = [ctx.Semaphore(ring_size) for _ in range(self.num_envs)]
+        self._conns, self._processes = [], []
+        for env_id, env_settings in enumerate(settings):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(
+                    env_id,
+                    make_sim,
+                    env_settings,
+                    self.action_names,
+                    agent_id,
+                    child_conn,
+                    self._results,
+                    self._free_slots[env_id],
+                    self._stop,
+                ),
+                daemon=True,
+            )
+            process.start()
+            # 关闭父进程中的子端，worker异常退出时recv会抛出EOFError而不是一直等待
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+        # 所有环境的观测格式必须一致（同样的传感器和分辨率），按第一个环境分配缓冲区
+        spaces = [conn.recv() for conn in self._conns]
+        self.observation_spaces = spaces[0]
+        for env_spaces in spaces[1:]:
+            if env_spaces != self.observation_spaces:
+                for process in self._processes:
+                    process.terminate()
+                raise ValueError(f"各环境的观测格式不一致: {env_spaces} != {self.observation_spaces}")
+
+        all_spaces = {**self.observation_spaces, **_POSE_SPACES}
+        self._shms, names = [], {}
+        for key, (shape, dtype) in all_spaces.items():
+            nbytes = ring_size * self.num_envs * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+            shm = SharedMemory(create=True, size=max(nbytes, 1))
+            self._shms.append(shm)
+            names[key] = shm.name
+        self.buffers = {
+            key: np.ndarray((ring_size, self.num_envs) + tuple(shape), dtype=dtype, buffer=shm.buf)
+            for shm, (key, (shape, dtype)) in zip(self._shms, all_spaces.items())
+        }
+        for conn in self._conns:
+            conn.send((names, ring_size, self.num_envs))
+        for conn in self._conns:
+            conn.recv()
+
+    def _batch(self, slot):
+        return {key: buffer[slot] for key, buffer in self.buffers.items()}
+
+    def reset(self):
+        """
+        重置所有环境
+
+        返回:
+        dict: 键 -> (num_envs, ...) 的批量观测（缓冲区视图），包含position、rotation、collided
+        """
+        self._slot = (self._slot + 1) % self.ring_size
+        for conn in self._conns:
+            conn.send(("reset", None, self._slot))
+        for conn in self._conns:
+            conn.recv()
+        return self._batch(self._slot)
+
+    def step(self, actions=None):
+        """
+        所有环境同步执行一步
+
+        参数:
+        actions: 每个环境的动作名列表；None（或列表中的None）表示由该环境的随机数生成器随机选择
+
+        返回:
+        (observations, actions): 批量观测（缓冲区视图）和实际执行的动作名列表
+        """
+        if actions is None:
+            actions = [None] * self.num_envs
+        self._slot = (self._slot + 1) % self.ring_size
+        for conn, action in zip(self._conns, actions):
+            conn.send(("step", action, self._slot))
+        taken = [self.action_names[conn.recv()] for conn in self._conns]
+        self.frames += self.num_envs
+        return self._batch(self._slot), taken
+
+    def _next_result(self, walking):
+        """从结果队列取下一条消息；walking中的worker异常退出（收不到结束消息）时抛出RuntimeError"""
+        while True:
+            try:
+                return self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [env_id for env_id in walking if not self._processes[env_id].is_alive()]
+                if dead:
+                    walking.difference_update(dead)
+                    codes = ", ".join(f"{env_id}（exitcode={self._processes[env_id].exitcode}）" for env_id in dead)
+                    raise RuntimeError(f"随机游走中worker异常退出: {codes}")
+
+    def random_walk(self, num_steps):
+        """
+        所有环境异步随机游走num_steps步，按完成顺序逐帧产出
+
+        参数:
+        num_steps: 每个环境的步数
+
+        返回:
+        生成器，产出 (env_id, observations, action)：observations是该环境这一步的观测字典（缓冲区视图，
+        在取下一帧之前有效，需要保留时请复制）
+        """
+        for conn in self._conns:
+            conn.send(("walk", num_steps, None))
+        walking = set(range(self.num_envs))
+        held = None
+        try:
+            while walking:
+                env_id, slot, action_id = self._next_result(walking)
+                if slot is None:
+                    walking.discard(env_id)
+                    continue
+                self.frames += 1
+                held = env_id
+                yield env_id, {key: buffer[slot, env_id] for key, buffer in self.buffers.items()}, self.action_names[action_id]
+                # 调用方取下一帧时，上一帧占用的槽位才可以被覆盖
+                self._free_slots[env_id].release()
+                held = None
+        finally:
+            if held is not None:
+                self._free_slots[held].release()
+            # 调用方提前停止迭代（或某个worker异常退出）时，通知worker停止并回收剩余结果，使槽位计数恢复；
+            # 已退出的worker不会再发结束消息，不再等待它们
+            if walking:
+                self._stop.set()
+                while walking:
+                    try:
+                        env_id, slot, _ = self._next_result(walking)
+                    except RuntimeError:
+                        continue
+                    if slot is None:
+                        walking.discard(env_id)
+                    else:
+                        self._free_slots[env_id].release()
+                self._stop.clear()
+            # 异步游走后各环境的槽位不再同步，之后的同步步进从新的槽位开始
+            self._slot = 0
+
+    def close(self):
+        for conn, process in zip(self._conns, self._processes):
+            if process.is_alive():
+                conn.send(("close", None, None))
+        for process in self._processes:
+            process.join()
+        for shm in getattr(self, "_shms", []):
+            shm.close()
+            shm.unlink()
+        self._shms = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+if __name__ == "__main__":
+    # 测试聚合帧率随worker数的变化：python vector_env.py --workers 1 2 4 8
+    # 默认使用替身仿真器；指定--scene时使用真实的habitat_sim仿真器
+    from stand_in_sim import StandInSimulator
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--resolution", type=int, default=256)
+    parser.add_argument("--mode", choices=["lockstep", "async"], default="async")
+    parser.add_argument("--scene", default=None)
+    args = parser.parse_args()
+
+    settings = {
+        "width": args.resolution,
+        "height": args.resolution,
+        "sensor_height": 1.5,
+        "color_sensor": True,
+        "depth_sensor": True,
+        "semantic_sensor": True,
+        "seed": 1,
+    }
+    make_sim = StandInSimulator
+    if args.scene is not None:
+        from sim_factory import make_simulator
+
+        settings["scene"] = args.scene
+        make_sim = make_simulator
+    for num_workers in args.workers:
+        with VectorSimulator(make_sim, settings, num_envs=num_workers) as envs:
+            start = time.time()
+            if args.mode == "lockstep":
+                for _ in range(args.steps):
+                    envs.step()
+            else:
+                for _ in envs.random_walk(args.steps):
+                    pass
+            elapsed = time.time() - start
+            print(f"workers={num_workers} frames={envs.frames} {envs.frames / elapsed:.1f} FPS")
@@ -0,0 +1,119 @@
+"""
+流式视频写出：帧在产生时就交给后台进程编码（与images_to_video输出相同的mp4），
+帧通过共享内存环形缓冲区传递，不需要序列化；队列满时append等待编码进程，内存占用固定为max_queue帧
+"""
+import ctypes
+import multiprocessing as mp
+import os
+
+import imageio  # 处理图像/视频（读、写、帧合成）
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+
+def _encode_worker(path, fps, quality, kwargs, frames, slots, free_slots):
+    writer = imageio.get_writer(path, fps=fps, quality=quality, **kwargs)
+    try:
+        while True:
+            slot = slots.get()
+            if slot is None:
+                break
+            writer.append_data(frames[slot])
+            free_slots.release()
+    finally:
+        writer.close()
+
+
+class VideoStreamWriter:
+    """
+    在后台进程中边产生边编码的视频写出器，用法与images_to_video相同：
+    文件保存为 {output_dir}/{video_name}.mp4
+
+    参数:
+    output_dir: 输出目录
+    video_name: 视频文件名（不含扩展名，空格和换行替换为下划线）
+    fps: 帧率
+    quality: 编码质量（0~10）
+    max_queue: 等待编码的最大帧数，队列满时append阻塞（背压）
+    kwargs: 传给imageio.get_writer的其他参数
+    """
+
+    def __init__(self, output_dir, video_name, fps=10, quality=5, max_queue=16, **kwargs):
+        assert 0 <= quality <= 10
+        os.makedirs(output_dir, exist_ok=True)
+        video_name = video_name.replace(" ", "_").replace("\n", "_") + ".mp4"
+        self.path = os.path.join(output_dir, video_name)
+        self.fps = fps
+        self.quality = quality
+        self.max_queue = max_queue
+        self.kwargs = kwargs
+        self.frames_written = 0
+        self._process = None
+        self._frames = None
+
+    def _start(self, frame):
+        # 第一帧确定帧尺寸，在fork编码进程之前分配共享缓冲区，子进程直接继承
+        ctx = mp.get_context("fork")
+        buffer = ctx.RawArray(ctypes.c_uint8, self.max_queue * frame.size)
+        self._frames = np.frombuffer(buffer, dtype=np.uint8).reshape((self.max_queue,) + frame.shape)
+        self._slots = ctx.Queue()
+        self._free_slots = ctx.Semaphore(self.max_queue)
+        self._process = ctx.Process(
+            target=_encode_worker,
+            args=(self.path, self.fps, self.quality, self.kwargs, self._frames, self._slots, self._free_slots),
+            daemon=True,
+        )
+        self._process.start()
+
+    def append(self, frame):
+        """
+        追加一帧 (H, W, 3) uint8图像（复制到共享缓冲区后立即返回，调用方可继续修改该数组）
+        """
+        frame = np.asarray(frame, dtype=np.uint8)
+        if self._process is None:
+            self._start(frame)
+        elif frame.shape != self._frames.shape[1:]:
+            raise ValueError(f"帧尺寸必须一致: {frame.shape} != {self._frames.shape[1:]}")
+
+        # 等待空闲槽位；编码进程异常退出时报错而不是一直等待
+        while not self._free_slots.acquire(timeout=1.0):
+            if not self._process.is_alive():
+                raise RuntimeError(f"视频编码进程已退出（exitcode={self._process.exitcode}）: {self.path}")
+        slot = self.frames_written % self.max_queue
+        self._frames[slot] = frame
+        self._slots.put(slot)
+        self.frames_written += 1
+
+    def close(self):
+        """等待剩余帧编码完成；编码进程异常退出时删除不完整的文件并抛出RuntimeError"""
+        if self._process is not None:
+            self._slots.put(None)
+            self._process.join()
+            exitcode = self._process.exitcode
+            self._process = None
+            if exitcode != 0:
+                self._remove_partial()
+                raise RuntimeError(f"视频编码进程异常退出（exitcode={exitcode}）: {self.path}")
+
+    def abort(self):
+        """放弃写出：立即结束编码进程并删除不完整的文件"""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+        self._remove_partial()
+
+    def _remove_partial(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # with块内出错时不等待编码剩余帧，也不留下半个视频文件
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
@@ -0,0 +1,127 @@
+"""
+每帧可见物体统计：对语义观测和深度观测做一次bincount式的遍历，
+得到每个可见实例的像素数、包围框和平均深度，关联语义场景中的类别，并按episode汇总成列式表
+"""
+import numpy as np  # 数值计算（数组、矩阵操作）
+
+# 语义ID不超过该值时用bincount压缩ID（比np.unique排序更快）
+_MAX_DENSE_ID = 1 << 22
+
+
+def _compact_ids(ids):
+    """
+    把语义ID压缩为连续编号
+
+    返回:
+    (present, inverse): 出现过的语义ID（升序），以及每个像素对应的编号
+    """
+    if ids.size and int(ids.max()) < _MAX_DENSE_ID:
+        present = np.flatnonzero(np.bincount(ids))
+        lookup = np.zeros(int(present[-1]) + 1, dtype=np.int64)
+        lookup[present] = np.arange(len(present))
+        return present, lookup[ids]
+    present, inverse = np.unique(ids, return_inverse=True)
+    return present, inverse.ravel()
+
+
+def frame_object_stats(semantic_obs, depth_obs=None, min_pixels=1):
+    """
+    统计一帧中每个可见实例的像素数、包围框和平均深度
+
+    参数:
+    semantic_obs: (H, W) 语义观测（实例的semantic_id）
+    depth_obs: 可选的 (H, W) 深度观测（米），0和非有限值视为无效
+    min_pixels: 像素数少于该值的实例被忽略
+
+    返回:
+    dict: 列名 -> 数组，每行一个实例：semantic_id、pixel_count、row_min、row_max、col_min、col_max、
+          mean_depth（没有深度或没有有效深度时为nan）
+    """
+    height, width = semantic_obs.shape
+    ids = semantic_obs.ravel().astype(np.int64)
+    present, inverse = _compact_ids(ids)
+    num_ids = len(present)
+
+    counts = np.bincount(inverse, minlength=num_ids)
+    # 每个实例在每一行/列是否出现：(实例数, H) 和 (实例数, W) 的直方图
+    pixel = np.arange(height * width)
+    row_hist = np.bincount(inverse * height + pixel // width, minlength=num_ids * height).reshape(num_ids, height) > 0
+    col_hist = np.bincount(inverse * width + pixel % width, minlength=num_ids * width).reshape(num_ids, width) > 0
+
+    if depth_obs is not None:
+        depth = depth_obs.ravel()
+        valid = np.isfinite(depth) & (depth > 0)
+        depth_sum = np.bincount(inverse, weights=np.where(valid, depth, 0), minlength=num_ids)
+        depth_count = np.bincount(inverse, weights=valid, minlength=num_ids)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_depth = (depth_sum / depth_count).astype(np.float32)
+    else:
+        mean_depth = np.full(num_ids, np.nan, dtype=np.float32)
+
+    keep = counts >= min_pixels
+    return {
+        "semantic_id": present[keep].astype(np.uint32),
+        "pixel_count": counts[keep].astype(np.uint32),
+        "row_min": np.argmax(row_hist, axis=1)[keep].astype(np.uint16),
+        "row_max": (height - 1 - np.argmax(row_hist[:, ::-1], axis=1))[keep].astype(np.uint16),
+        "col_min": np.argmax(col_hist, axis=1)[keep].astype(np.uint16),
+        "col_max": (width - 1 - np.argmax(col_hist[:, ::-1], axis=1))[keep].astype(np.uint16),
+        "mean_depth": mean_depth[keep],
+    }
+
+
+class VisibleObjectTable:
+    """
+    一个episode中每帧可见物体统计的列式表
+
+    参数:
+    scene_index: 可选的SceneIndex，用于把semantic_id关联到物体类别
+    min_pixels: 每帧中像素数少于该值的实例被忽略
+    """
+
+    def __init__(self, scene_index=None, min_pixels=1):
+        self.min_pixels = min_pixels
+        self._columns = []
+        if scene_index is not None:
+            order = np.argsort(scene_index.semantic_ids)
+            self._known_ids = scene_index.semantic_ids[order]
+            self.category_names, category_index = np.unique(scene_index.categories, return_inverse=True)
+            self._known_categories = category_index.ravel()[order].astype(np.int16)
+        else:
+            self._known_ids = np.zeros(0, dtype=np.int64)
+            self.category_names = np.zeros(0, dtype=str)
+            self._known_categories = np.zeros(0, dtype=np.int16)
+
+    def _category_index(self, semantic_ids):
+        """semantic_id -> 类别编号（在category_names中的下标），场景中没有的ID为-1"""
+        position = np.minimum(np.searchsorted(self._known_ids, semantic_ids), max(len(self._known_ids) - 1, 0))
+        if len(self._known_ids) == 0:
+            return np.full(len(semantic_ids), -1, dtype=np.int16)
+        found = self._known_ids[position] == semantic_ids
+        return np.where(found, self._known_categories[position], -1).astype(np.int16)
+
+    def append(self, step, semantic_obs, depth_obs=None):
+        """
+        统计一帧并追加到表中
+
+        返回:
+        dict: 这一帧的统计（列名 -> 数组）
+        """
+        stats = frame_object_stats(semantic_obs, depth_obs, self.min_pixels)
+        stats["category_index"] = self._category_index(stats["semantic_id"])
+        stats["step"] = np.full(len(stats["semantic_id"]), step, dtype=np.int32)
+        self._columns.append(stats)
+        return stats
+
+    def to_columns(self):
+        """
+        返回:
+        dict: 列名 -> 所有帧拼接后的数组
+        """
+        if not self._columns:
+            return {}
+        return {key: np.concatenate([stats[key] for stats in self._columns]) for key in self._columns[0]}
+
+    def save(self, path):
+        """把整个表和类别名表保存为压缩的.npz文件"""
+        np.savez_compressed(path, category_names=self.category_names, **self.to_columns())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 代码目录中的模块按脚本方式互相导入（import stand_in_sim 等）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
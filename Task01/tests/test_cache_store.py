@@ -0,0 +1,55 @@
+import os
+
+from cache_store import CacheStore
+
+
+def _make_store(db_path=None, max_entries=2):
+    return CacheStore(
+        "entries",
+        "value TEXT",
+        encode=lambda value: (value,),
+        decode=lambda row: row[0],
+        max_entries=max_entries,
+        db_path=db_path,
+    )
+
+
+def test_evicts_least_recently_used():
+    store = _make_store()
+    store.put(("scene", 1), "a")
+    store.put(("scene", 2), "b")
+    assert store.get(("scene", 1)) == "a"
+    store.put(("scene", 3), "c")
+    assert store.get(("scene", 2)) is None
+    assert store.get(("scene", 1)) == "a"
+    assert store.stats == {"hits": 2, "disk_hits": 0, "misses": 1, "hit_rate": 2 / 3}
+
+
+def test_disk_store_is_shared(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    writer = _make_store(db_path)
+    writer.put(("scene", 1), "a")
+    writer.close()
+
+    reader = _make_store(db_path)
+    assert reader.get(("scene", 1)) == "a"
+    assert reader.get(("scene", 1)) == "a"
+    assert (reader.stats["disk_hits"], reader.stats["hits"]) == (1, 1)
+    reader.close()
+
+
+def test_reconnects_after_fork(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    store = _make_store(db_path)
+    store.put(("scene", 1), "a")
+    pid = os.fork()
+    if pid == 0:
+        # 子进程不能使用父进程的连接：写入新条目后以是否成功作为退出码
+        try:
+            store.put(("scene", 2), "b")
+            os._exit(0)
+        except BaseException:
+            os._exit(1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert _make_store(db_path).get(("scene", 2)) == "b"
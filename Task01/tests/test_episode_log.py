@@ -0,0 +1,15 @@
+import pytest
+
+pytest.importorskip("habitat_sim")
+
+from episode_log import EpisodeLog
+
+
+def test_scenes_with_same_file_name_do_not_collide(tmp_path):
+    scene_a = "data/scene_datasets/a/apartment.glb"
+    scene_b = "data/scene_datasets/b/apartment.glb"
+    path_a = EpisodeLog(scene_a, 0).save(str(tmp_path))
+    path_b = EpisodeLog(scene_b, 0).save(str(tmp_path))
+    assert path_a != path_b
+    assert EpisodeLog.load(EpisodeLog.path(str(tmp_path), scene_a, "0")).scene_id == scene_a
+    assert EpisodeLog.load(EpisodeLog.path(str(tmp_path), scene_b, "0")).scene_id == scene_b
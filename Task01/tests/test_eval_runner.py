@@ -0,0 +1,109 @@
+import csv
+import json
+import os
+
+import pytest
+
+from eval_runner import _StandInOracleAgent, evaluate, make_batches, summarize, write_report
+from stand_in_sim import StandInNavEnv, make_stand_in_episodes
+
+SETTINGS = {"width": 16, "height": 16, "sensor_height": 1.5, "seed": 1}
+EPISODES = make_stand_in_episodes(6, seed=1)
+
+
+def make_env(worker_id):
+    return StandInNavEnv({**SETTINGS, "seed": SETTINGS["seed"] + worker_id}, EPISODES)
+
+
+class _FailingAgent(_StandInOracleAgent):
+    """评估第3个episode时抛出异常"""
+
+    def reset(self):
+        if self.env.current_episode.episode_id == "3":
+            raise ValueError("agent failed")
+
+
+class _CrashingAgent(_StandInOracleAgent):
+    """评估第3个episode时进程直接退出（收不到done消息）"""
+
+    def reset(self):
+        if self.env.current_episode.episode_id == "3":
+            os._exit(3)
+
+
+def _by_episode(records):
+    return {record["episode_id"]: record for record in records}
+
+
+def test_make_batches_groups_by_scene():
+    episodes = make_stand_in_episodes(5, seed=0)
+    episodes[1].scene_id = "other"
+    assert make_batches(episodes, batch_size=2) == [[0, 2], [3, 4], [1]]
+
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_evaluate_stand_in(num_workers):
+    records = list(evaluate(make_env, _StandInOracleAgent, EPISODES, num_workers=num_workers, batch_size=2))
+    assert sorted(_by_episode(records)) == sorted(episode.episode_id for episode in EPISODES)
+    for record in records:
+        # 替身环境的oracle智能体总能到达目标
+        assert record["success"] == 1.0
+        assert record["steps"] > 0
+        assert record["distance_to_goal"] <= 0.2
+        assert "collisions.count" in record
+    if num_workers:
+        assert {record["worker"] for record in records} <= {0, 1}
+
+
+def test_evaluate_workers_match_in_process():
+    serial = _by_episode(evaluate(make_env, _StandInOracleAgent, EPISODES, num_workers=0))
+    parallel = _by_episode(evaluate(make_env, _StandInOracleAgent, EPISODES, num_workers=2))
+    for episode_id, record in serial.items():
+        assert parallel[episode_id]["steps"] == record["steps"]
+        assert parallel[episode_id]["spl"] == pytest.approx(record["spl"])
+
+
+def test_evaluate_worker_exception_raises():
+    records = []
+    with pytest.raises(RuntimeError, match="agent failed"):
+        for record in evaluate(make_env, _FailingAgent, EPISODES, num_workers=2, batch_size=1):
+            records.append(record)
+    assert "3" not in _by_episode(records)
+
+
+def test_evaluate_worker_crash_raises():
+    with pytest.raises(RuntimeError, match="exitcode=3"):
+        list(evaluate(make_env, _CrashingAgent, EPISODES, num_workers=2, batch_size=1))
+
+
+def test_summarize():
+    records = [
+        {"episode_id": "0", "scene_id": "a", "steps": 10, "time": 1.0, "success": 1.0, "worker": 0},
+        {"episode_id": "1", "scene_id": "a", "steps": 30, "time": 3.0, "success": 0.0, "spl": 0.5, "worker": 1},
+    ]
+    summary = summarize(records, wall_time=2.0)
+    assert summary["num_episodes"] == 2
+    assert summary["total_steps"] == 40
+    assert summary["mean/success"] == 0.5
+    assert summary["mean/time"] == 2.0
+    # 只在部分episode中出现的指标按出现的episode平均
+    assert summary["mean/spl"] == 0.5
+    assert "mean/worker" not in summary
+    assert summary["episodes_per_second"] == 1.0
+    assert summary["steps_per_second"] == 20.0
+
+
+def test_write_report(tmp_path):
+    records = list(evaluate(make_env, _StandInOracleAgent, EPISODES, num_workers=0))
+    summary = write_report(records, tmp_path, name="run", wall_time=1.0)
+    assert summary["num_episodes"] == len(EPISODES)
+
+    with open(tmp_path / "run.json") as f:
+        report = json.load(f)
+    assert report["summary"] == summary
+    assert [record["episode_id"] for record in report["episodes"]] == [str(i) for i in range(len(EPISODES))]
+
+    with open(tmp_path / "run.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len(EPISODES)
+    assert {"episode_id", "steps", "success", "spl", "collisions.count"} <= set(rows[0])
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("habitat_sim")
+
+from geodesic_field import GeodesicField
+
+METERS_PER_PIXEL = 0.1
+X_COORDS = np.arange(30) * METERS_PER_PIXEL
+Z_COORDS = np.arange(20) * METERS_PER_PIXEL
+
+
+def test_goal_outside_navigable_area_snaps_to_nearest_pixel():
+    navigable = np.zeros((20, 30), dtype=bool)
+    navigable[5:15, 5:25] = True
+    geodesic = GeodesicField(navigable, X_COORDS, Z_COORDS, METERS_PER_PIXEL)
+    geodesic.compute([[0.0, 0.0, 0.0], [1.0, 0.0, 1.0]], num_workers=0)
+    # 第一个目标吸附到可导航区域的角点 (行5, 列5)
+    np.testing.assert_allclose(geodesic.distance([[0.5, 0.0, 0.5]]), [[0.0, 0.71]], atol=0.01)
+
+
+def test_goal_without_navigable_pixels_raises():
+    geodesic = GeodesicField(np.zeros((20, 30), dtype=bool), X_COORDS, Z_COORDS, METERS_PER_PIXEL)
+    with pytest.raises(ValueError):
+        geodesic.compute([[1.0, 0.0, 1.0]], num_workers=0)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from obs_recorder import ObservationDataset, ObservationRecorder
+
+
+def _observations(value, keys=("color_sensor", "depth_sensor")):
+    return {key: np.full((4, 4), value, dtype=np.float32) for key in keys}
+
+
+def test_round_trip_across_chunks(tmp_path):
+    with ObservationRecorder(str(tmp_path), chunk_size=2, depth_format="uint16") as recorder:
+        for step in range(5):
+            recorder.append(_observations(step), [step, 0, 0], [0, 0, 0, 1], action="move_forward", episode_id=step // 3)
+    dataset = ObservationDataset(str(tmp_path))
+    assert len(dataset) == 5
+    sample = dataset[3]
+    assert sample["color_sensor"][0, 0] == 3 and sample["depth_sensor"][0, 0] == 3
+    assert sample["action"] == "move_forward"
+    np.testing.assert_array_equal(dataset.episode_steps(1), [3, 4])
+
+
+def test_changed_observation_keys_raise(tmp_path):
+    recorder = ObservationRecorder(str(tmp_path), chunk_size=4)
+    recorder.append(_observations(0), [0, 0, 0], [0, 0, 0, 1])
+    with pytest.raises(ValueError):
+        recorder.append(_observations(1, keys=("color_sensor",)), [0, 0, 0], [0, 0, 0, 1])
+    # 出错的一步没有写入缓冲区，之前的数据仍可正常写出
+    recorder.close()
+    assert len(ObservationDataset(str(tmp_path))) == 1
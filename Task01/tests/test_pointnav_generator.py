@@ -0,0 +1,118 @@
+import gzip
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("habitat_sim")
+
+import pointnav_generator
+from pointnav_generator import REJECT_REASONS, generate_dataset, sample_episodes, shard_path, shard_seed
+
+SCENES = [("scenes/a/apartment.glb", "a.navmesh"), ("scenes/b/house.glb", "b.navmesh")]
+
+
+class _StubPathFinder:
+    """
+    不需要导航网格文件的PathFinder：一层是8×8米的正方形（x=3处有墙，两侧之间没有路径），
+    另有一个半径0.3米的小岛；二层是4×4米的正方形。
+    z方向相差不到1米的点对测地距离等于直线距离（距离比为1，会被随机拒绝）
+    """
+
+    def __init__(self):
+        self._rng = np.random.default_rng(0)
+
+    def load_nav_mesh(self, path):
+        return True
+
+    def seed(self, seed):
+        self._rng = np.random.default_rng(seed)
+
+    def get_random_navigable_point(self):
+        r = self._rng.random()
+        if r < 0.6:
+            return np.array([self._rng.uniform(-4, 4), 0.0, self._rng.uniform(-4, 4)], dtype=np.float32)
+        if r < 0.8:
+            return np.array([self._rng.uniform(-2, 2), 3.0, self._rng.uniform(-2, 2)], dtype=np.float32)
+        return np.array([10 + self._rng.uniform(-0.3, 0.3), 0.0, self._rng.uniform(-0.3, 0.3)], dtype=np.float32)
+
+    def get_island(self, point):
+        if point[0] > 8:
+            return 2
+        return 0 if point[1] < 1 else 1
+
+    def island_radius(self, point):
+        return 0.3 if self.get_island(point) == 2 else 4.0
+
+    def find_path(self, path):
+        start, end = np.asarray(path.requested_start), np.asarray(path.requested_end)
+        if (start[0] > 3) != (end[0] > 3):
+            return False
+        euclid = float(np.linalg.norm(end - start))
+        path.geodesic_distance = euclid if abs(start[2] - end[2]) < 1 else 1.3 * euclid
+        path.points = [start, end]
+        return True
+
+
+@pytest.fixture
+def stub_pathfinder(monkeypatch):
+    # worker进程由fork启动，继承替换后的PathFinder
+    monkeypatch.setattr(pointnav_generator.habitat_sim.nav, "PathFinder", _StubPathFinder)
+
+
+def _read_shards(output_dir):
+    content_dir = os.path.join(output_dir, "train", "content")
+    shards = {}
+    for name in sorted(os.listdir(content_dir)):
+        with gzip.open(os.path.join(content_dir, name), "rt") as f:
+            shards[name] = json.load(f)
+    return shards
+
+
+def test_shard_seed_is_deterministic():
+    assert shard_seed(0, "a.glb", 3) == shard_seed(0, "a.glb", 3)
+    seeds = {shard_seed(seed, scene, shard) for seed in (0, 1) for scene in ("a.glb", "b.glb") for shard in range(4)}
+    assert len(seeds) == 16
+    assert all(0 <= seed < 2**31 for seed in seeds)
+
+
+def test_rejection_counters_account_for_every_attempt():
+    pathfinder = _StubPathFinder()
+    pathfinder.seed(0)
+    rng = np.random.default_rng(0)
+    # 不限episode数、限制尝试次数，使每一批的点对都被完整处理
+    episodes, stats = sample_episodes(pathfinder, 10**6, rng, "stub.glb", batch_size=64, max_attempts=640)
+    assert stats["attempts"] == 640
+    assert stats["accepted"] == len(episodes) > 0
+    assert stats["attempts"] == stats["accepted"] + sum(stats[reason] for reason in REJECT_REASONS)
+    for reason in REJECT_REASONS:
+        assert stats[reason] > 0, reason
+    for episode in episodes:
+        assert 1.0 <= episode["info"]["geodesic_distance"] <= 30.0
+        assert abs(episode["start_position"][1] - episode["goals"][0]["position"][1]) <= 0.5
+
+
+def test_shards_do_not_depend_on_worker(tmp_path, stub_pathfinder):
+    serial, parallel = str(tmp_path / "serial"), str(tmp_path / "parallel")
+    serial_stats = list(generate_dataset(SCENES, serial, episodes_per_scene=30, episodes_per_shard=10, num_workers=1))
+    parallel_stats = list(generate_dataset(SCENES, parallel, episodes_per_scene=30, episodes_per_shard=10, num_workers=3))
+    assert len(serial_stats) == len(parallel_stats) == 6
+    shards = _read_shards(serial)
+    assert shards == _read_shards(parallel)
+    assert sorted(shards) == [f"{scene}_{shard:05d}.json.gz" for scene in ("apartment", "house") for shard in range(3)]
+    episode_ids = [episode["episode_id"] for episode in shards["house_00002.json.gz"]["episodes"]]
+    assert episode_ids == [str(i) for i in range(20, 30)]
+
+
+def test_resume_skips_existing_shards(tmp_path, stub_pathfinder):
+    output_dir = str(tmp_path)
+    kwargs = dict(episodes_per_scene=30, episodes_per_shard=10, num_workers=2)
+    assert len(list(generate_dataset(SCENES, output_dir, **kwargs))) == 6
+    shards = _read_shards(output_dir)
+    assert list(generate_dataset(SCENES, output_dir, **kwargs)) == []
+
+    os.remove(shard_path(output_dir, "train", SCENES[1][0], 1))
+    regenerated = list(generate_dataset(SCENES, output_dir, **kwargs))
+    assert [(scene_id, shard) for scene_id, shard, _ in regenerated] == [(SCENES[1][0], 1)]
+    assert _read_shards(output_dir) == shards
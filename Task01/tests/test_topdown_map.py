@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("habitat_sim")
+
+from topdown_map import adaptive_navigability, get_navigable_grid, get_topdown_map, topdown_grid
+
+METERS_PER_PIXEL = 0.05
+
+
+class _GridPathFinder:
+    """
+    按网格像素定义可导航性的导航网格：半径2米的圆形房间，
+    pillars=True时在奇数行奇数列放置单像素的柱子（落在所有块的角点之间）
+    """
+
+    def __init__(self, pillars=False):
+        self.pillars = pillars
+
+    def get_bounds(self):
+        return np.array([-2.5, 0.0, -2.5]), np.array([2.5, 1.0, 2.5])
+
+    def is_navigable(self, point):
+        x, _, z = point
+        if x * x + z * z >= 4:
+            return False
+        if self.pillars:
+            col = int(round((x + 2.5) / METERS_PER_PIXEL))
+            row = int(round((z + 2.5) / METERS_PER_PIXEL))
+            return not (row % 2 == 1 and col % 2 == 1)
+        return True
+
+
+@pytest.mark.parametrize("pillars", [False, True])
+def test_adaptive_map_matches_dense_within_tolerance(pillars):
+    pathfinder = _GridPathFinder(pillars)
+    tolerance = 1e-3
+    dense = get_topdown_map(pathfinder, 0.0, METERS_PER_PIXEL)
+    adaptive = get_topdown_map(pathfinder, 0.0, METERS_PER_PIXEL, adaptive=True, tolerance=tolerance)
+    assert adaptive.shape == dense.shape
+    assert np.count_nonzero(adaptive != dense) <= tolerance * dense.size
+
+
+def test_adaptive_falls_back_to_dense_queries():
+    pathfinder = _GridPathFinder(pillars=True)
+    x_coords, z_coords = topdown_grid(pathfinder, METERS_PER_PIXEL)
+    query_points = lambda points: np.array([pathfinder.is_navigable(p) for p in points])
+    navigable, num_queries = adaptive_navigability(query_points, x_coords, z_coords, 0.0, block_size=8)
+    # 柱子让最小的块抽查也失败，最终每个像素都被查询过
+    assert num_queries == navigable.size
+    dense, _, _ = get_navigable_grid(pathfinder, 0.0, METERS_PER_PIXEL)
+    np.testing.assert_array_equal(navigable, dense)
@@ -0,0 +1,180 @@
+import numpy as np
+import pytest
+
+from topdown_measure import MAP_INVALID_POINT, IncrementalFogOfWar, diagonal_wall_map, reveal_fog_of_war
+
+FOV = 90
+MAX_LINE_LEN = 40.0
+
+
+def _reference_supercover_line(pt1, pt2):
+    """habitat-lab的bresenham_supercover_line（habitat/utils/visualizations/fog_of_war.py）逐行移植，作为对照"""
+    ystep, xstep = 1, 1
+    x, y = pt1
+    dx, dy = pt2 - pt1
+    if dy < 0:
+        ystep *= -1
+        dy *= -1
+    if dx < 0:
+        xstep *= -1
+        dx *= -1
+    line_pts = [[x, y]]
+    ddx, ddy = 2 * dx, 2 * dy
+    if ddx > ddy:
+        errorprev = dx
+        error = dx
+        for _ in range(int(dx)):
+            x += xstep
+            error += ddy
+            if error > ddx:
+                y += ystep
+                error -= ddx
+                if error + errorprev < ddx:
+                    line_pts.append([x, y - ystep])
+                elif error + errorprev > ddx:
+                    line_pts.append([x - xstep, y])
+                else:
+                    line_pts.append([x - xstep, y])
+                    line_pts.append([x, y - ystep])
+            line_pts.append([x, y])
+            errorprev = error
+    else:
+        errorprev = dx
+        error = dx
+        for _ in range(int(dy)):
+            y += ystep
+            error += ddx
+            if error > ddy:
+                x += xstep
+                error -= ddy
+                if error + errorprev < ddy:
+                    line_pts.append([x - xstep, y])
+                elif error + errorprev > ddy:
+                    line_pts.append([x, y - ystep])
+                else:
+                    line_pts.append([x - xstep, y])
+                    line_pts.append([x, y - ystep])
+            line_pts.append([x, y])
+            errorprev = error
+    return line_pts
+
+
+def _reference_reveal(top_down_map, mask, point, angle, fov, max_line_len):
+    """habitat-lab的reveal_fog_of_war（去掉numba）"""
+    mask = mask.copy()
+    angles = np.arange(-np.deg2rad(fov) / 2, np.deg2rad(fov) / 2, step=1.0 / max_line_len, dtype=np.float32)
+    for offset in angles:
+        end = point + max_line_len * np.array([np.cos(angle + offset), np.sin(angle + offset)])
+        for x, y in _reference_supercover_line(point, end):
+            if x < 0 or x >= mask.shape[0] or y < 0 or y >= mask.shape[1]:
+                break
+            if top_down_map[x, y] == MAP_INVALID_POINT:
+                break
+            mask[x, y] = 1
+    return mask
+
+
+def _poses(top_down_map, count, seed=0):
+    rng = np.random.default_rng(seed)
+    navigable = np.argwhere(top_down_map != MAP_INVALID_POINT)
+    points = navigable[rng.integers(0, len(navigable), count)]
+    return [(point, rng.uniform(-np.pi, np.pi)) for point in points]
+
+
+@pytest.fixture(scope="module")
+def top_down_map():
+    return diagonal_wall_map(160, seed=1)
+
+
+def test_reveal_matches_reference_on_diagonal_walls(top_down_map):
+    for point, angle in _poses(top_down_map, 40):
+        empty = np.zeros_like(top_down_map)
+        expected = _reference_reveal(top_down_map, empty, point, np.array(angle), FOV, MAX_LINE_LEN)
+        actual = reveal_fog_of_war(top_down_map, empty, point, np.array(angle), FOV, MAX_LINE_LEN)
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_reveal_matches_habitat(top_down_map):
+    fog_of_war = pytest.importorskip("habitat.utils.visualizations.fog_of_war")
+    mask = np.zeros_like(top_down_map)
+    expected = np.zeros_like(top_down_map)
+    for point, angle in _poses(top_down_map, 40):
+        mask = reveal_fog_of_war(top_down_map, mask, point, np.array(angle), FOV, MAX_LINE_LEN)
+        expected = fog_of_war.reveal_fog_of_war(top_down_map, expected, point, np.array(angle), FOV, MAX_LINE_LEN)
+    np.testing.assert_array_equal(mask, expected)
+
+
+def test_rays_do_not_leak_through_diagonal_wall():
+    top_down_map = np.ones((64, 64), dtype=np.uint8)
+    index = np.arange(64)
+    top_down_map[index, index] = MAP_INVALID_POINT
+    mask = reveal_fog_of_war(top_down_map, np.zeros_like(top_down_map), np.array([40, 10]), -np.pi / 4, 180, 60.0)
+    rows, cols = np.nonzero(mask)
+    # 斜墙把地图分成两半，起点在行号大于列号的一侧
+    assert (rows > cols).all()
+
+
+def test_in_place_fog_matches_reveal_sequence(top_down_map):
+    rng = np.random.default_rng(2)
+    point, angle = _poses(top_down_map, 1)[0]
+    fog = IncrementalFogOfWar(FOV, MAX_LINE_LEN)
+    mask = np.zeros_like(top_down_map)
+    fog.update(top_down_map, mask, point, angle)
+    expected = reveal_fog_of_war(top_down_map, np.zeros_like(top_down_map), point, angle, FOV, MAX_LINE_LEN)
+    for _ in range(60):
+        action = rng.choice(["forward", "turn", "stay"])
+        if action == "forward":
+            candidate = (point + 3 * np.array([np.cos(angle), np.sin(angle)])).astype(np.int64)
+            if top_down_map[tuple(np.clip(candidate, 0, len(top_down_map) - 1))] != MAP_INVALID_POINT:
+                point = np.clip(candidate, 0, len(top_down_map) - 1)
+        elif action == "turn":
+            angle += np.deg2rad(rng.choice([10, -10]))
+        rays = fog.update(top_down_map, mask, point, angle)
+        if action == "stay":
+            assert rays == 0
+        expected = reveal_fog_of_war(top_down_map, expected, point, angle, FOV, MAX_LINE_LEN)
+        np.testing.assert_array_equal(mask, expected)
+
+
+def test_snapped_fog_casts_only_new_rays_when_turning(top_down_map):
+    point, angle = _poses(top_down_map, 1)[0]
+    fog = IncrementalFogOfWar(FOV, MAX_LINE_LEN, snap_angles=True)
+    mask = np.zeros_like(top_down_map)
+    full = fog.update(top_down_map, mask, point, angle)
+    turned = fog.update(top_down_map, mask, point, angle + np.deg2rad(10))
+    assert 0 < turned < full / 4
+
+    expected = reveal_fog_of_war(top_down_map, np.zeros_like(top_down_map), point, angle, FOV, MAX_LINE_LEN)
+    expected = reveal_fog_of_war(top_down_map, expected, point, angle + np.deg2rad(10), FOV, MAX_LINE_LEN)
+    # 光线方向与habitat相差不到一个角度步长，只有少量像素不同
+    assert np.count_nonzero(mask != expected) < 0.05 * np.count_nonzero(expected)
+
+
+class _TwoFloorPathFinder:
+    """两层的导航网格：一层在y=0，二层在y=3（二层面积较小）"""
+
+    def __init__(self):
+        self.rng = np.random.default_rng(0)
+        self.samples = 0
+
+    def get_random_navigable_point(self):
+        self.samples += 1
+        y = 0.0 if self.rng.random() < 0.7 else 3.0
+        return np.array([self.rng.uniform(-2, 2), y, self.rng.uniform(-2, 2)], dtype=np.float32)
+
+    def get_bounds(self):
+        return np.array([-2.0, 0.0, -2.0]), np.array([2.0, 3.0, 2.0])
+
+
+def test_floor_slice_height_separates_floors():
+    pytest.importorskip("habitat_sim")
+    from topdown_measure import floor_slice_height
+
+    pathfinder = _TwoFloorPathFinder()
+    ground = floor_slice_height("two_floors", pathfinder, np.array([0.5, 0.05, 0.5]))
+    upstairs = floor_slice_height("two_floors", pathfinder, np.array([0.5, 3.1, -0.5]))
+    assert abs(ground - 0.0) < 0.1 and abs(upstairs - 3.0) < 0.1
+    # 同一楼层内的高度差共享底图，楼层只检测一次
+    samples = pathfinder.samples
+    assert floor_slice_height("two_floors", pathfinder, np.array([-1.0, 0.2, 1.0])) == ground
+    assert pathfinder.samples == samples
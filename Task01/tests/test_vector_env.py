@@ -0,0 +1,89 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from stand_in_sim import StandInSimulator
+from vector_env import VectorSimulator
+
+SETTINGS = {"width": 32, "height": 24, "sensor_height": 1.5, "seed": 1}
+
+
+class _CrashingSimulator(StandInSimulator):
+    """第3步时进程直接退出（模拟段错误等收不到结束消息的情况）"""
+
+    def step(self, action):
+        self._steps = getattr(self, "_steps", 0) + 1
+        if self._steps == 3:
+            os._exit(1)
+        return super().step(action)
+
+
+def _free_counts(envs):
+    return [semaphore.get_value() for semaphore in envs._free_slots]
+
+
+def test_lockstep_step():
+    with VectorSimulator(StandInSimulator, SETTINGS, num_envs=2, ring_size=4) as envs:
+        observations = envs.reset()
+        assert observations["color_sensor"].shape == (2, 24, 32, 4)
+        assert observations["position"].shape == (2, 3)
+        start = observations["position"].copy()
+
+        observations, taken = envs.step(["move_forward", "turn_left"])
+        assert taken == ["move_forward", "turn_left"]
+        # 前进改变位置，转向只改变朝向
+        assert np.linalg.norm(observations["position"][0] - start[0]) > 0
+        np.testing.assert_allclose(observations["position"][1], start[1])
+
+        observations, taken = envs.step()
+        assert all(action in envs.action_names for action in taken)
+        assert envs.frames == 4
+
+
+def test_random_walk_yields_every_step():
+    with VectorSimulator(StandInSimulator, SETTINGS, num_envs=2, ring_size=4) as envs:
+        counts = [0, 0]
+        for env_id, observations, action in envs.random_walk(10):
+            assert observations["depth_sensor"].shape == (24, 32)
+            assert action in envs.action_names
+            counts[env_id] += 1
+        assert counts == [10, 10]
+        assert _free_counts(envs) == [4, 4]
+
+
+def test_random_walk_early_close_restores_slots():
+    with VectorSimulator(StandInSimulator, SETTINGS, num_envs=2, ring_size=4) as envs:
+        walk = envs.random_walk(1000)
+        for _ in range(5):
+            next(walk)
+        walk.close()
+        assert _free_counts(envs) == [4, 4]
+        # 提前停止后仍可以继续同步步进和游走
+        observations, _ = envs.step()
+        assert observations["position"].shape == (2, 3)
+        assert sum(1 for _ in envs.random_walk(3)) == 6
+
+
+def test_random_walk_back_pressure():
+    ring_size = 3
+    with VectorSimulator(StandInSimulator, SETTINGS, num_envs=2, ring_size=ring_size) as envs:
+        walk = envs.random_walk(50)
+        next(walk)
+        # 父进程不消费时，每个worker最多写满自己的环形缓冲区
+        time.sleep(1.0)
+        assert envs._results.qsize() <= 2 * ring_size - 1
+        assert _free_counts(envs) == [0, 0]
+        walk.close()
+        assert _free_counts(envs) == [ring_size, ring_size]
+
+
+def test_random_walk_dead_worker_raises():
+    envs = VectorSimulator(_CrashingSimulator, SETTINGS, num_envs=2, ring_size=4)
+    try:
+        with pytest.raises(RuntimeError, match="异常退出"):
+            for _ in envs.random_walk(20):
+                pass
+    finally:
+        envs.close()